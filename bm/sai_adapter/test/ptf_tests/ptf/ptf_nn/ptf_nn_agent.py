@@ -26,15 +26,15 @@ import argparse
 import time
 import struct
 import socket
-import Queue
+import select
+import errno
 try:
     import nnpy
 except ImportError:
     print "Cannot find nnpy package, please install"
     sys.exit(1)
-import threading
-import os
 import logging
+from collections import deque
 from fcntl import ioctl
 from socket import AF_NETLINK, SOCK_DGRAM
 
@@ -176,10 +176,68 @@ nano_mgrs = {}
 logging.basicConfig(format='%(message)s')
 logger = logging.getLogger('ptf_nn_agent')
 
-class IfaceMgr(threading.Thread):
-    def __init__(self, dev, port, iface_name, iface_rcv_buf=0, iface_snd_buf=0):
-        threading.Thread.__init__(self)
-        self.daemon = True
+# Maximum number of packets read from a socket before serving the other
+# sockets
+MAX_BATCH = 64
+
+# Maximum number of messages queued while a nanomsg socket can't send,
+# the oldest ones are dropped
+MAX_NN_BACKLOG = 1024
+
+# Struct formats of the nanomsg messages
+MSG_HDR = struct.Struct("<iii")
+
+# rtnetlink link notifications, from linux/rtnetlink.h and linux/if_link.h
+NETLINK_ROUTE  = 0
+RTMGRP_LINK    = 0x1
+RTM_NEWLINK    = 16
+RTM_DELLINK    = 17
+IFLA_IFNAME    = 3
+NLMSG_HDR = struct.Struct("=IHHII")   # len, type, flags, seq, pid
+IFINFOMSG = struct.Struct("=BxHiII")  # family, type, index, flags, change
+RTATTR_HDR = struct.Struct("=HH")     # len, type
+
+def nl_align(length):
+    return (length + 3) & ~3
+
+def would_block(err):
+    return err.errno in (errno.EAGAIN, errno.EWOULDBLOCK)
+
+class EventLoop(object):
+    """
+    Single epoll loop serving the interface sockets, the nanomsg sockets and
+    the link notifications
+    """
+    def __init__(self):
+        self.epoll = select.epoll()
+        # fd -> callback called when the fd is readable
+        self.handlers = {}
+
+    def register(self, fd, handler):
+        self.handlers[fd] = handler
+        self.epoll.register(fd, select.EPOLLIN)
+
+    def unregister(self, fd):
+        del self.handlers[fd]
+        self.epoll.unregister(fd)
+
+    def run(self):
+        while True:
+            try:
+                events = self.epoll.poll()
+            except IOError as err:
+                if err.errno == errno.EINTR:
+                    continue
+                raise
+            for fd, _ in events:
+                # a previous handler may have closed the fd
+                handler = self.handlers.get(fd)
+                if handler is not None:
+                    handler()
+
+class IfaceMgr(object):
+    def __init__(self, loop, dev, port, iface_name, iface_rcv_buf=0, iface_snd_buf=0):
+        self.loop = loop
         self.rx_ctr = 0
         self.tx_ctr = 0
         self.dev = dev
@@ -187,19 +245,43 @@ class IfaceMgr(threading.Thread):
         self.iface_name = iface_name
         self.iface_rcv_buf = iface_rcv_buf
         self.iface_snd_buf = iface_snd_buf
+        self.socket = None
 
     def forward(self, p):
-        # can that conflict with sniff?
-        self.socket.send(p)
+        if self.socket is None:
+            logger.debug("IfaceMgr {}-{} ({}) is down, dropping packet".format(
+                self.dev, self.port, self.iface_name))
+            return
+        try:
+            self.socket.send(p)
+        except socket.error as err:
+            if would_block(err):
+                logger.debug("IfaceMgr {}-{} ({}) send buffer full, dropping packet".format(
+                    self.dev, self.port, self.iface_name))
+                return
+            self.error()
+            return
         self.tx_ctr += 1
 
-    def received(self, p):
-        logger.debug("IfaceMgr {}-{} ({}) received a packet".format(
-            self.dev, self.port, self.iface_name))
-        if self.dev in nano_mgrs:
-            nano_mgr = nano_mgrs[self.dev]
-            nano_mgr.forward(str(p), self.port)
-            self.rx_ctr += 1
+    def readable(self):
+        """
+        Forward the packets received on the interface, at most MAX_BATCH
+        """
+        nano_mgr = nano_mgrs.get(self.dev)
+        debug = logger.isEnabledFor(logging.DEBUG)
+        for _ in xrange(MAX_BATCH):
+            try:
+                msg = self.socket.recv(4096)
+            except socket.error as err:
+                if not would_block(err):
+                    self.error()
+                return
+            if debug:
+                logger.debug("IfaceMgr {}-{} ({}) received a packet".format(
+                    self.dev, self.port, self.iface_name))
+            if nano_mgr is not None:
+                nano_mgr.forward(msg, self.port)
+                self.rx_ctr += 1
 
     def get_mac(self):
         try:
@@ -222,40 +304,114 @@ class IfaceMgr(threading.Thread):
         logger.debug("IfaceMgr {}-{} ({}) status set to DOWN".format(
                      self.dev, self.port, self.iface_name))
 
-    def run(self):
-        # run this loop in case the interface goes down by external action
-        # or the interface disappears
-        while True:
-            # wait until the port goes up
-            while True:
-                if if_exists(self.iface_name) and get_if_status(self.iface_name):
-                    break
-                time.sleep(1)
+    def open(self):
+        """
+        Open the AF_PACKET socket if the interface exists and is up
+        """
+        if self.socket is not None:
+            return
+        if not (if_exists(self.iface_name) and get_if_status(self.iface_name)):
+            return
+        logger.debug("IfaceMgr {}-{} ({}) status changed to UP".format(
+                     self.dev, self.port, self.iface_name))
+        s = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(0x03))
+        try:
+            if self.iface_rcv_buf != 0:
+                s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.iface_rcv_buf)
 
-            logger.debug("IfaceMgr {}-{} ({}) status changed to UP".format(
+            if self.iface_snd_buf  != 0:
+                s.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.iface_snd_buf)
+
+            s.bind((self.iface_name, 0))
+        except socket.error:
+            logger.debug("IfaceMgr {}-{} ({}) cannot open AF_PACKET socket".format(
                          self.dev, self.port, self.iface_name))
-            try:
-                self.socket = socket.socket(socket.AF_PACKET, socket.SOCK_RAW,
-                                            socket.htons(0x03))
-                if self.iface_rcv_buf != 0:
-                    self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.iface_rcv_buf)
-
-                if self.iface_snd_buf  != 0:
-                    self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.iface_snd_buf)
-
-                self.socket.bind((self.iface_name, 0))
-                logger.debug("IfaceMgr {}-{} ({}) AF_PACKET socket is open".format(
-                             self.dev, self.port, self.iface_name))
-                while True:
-                    msg = self.socket.recv(4096)
-                    self.received(msg)
-            except socket.error as err:
-                logger.debug("IfaceMgr {}-{} ({}) Error reading from the socket.".format(
-                             self.dev, self.port, self.iface_name))
-                self.socket.close()
+            s.close()
+            return
+        s.setblocking(0)
+        self.socket = s
+        self.loop.register(s.fileno(), self.readable)
+        logger.debug("IfaceMgr {}-{} ({}) AF_PACKET socket is open".format(
+                     self.dev, self.port, self.iface_name))
 
+    def close(self):
+        if self.socket is None:
+            return
+        self.loop.unregister(self.socket.fileno())
+        self.socket.close()
+        self.socket = None
 
-class NanomsgMgr(threading.Thread):
+    def error(self):
+        # the interface went down by external action or disappeared
+        logger.debug("IfaceMgr {}-{} ({}) Error reading from the socket.".format(
+                     self.dev, self.port, self.iface_name))
+        self.close()
+        # reopen now if the error was transient, otherwise on the next link
+        # notification
+        self.open()
+
+    def link_changed(self, exists, up):
+        if not exists:
+            self.close()
+        elif up:
+            self.open()
+
+
+class LinkMonitor(object):
+    """
+    Reopens the interface sockets when the links come back, using rtnetlink
+    notifications
+    """
+    def __init__(self, loop):
+        self.loop = loop
+        self.socket = socket.socket(AF_NETLINK, SOCK_DGRAM, NETLINK_ROUTE)
+        self.socket.bind((0, RTMGRP_LINK))
+        self.socket.setblocking(0)
+        loop.register(self.socket.fileno(), self.readable)
+
+    def readable(self):
+        try:
+            data = self.socket.recv(65536)
+        except socket.error as err:
+            if err.errno == errno.ENOBUFS:
+                # notifications were lost, check all the interfaces
+                for iface_mgr in iface_mgrs.values():
+                    iface_mgr.link_changed(if_exists(iface_mgr.iface_name), True)
+            elif not would_block(err):
+                raise
+            return
+
+        offset = 0
+        while offset + NLMSG_HDR.size <= len(data):
+            msg_len, msg_type, _, _, _ = NLMSG_HDR.unpack_from(data, offset)
+            if msg_len < NLMSG_HDR.size:
+                break
+            if msg_type in (RTM_NEWLINK, RTM_DELLINK):
+                self.handle_link(msg_type, data, offset + NLMSG_HDR.size,
+                                 offset + msg_len)
+            offset += nl_align(msg_len)
+
+    def handle_link(self, msg_type, data, offset, end):
+        _, _, _, flags, _ = IFINFOMSG.unpack_from(data, offset)
+        offset += IFINFOMSG.size
+        name = None
+        while offset + RTATTR_HDR.size <= end:
+            attr_len, attr_type = RTATTR_HDR.unpack_from(data, offset)
+            if attr_len < RTATTR_HDR.size:
+                break
+            if attr_type == IFLA_IFNAME:
+                name = data[offset + RTATTR_HDR.size:offset + attr_len].rstrip('\0')
+                break
+            offset += nl_align(attr_len)
+        if name is None:
+            return
+        for iface_mgr in iface_mgrs.values():
+            if iface_mgr.iface_name == name:
+                iface_mgr.link_changed(msg_type == RTM_NEWLINK,
+                                       flags & IFF_UP > 0)
+
+
+class NanomsgMgr(object):
     MSG_TYPE_PORT_ADD = 0
     MSG_TYPE_PORT_REMOVE = 1
     MSG_TYPE_PORT_SET_STATUS = 2
@@ -273,9 +429,7 @@ class NanomsgMgr(threading.Thread):
     MSG_INFO_STATUS_SUCCESS = 0
     MSG_INFO_STATUS_NOT_SUPPORTED = 1
 
-    def __init__(self, dev, socket_addr, nn_rcv_buf=0, nn_snd_buf=0):
-        threading.Thread.__init__(self)
-        self.daemon = True
+    def __init__(self, loop, dev, socket_addr, nn_rcv_buf=0, nn_snd_buf=0):
         self.dev = dev
         self.socket_addr = socket_addr
         self.socket = nnpy.Socket(nnpy.AF_SP, nnpy.PAIR)
@@ -284,20 +438,60 @@ class NanomsgMgr(threading.Thread):
         if nn_snd_buf != 0:
             self.socket.setsockopt(nnpy.SOL_SOCKET, nnpy.SNDBUF, nn_snd_buf)
         self.socket.bind(socket_addr)
+        self.loop = loop
+        # readable when messages are queued in the socket
+        loop.register(self.socket.getsockopt(nnpy.SOL_SOCKET, nnpy.RCVFD),
+                      self.readable)
+        # readable when the socket can send, only registered while messages
+        # are waiting in the backlog
+        self.sndfd = self.socket.getsockopt(nnpy.SOL_SOCKET, nnpy.SNDFD)
+        self.backlog = deque(maxlen=MAX_NN_BACKLOG)
 
     def forward(self, p, port):
-        msg = struct.pack("<iii{}s".format(len(p)), self.MSG_TYPE_PACKET_OUT,
-                          port, len(p), p)
+        msg = MSG_HDR.pack(self.MSG_TYPE_PACKET_OUT, port, len(p)) + p
         # because nnpy expects unicode when using str
         msg = list(msg)
-        self.socket.send(msg)
+        self.send(msg)
+
+    def send(self, msg):
+        """
+        Send a message without blocking the event loop. When the peer doesn't
+        keep up, the message is queued until the socket can send again.
+        """
+        if not self.backlog and self.try_send(msg):
+            return
+        if len(self.backlog) == self.backlog.maxlen:
+            logger.debug("NanomsgMgr {} ({}) send queue full, dropping oldest message".format(
+                self.dev, self.socket_addr))
+        elif not self.backlog:
+            self.loop.register(self.sndfd, self.writable)
+        self.backlog.append(msg)
+
+    def try_send(self, msg):
+        try:
+            self.socket.send(msg, nnpy.DONTWAIT)
+        except nnpy.errors.NNError as err:
+            if err.error_no != errno.EAGAIN:
+                raise
+            return False
+        return True
+
+    def writable(self):
+        """
+        Send the queued messages, until the socket can't send
+        """
+        while self.backlog:
+            if not self.try_send(self.backlog[0]):
+                return
+            self.backlog.popleft()
+        self.loop.unregister(self.sndfd)
 
     def handle_info_req(self, port_number, info_id, msg):
         def handle_not_supported():
             fmt = "<iiii"
             rep = struct.pack(fmt, self.MSG_TYPE_INFO_REP, port_number, info_id,
                               self.MSG_INFO_STATUS_NOT_SUPPORTED)
-            self.socket.send(rep)
+            self.send(rep)
 
         def handle_hwaddr():
             if (self.dev, port_number) not in iface_mgrs:
@@ -308,7 +502,7 @@ class NanomsgMgr(threading.Thread):
                 fmt = "<iiii{}s".format(len(mac))
                 rep = struct.pack(fmt, self.MSG_TYPE_INFO_REP, port_number,
                                   info_id, self.MSG_INFO_STATUS_SUCCESS, mac)
-                self.socket.send(rep)
+                self.send(rep)
 
         def handle_ctrs():
             if (self.dev, port_number) not in iface_mgrs:
@@ -319,7 +513,7 @@ class NanomsgMgr(threading.Thread):
                 fmt = "<iiiiii"
                 rep = struct.pack(fmt, self.MSG_TYPE_INFO_REP, port_number,
                                   info_id, self.MSG_INFO_STATUS_SUCCESS, rx, tx)
-                self.socket.send(rep)
+                self.send(rep)
 
         handlers = {
             self.MSG_INFO_TYPE_HWADDR: handle_hwaddr,
@@ -336,27 +530,32 @@ class NanomsgMgr(threading.Thread):
             elif status == self.MSG_PORT_STATUS_DOWN:
                 iface_mgr.port_down()
 
-    def run(self):
-        while True:
-            msg = self.socket.recv()
-            fmt = "<iii"
-            msg_type, port_number, more = struct.unpack_from(fmt, msg)
-            hdr_size = struct.calcsize(fmt)
-            msg = msg[hdr_size:]
-            if msg_type == self.MSG_TYPE_INFO_REQ:
-                self.handle_info_req(port_number, more, msg)
-                continue
-            if msg_type == self.MSG_TYPE_PORT_SET_STATUS:
+    def readable(self):
+        """
+        Handle the queued messages, at most MAX_BATCH
+        """
+        debug = logger.isEnabledFor(logging.DEBUG)
+        for _ in xrange(MAX_BATCH):
+            try:
+                msg = self.socket.recv(nnpy.DONTWAIT)
+            except nnpy.errors.NNError as err:
+                if err.error_no != errno.EAGAIN:
+                    raise
+                return
+            msg_type, port_number, more = MSG_HDR.unpack_from(msg)
+            if msg_type == self.MSG_TYPE_PACKET_IN:
+                msg = msg[MSG_HDR.size:]
+                assert (len(msg) == more)
+                if debug:
+                    logger.debug("NanomsgMgr {}-{} ({}) received a packet".format(
+                        self.dev, port_number, self.socket_addr))
+                iface_mgr = iface_mgrs.get((self.dev, port_number))
+                if iface_mgr is not None:
+                    iface_mgr.forward(msg)
+            elif msg_type == self.MSG_TYPE_INFO_REQ:
+                self.handle_info_req(port_number, more, msg[MSG_HDR.size:])
+            elif msg_type == self.MSG_TYPE_PORT_SET_STATUS:
                 self.handle_set_status_req(port_number, more)
-                continue
-            if msg_type != self.MSG_TYPE_PACKET_IN:
-                continue
-            assert (len(msg) == more)
-            logger.debug("NanomsgMgr {}-{} ({}) received a packet".format(
-                self.dev, port_number, self.socket_addr))
-            if (self.dev, port_number) in iface_mgrs:
-                iface_mgr = iface_mgrs[(self.dev, port_number)]
-                iface_mgr.forward(msg)
 
 def main():
     if args.verbose:
@@ -364,18 +563,20 @@ def main():
     else:
         logger.setLevel(logging.INFO)
 
+    loop = EventLoop()
+    # subscribe to the link notifications before checking the interfaces
+    LinkMonitor(loop)
     for dev, port, iface in args.interfaces:
-        i = IfaceMgr(dev, port, iface, args.iface_rcv_buf, args.iface_snd_buf)
-        i.start()
+        i = IfaceMgr(loop, dev, port, iface, args.iface_rcv_buf, args.iface_snd_buf)
         iface_mgrs[(dev, port)] = i
     for dev, addr in args.device_sockets:
-        n = NanomsgMgr(dev, addr, args.nn_rcv_buf, args.nn_snd_buf)
-        n.start()
+        n = NanomsgMgr(loop, dev, addr, args.nn_rcv_buf, args.nn_snd_buf)
         nano_mgrs[dev] = n
+    for i in iface_mgrs.values():
+        i.open()
     logger.info("READY")
     try:
-        while True:
-            time.sleep(1)
+        loop.run()
     except KeyboardInterrupt:
         return
 
@@ -6,15 +6,27 @@ in the data returned by recv. Instead, it delivers the VLAN TCI in a control
 message. Python 2.x doesn't have built-in support for recvmsg, so we have to
 use ctypes to call it. The recv function exported by this module reconstructs
 the VLAN tag if it was offloaded.
+
+The RxRing class exported by this module receives packets from a memory-mapped
+TPACKET_V3 ring instead, without a system call and a buffer allocation for
+every packet. The send_many function sends a batch of packets with sendmmsg.
 """
 
+import errno
+import mmap
+import select
 import socket
 import struct
 from ctypes import *
 
 ETH_P_8021Q = 0x8100
 SOL_PACKET = 263
+PACKET_RX_RING = 5
 PACKET_AUXDATA = 8
+PACKET_VERSION = 10
+TPACKET_V3 = 2
+TP_STATUS_KERNEL = 0
+TP_STATUS_USER = 1 << 0
 TP_STATUS_VLAN_VALID = 1 << 4
 
 class struct_iovec(Structure):
@@ -52,10 +64,72 @@ class struct_tpacket_auxdata(Structure):
         ("tp_padding", c_ushort),
     ]
 
-libc = CDLL("libc.so.6")
+class struct_tpacket_req3(Structure):
+    _fields_ = [
+        ("tp_block_size", c_uint),
+        ("tp_block_nr", c_uint),
+        ("tp_frame_size", c_uint),
+        ("tp_frame_nr", c_uint),
+        ("tp_retire_blk_tov", c_uint),
+        ("tp_sizeof_priv", c_uint),
+        ("tp_feature_req_word", c_uint),
+    ]
+
+class struct_tpacket_bd_ts(Structure):
+    _fields_ = [
+        ("ts_sec", c_uint),
+        ("ts_nsec", c_uint),
+    ]
+
+class struct_tpacket_block_desc(Structure):
+    _fields_ = [
+        ("version", c_uint32),
+        ("offset_to_priv", c_uint32),
+        ("block_status", c_uint32),
+        ("num_pkts", c_uint32),
+        ("offset_to_first_pkt", c_uint32),
+        ("blk_len", c_uint32),
+        ("seq_num", c_uint64),
+        ("ts_first_pkt", struct_tpacket_bd_ts),
+        ("ts_last_pkt", struct_tpacket_bd_ts),
+    ]
+
+class struct_tpacket3_hdr(Structure):
+    _fields_ = [
+        ("tp_next_offset", c_uint32),
+        ("tp_sec", c_uint32),
+        ("tp_nsec", c_uint32),
+        ("tp_snaplen", c_uint32),
+        ("tp_len", c_uint32),
+        ("tp_status", c_uint32),
+        ("tp_mac", c_uint16),
+        ("tp_net", c_uint16),
+        ("tp_rxhash", c_uint32),
+        ("tp_vlan_tci", c_uint32),
+        ("tp_vlan_tpid", c_uint16),
+        ("tp_padding", c_uint16),
+        ("tp_padding2", c_uint8 * 8),
+    ]
+
+class struct_mmsghdr(Structure):
+    _fields_ = [
+        ("msg_hdr", struct_msghdr),
+        ("msg_len", c_uint),
+    ]
+
+libc = CDLL("libc.so.6", use_errno=True)
 recvmsg = libc.recvmsg
 recvmsg.argtypes = [c_int, POINTER(struct_msghdr), c_int]
 recvmsg.retype = c_int
+sendmmsg = libc.sendmmsg
+sendmmsg.argtypes = [c_int, POINTER(struct_mmsghdr), c_uint, c_int]
+sendmmsg.restype = c_int
+
+# Maximum number of messages the kernel accepts in one sendmmsg call
+UIO_MAXIOV = 1024
+
+# Time in ms send_many waits for a full socket to be writable again
+SEND_POLL_TIMEOUT = 100
 
 def enable_auxdata(sk):
     """
@@ -110,3 +184,152 @@ def recv(sk, bufsize):
         return buf.raw[:12] + tag + buf.raw[12:rv]
     else:
         return buf.raw[:rv]
+
+def send_many(sk, packets):
+    """
+    Send packets to an AF_PACKET socket with as few system calls as possible
+    @sk Socket
+    @packets List of packets
+    @retval List of the number of bytes sent for every packet
+    """
+    sent = []
+    poller = None
+    for first in range(0, len(packets), UIO_MAXIOV):
+        batch = packets[first:first + UIO_MAXIOV]
+        bufs = [create_string_buffer(pkt, len(pkt)) for pkt in batch]
+        iovs = (struct_iovec * len(batch))()
+        msgs = (struct_mmsghdr * len(batch))()
+        for i, buf in enumerate(bufs):
+            iovs[i].iov_base = cast(buf, c_void_p)
+            iovs[i].iov_len = len(batch[i])
+            msgs[i].msg_hdr.msg_iov = pointer(iovs[i])
+            msgs[i].msg_hdr.msg_iovlen = 1
+
+        done = 0
+        while done < len(batch):
+            first_msg = cast(addressof(msgs) + done * sizeof(struct_mmsghdr),
+                             POINTER(struct_mmsghdr))
+            rv = sendmmsg(sk.fileno(), first_msg, len(batch) - done, 0)
+            if rv < 0:
+                err = get_errno()
+                if err not in (errno.EAGAIN, errno.ENOBUFS):
+                    raise RuntimeError("sendmmsg failed: errno=%d" % err)
+                # The socket is non-blocking, wait until the queue drains
+                # and retry from the first packet not sent
+                if poller is None:
+                    poller = select.poll()
+                    poller.register(sk.fileno(), select.POLLOUT)
+                poller.poll(SEND_POLL_TIMEOUT)
+                continue
+            done += rv
+        sent.extend(msg.msg_len for msg in msgs)
+    return sent
+
+class RxRing(object):
+    """
+    Memory-mapped TPACKET_V3 receive ring of an AF_PACKET socket
+
+    The kernel fills blocks of the ring with packets and hands a block over
+    when it is full or when its retire timeout expires. The socket is
+    readable as long as a block is owned by user space.
+    """
+
+    def __init__(self, sk, block_size=1 << 18, block_nr=16, frame_size=2048,
+                 retire_blk_tov=10):
+        """
+        Set up the ring. Must be called on the socket before afpacket.RxRing.recv.
+        @sk Socket
+        @block_size Size of a block in bytes, a multiple of the page size
+        @block_nr Number of blocks in the ring, the ring memory is locked
+        so the default ring is kept small (4 MB)
+        @frame_size Maximum packet size including the TPACKET_V3 header
+        @retire_blk_tov Timeout in ms after which a partially filled block
+        is handed over to user space
+        """
+        sk.setsockopt(SOL_PACKET, PACKET_VERSION, TPACKET_V3)
+
+        req = struct_tpacket_req3()
+        req.tp_block_size = block_size
+        req.tp_block_nr = block_nr
+        req.tp_frame_size = frame_size
+        req.tp_frame_nr = (block_size // frame_size) * block_nr
+        req.tp_retire_blk_tov = retire_blk_tov
+        req.tp_sizeof_priv = 0
+        req.tp_feature_req_word = 0
+        sk.setsockopt(SOL_PACKET, PACKET_RX_RING, string_at(addressof(req), sizeof(req)))
+
+        self.block_size = block_size
+        self.block_nr = block_nr
+        self.ring = mmap.mmap(sk.fileno(), block_size * block_nr,
+                              mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+        self.buf = (c_char * (block_size * block_nr)).from_buffer(self.ring)
+        try:
+            self.view = memoryview(self.ring)
+        except TypeError:
+            # mmap doesn't export a buffer to memoryview in Python 2.x
+            self.view = memoryview(self.buf)
+
+        self.block = 0
+        self.desc = None
+        self.pkts_left = 0
+        self.offset = 0
+
+    def close(self):
+        """
+        Unmap the ring
+        """
+        self.desc = None
+        self.view = None
+        self.buf = None
+        self.ring.close()
+
+    def _release_block(self):
+        """
+        Hand the current block back to the kernel and move to the next one
+        """
+        self.desc.block_status = TP_STATUS_KERNEL
+        self.desc = None
+        self.block = (self.block + 1) % self.block_nr
+
+    def recv(self):
+        """
+        Receive the next packet from the ring without copying it
+        @retval (packet data, VLAN TCI or None, timestamp) or None if the
+        ring is empty. The packet data is a memoryview of the ring which is
+        only valid until the next call.
+        """
+        while True:
+            if self.desc is None:
+                desc = struct_tpacket_block_desc.from_buffer(self.buf, self.block * self.block_size) # pylint: disable=E1101
+                if not desc.block_status & TP_STATUS_USER:
+                    return None
+                self.desc = desc
+                self.pkts_left = desc.num_pkts
+                self.offset = self.block * self.block_size + desc.offset_to_first_pkt
+
+            if self.pkts_left == 0:
+                # The previous packet was handed out, the block can be reused
+                self._release_block()
+                continue
+
+            hdr = struct_tpacket3_hdr.from_buffer(self.buf, self.offset) # pylint: disable=E1101
+            start = self.offset + hdr.tp_mac
+            pkt = self.view[start:start + hdr.tp_snaplen]
+            if hdr.tp_vlan_tci != 0 or hdr.tp_status & TP_STATUS_VLAN_VALID:
+                vlan_tci = hdr.tp_vlan_tci
+            else:
+                vlan_tci = None
+            timestamp = hdr.tp_sec + hdr.tp_nsec * 1e-9
+
+            self.offset += hdr.tp_next_offset
+            self.pkts_left -= 1
+            return (pkt, vlan_tci, timestamp)
+
+def insert_vlan_tag(pkt, vlan_tci):
+    """
+    Reconstruct the VLAN tag of a packet received with VLAN offload
+    @pkt Packet data memoryview
+    @vlan_tci VLAN TCI
+    """
+    tag = struct.pack("!HH", ETH_P_8021Q, vlan_tci)
+    return pkt[:12].tobytes() + tag + pkt[12:].tobytes()
@@ -22,13 +22,16 @@ import select
 import logging
 import struct
 from collections import defaultdict
+from collections import deque
+from itertools import count
 from threading import Thread
 from threading import Lock
 from threading import Condition
 import ptfutils
 import netutils
 import mask
-from pcap_writer import PcapWriter
+import profiler
+from pcap_writer import AsyncPcapWriter
 
 try:
     import nnpy
@@ -68,6 +71,20 @@ def match_exp_pkt(exp_pkt, pkt):
         p = p[:len(e)]
     return e == p
 
+def match_exp_pkts(exp_pkt, pkts):
+    """
+    Match a list of packets against exp_pkt, like match_exp_pkt.
+    @retval List of booleans, True for every packet which matches
+    """
+    if isinstance(exp_pkt, mask.Mask):
+        if not exp_pkt.is_valid():
+            return [False] * len(pkts)
+        return exp_pkt.match_many(pkts)
+    e = str(exp_pkt)
+    if len(e) < 60:
+        return [str(pkt)[:len(e)] == e for pkt in pkts]
+    return [str(pkt) == e for pkt in pkts]
+
 
 class DataPlanePacketSourceIface:
     """
@@ -171,6 +188,14 @@ class DataPlanePortLinux(DataPlanePortIface, DataPlanePacketSourceIface):
         """
         return self.socket.send(packet)
 
+    def send_burst(self, packets):
+        """
+        Send packets out this port with as few system calls as possible.
+        @param packets List of packet data to send to the port
+        @retval List of the number of bytes sent for every packet
+        """
+        return afpacket.send_many(self.socket, packets)
+
     def down(self):
         """
         Bring the physical link down.
@@ -190,6 +215,67 @@ class DataPlanePortLinux(DataPlanePortIface, DataPlanePacketSourceIface):
         return netutils.get_mac(self.interface_name)
 
 
+class DataPlanePortMmap(DataPlanePortLinux):
+    """
+    Uses raw sockets with a memory-mapped TPACKET_V3 receive ring to capture
+    packets on a network interface, and regular sends to send packets.
+
+    Select with config.dataplane.portclass = "mmap". The ring size can be set
+    with config.dataplane.port_options = {"ring_size": <bytes>}.
+    """
+
+    RING_BLOCK_SIZE = 1 << 18
+    RING_SIZE_DEFAULT = 4 << 20
+
+    def __init__(self, interface_name, device_number, port_number,
+                 ring_size=RING_SIZE_DEFAULT):
+        """
+        @param interface_name The name of the physical interface like eth1
+        @param ring_size Size of the receive ring in bytes, rounded down to
+        a number of ring blocks
+        """
+        DataPlanePortLinux.__init__(self, interface_name, device_number,
+                                    port_number)
+        self.ring = afpacket.RxRing(
+            self.socket, block_size=self.RING_BLOCK_SIZE,
+            block_nr=max(1, ring_size // self.RING_BLOCK_SIZE))
+
+    def __del__(self):
+        if getattr(self, "ring", None):
+            self.ring.close()
+        DataPlanePortLinux.__del__(self)
+
+    def recv(self):
+        """
+        Receive a packet from this port.
+        @retval (device, port, packet data, timestamp) or None if the ring
+        is empty
+        """
+        t = self.ring.recv()
+        if t is None:
+            return None
+        pkt, vlan_tci, timestamp = t
+        # The ring memory is reused by the kernel, the packet has to be
+        # copied before it is queued.
+        if vlan_tci is not None:
+            pkt = afpacket.insert_vlan_tag(pkt, vlan_tci)
+        else:
+            pkt = pkt.tobytes()
+        return (self.device_number, self.port_number, pkt, timestamp)
+
+    def recv_burst(self):
+        """
+        Receive all packets available in the ring of this port.
+        @retval List of (device, port, packet data, timestamp)
+        """
+        burst = []
+        while True:
+            t = self.recv()
+            if t is None:
+                return burst
+            burst.append(t)
+
+
 class DataPlanePacketSourceNN(DataPlanePacketSourceIface):
     """
     Wrapper class around nnpy used to capture data packets, send data packets
@@ -513,15 +599,38 @@ class DataPlane(Thread):
 
     MAX_QUEUE_LEN = 100
 
+    # interval in seconds between batches of rate limited bursts
+    BURST_INTERVAL = 0.001
+
+    # port classes which can be selected by name with config.dataplane.portclass
+    PORT_CLASSES = {
+        "linux": DataPlanePortLinux,
+        "mmap": DataPlanePortMmap,
+    }
+
     def __init__(self, config=None):
         Thread.__init__(self)
 
         # dict from device number, port number to port object
         self.ports = {}
 
-        # dict from device number, port number to list of (timestamp, packet)
+        # dict from device number, port number to deque of
+        # (packet, timestamp, sequence number)
         self.packet_queues = {}
 
+        # dict from device number to deque of (port number, sequence number)
+        # in the order packets were received. Entries of packets which were
+        # already dequeued are skipped lazily.
+        self.arrivals = defaultdict(deque)
+        self.arrival_seq = count()
+
+        # packet sources to wait on, updated when a port is added
+        self.sources = {}
+        if hasattr(select, "epoll"):
+            self.poller = select.epoll()
+        else:
+            self.poller = None
+
         # counters of received packets (may include packets which were dropped due to queue overflow)
         self.rx_counters = defaultdict(int)
 
@@ -538,6 +647,9 @@ class DataPlane(Thread):
 
         self.logger = logging.getLogger("dataplane")
         self.pcap_writer = None
+        # counters of packets written to and dropped from closed pcap captures
+        self.pcap_written = 0
+        self.pcap_dropped = 0
 
 
         if config is None:
@@ -553,7 +665,8 @@ class DataPlane(Thread):
         #
         # Set config.dataplane.portclass = MyDataPlanePortClass
         # where MyDataPlanePortClass has the same interface as the class
-        # DataPlanePort defined here.
+        # DataPlanePort defined here, or to the name of a port class
+        # in PORT_CLASSES.
         #
         if self.config["platform"] == "nn":
             # assert is ok here because this is caught earlier in ptf
@@ -561,6 +674,8 @@ class DataPlane(Thread):
             self.dppclass = DataPlanePortNN
         elif "dataplane" in self.config and "portclass" in self.config["dataplane"]:
             self.dppclass = self.config["dataplane"]["portclass"]
+            if self.dppclass in self.PORT_CLASSES:
+                self.dppclass = self.PORT_CLASSES[self.dppclass]
         elif "linux" in sys.platform:
             self.dppclass = DataPlanePortLinux
         elif have_pypcap:
@@ -569,6 +684,10 @@ class DataPlane(Thread):
             self.logger.warning("Missing pypcap, VLAN tests may fail. See README for installation instructions.")
             self.dppclass = DataPlanePort
 
+        # keyword arguments of the port class,
+        # set with config.dataplane.port_options
+        self.port_options = self.config.get("dataplane", {}).get("port_options", {})
+
         if "qlen" in self.config:
             self.qlen = self.config["qlen"]
         else:
@@ -576,49 +695,103 @@ class DataPlane(Thread):
 
         self.start()
 
+    def _register_source(self, source):
+        """
+        Start waiting for packets on the packet source
+        """
+        if source.fileno() in self.sources:
+            return
+        self.sources[source.fileno()] = source
+        if self.poller is not None:
+            self.poller.register(source.fileno(), select.EPOLLIN)
+
+    def _wait_sources(self, timeout):
+        """
+        Wait for packet sources ready to be read
+        @param timeout Time to wait in seconds
+        @retval List of ready packet sources
+        """
+        if self.poller is not None:
+            events = self.poller.poll(timeout)
+            return [self.sources[fd] for fd, _ in events if fd in self.sources]
+        sel_in, _, _ = select.select(list(self.sources.values()), [], [], timeout)
+        return sel_in
+
+    def _enqueue(self, device_number, port_number, pkt, timestamp):
+        """
+        Enqueue the received packet. The cvar must already be acquired.
+        """
+        port_id = (device_number, port_number)
+        queue = self.packet_queues[port_id]
+        if len(queue) == queue.maxlen:
+            # Queue full, the deque throws away oldest
+            self.logger.debug("Discarding oldest packet to make room")
+        seq = next(self.arrival_seq)
+        queue.append((pkt, timestamp, seq))
+        arrivals = self.arrivals[device_number]
+        arrivals.append((port_number, seq))
+        self.rx_counters[port_id] += 1
+
+        # Too many entries of already dequeued packets, rebuild the index
+        if len(arrivals) > 2 * self.qlen * len(self.packet_queues):
+            self._rebuild_arrivals(device_number)
+
+    def _rebuild_arrivals(self, device_number):
+        """
+        Rebuild the arrival index of the device from its packet queues
+        """
+        entries = [(seq, port_id[1])
+                   for port_id, queue in self.packet_queues.items()
+                   if port_id[0] == device_number
+                   for (_, _, seq) in queue]
+        entries.sort()
+        self.arrivals[device_number] = deque(
+            (port_number, seq) for seq, port_number in entries)
+
     def run(self):
         """
         Activity function for class
         """
+        self._register_source(self.waker)
         while not self.killed:
-            sockets = set([p.get_packet_source() for p in self.ports.values()])
-            sockets.add(self.waker)
             try:
-                sel_in, sel_out, sel_err = select.select(sockets, [], [], 1)
+                ready = self._wait_sources(1)
             except:
                 print sys.exc_info()
-                self.logger.error("Select error, exiting")
+                self.logger.error("Poll error, exiting")
                 break
 
             with self.cvar:
-                for sel in sel_in:
-                    if sel == self.waker:
+                for source in ready:
+                    if source == self.waker:
                         self.waker.wait()
                         continue
                     else:
-                        # Enqueue packet
-                        t = sel.recv()
-                        if t is None:
-                            continue
-                        device_number, port_number, pkt, timestamp = t
-                        self.logger.debug("Pkt len %d in on device %d, port %d",
-                                          len(pkt), device_number, port_number)
-                        if self.pcap_writer:
-                            self.pcap_writer.write(pkt, timestamp,
-                                                   device_number, port_number)
-                        queue = self.packet_queues[(device_number, port_number)]
-                        if len(queue) >= self.qlen:
-                            # Queue full, throw away oldest
-                            queue.pop(0)
-                            self.logger.debug("Discarding oldest packet to make room")
-                        queue.append((pkt, timestamp))
-                        self.rx_counters[(device_number, port_number)] += 1
+                        # Enqueue packets, all of them at once if the source
+                        # can receive bursts
+                        if hasattr(source, "recv_burst"):
+                            burst = source.recv_burst()
+                        else:
+                            t = source.recv()
+                            burst = [t] if t is not None else []
+                        for device_number, port_number, pkt, timestamp in burst:
+                            self.logger.debug("Pkt len %d in on device %d, port %d",
+                                              len(pkt), device_number, port_number)
+                            if self.pcap_writer:
+                                self.pcap_writer.write(pkt, timestamp,
+                                                       device_number, port_number)
+                            self._enqueue(device_number, port_number, pkt, timestamp)
                 self.cvar.notify_all()
 
+        if self.poller is not None:
+            self.poller.close()
         self.logger.info("Thread exit")
 
     def set_qlen(self, qlen):
-        self.qlen = qlen
+        with self.cvar:
+            self.qlen = qlen
+            for port_id, queue in self.packet_queues.items():
+                self.packet_queues[port_id] = deque(queue, maxlen=qlen)
 
     def port_add(self, interface_name, device_number, port_number):
         """
@@ -630,10 +803,13 @@ class DataPlane(Thread):
         """
         port_id = (device_number, port_number)
         self.ports[port_id] = self.dppclass(interface_name,
-                                            device_number, port_number)
+                                            device_number, port_number,
+                                            **self.port_options)
         self.ports[port_id]._port_number = port_number
         self.ports[port_id]._device_number = device_number
-        self.packet_queues[port_id] = []
+        with self.cvar:
+            self.packet_queues[port_id] = deque(maxlen=self.qlen)
+            self._register_source(self.ports[port_id].get_packet_source())
         # Need to wake up event loop to change the sockets being selected on.
         self.waker.notify()
 
@@ -650,25 +826,73 @@ class DataPlane(Thread):
                                    device_number, port_number)
         bytes = self.ports[(device_number, port_number)].send(packet)
         self.tx_counters[(device_number, port_number)] += 1
+        profiler.record_send()
         if bytes != len(packet):
             self.logger.error("Unhandled send error, length mismatch %d != %d" %
                      (bytes, len(packet)))
         return bytes
 
+    def send_burst(self, device_number, port_number, packets, pps=None):
+        """
+        Send packets to the given port, in batches of system calls if the
+        port supports it
+        @param device_number, port_number The port to send the data to
+        @param packets List of raw packet data to send to port
+        @param pps Target rate in packets per second, or None to send as
+        fast as possible
+        @retval Total number of bytes sent
+        """
+        port_id = (device_number, port_number)
+        port = self.ports[port_id]
+        self.logger.debug("Sending %d packets to device %d, port %d" %
+                          (len(packets), device_number, port_number))
+
+        if pps:
+            batch_size = max(1, min(len(packets), int(pps * self.BURST_INTERVAL)))
+        else:
+            batch_size = len(packets)
+
+        total = 0
+        start = time.time()
+        for first in range(0, len(packets), batch_size):
+            batch = packets[first:first + batch_size]
+            if pps:
+                # Wait for the time the first packet of the batch is due
+                delay = start + first / float(pps) - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+            if self.pcap_writer:
+                now = time.time()
+                for packet in batch:
+                    self.pcap_writer.write(packet, now,
+                                           device_number, port_number)
+            if hasattr(port, "send_burst"):
+                sent = port.send_burst(batch)
+            else:
+                sent = [port.send(packet) for packet in batch]
+            self.tx_counters[port_id] += len(batch)
+            for packet, bytes in zip(batch, sent):
+                if bytes != len(packet):
+                    self.logger.error("Unhandled send error, length mismatch %d != %d" %
+                                      (bytes, len(packet)))
+            total += sum(sent)
+        profiler.record_send(len(packets))
+        return total
+
     def oldest_port_number(self, device):
         """
         Returns the port number with the oldest packet,
         or None if no packets are queued.
         """
-        min_port_number = None
-        min_time = float('inf')
-        for (port_id, queue) in self.packet_queues.items():
-            if port_id[0] != device:
-                continue
-            if queue and queue[0][1] < min_time:
-                min_time = queue[0][1]
-                min_port_number = port_id[1]
-        return min_port_number
+        arrivals = self.arrivals[device]
+        while arrivals:
+            port_number, seq = arrivals[0]
+            queue = self.packet_queues.get((device, port_number))
+            if queue and queue[0][2] == seq:
+                return port_number
+            # The packet was already dequeued or discarded
+            arrivals.popleft()
+        return None
 
     # Dequeues and yields packets in the order they were received.
     # Yields (port, packet, received time).
@@ -691,7 +915,7 @@ class DataPlane(Thread):
                                   device, rcv_port)
                 break
 
-            pkt, time = queue.pop(0)
+            pkt, time, _ = queue.popleft()
             yield (rcv_port, pkt, time)
 
     def poll(self, device_number=0, port_number=None, timeout=-1, exp_pkt=None, filters=[]):
@@ -740,8 +964,10 @@ class DataPlane(Thread):
             self.logger.debug("Did not find packet")
             return None
 
+        start = time.time()
         with self.cvar:
             ret = ptfutils.timed_wait(self.cvar, grab, timeout=timeout)
+        profiler.record_poll(time.time() - start, ret is None)
 
         if ret != None:
             return ret
@@ -786,16 +1012,39 @@ class DataPlane(Thread):
         """
         Drop any queued packets.
         """
-        for port_id in self.packet_queues.keys():
-            self.packet_queues[port_id] = []
+        with self.cvar:
+            for queue in self.packet_queues.values():
+                queue.clear()
+            self.arrivals.clear()
 
     def start_pcap(self, filename):
         assert(self.pcap_writer == None)
-        self.pcap_writer = PcapWriter(filename)
+        self.pcap_writer = AsyncPcapWriter(filename)
 
     def stop_pcap(self):
         if self.pcap_writer:
             with self.cvar:
-                self.pcap_writer.close()
+                pcap_writer = self.pcap_writer
                 self.pcap_writer = None
                 self.cvar.notify_all()
+            # Wait for the writer thread without blocking the receive thread
+            pcap_writer.close()
+            self.pcap_written += pcap_writer.written
+            self.pcap_dropped += pcap_writer.dropped
+            if pcap_writer.dropped:
+                self.logger.warning("Dropped %d of %d packets from the pcap capture",
+                                    pcap_writer.dropped,
+                                    pcap_writer.written + pcap_writer.dropped)
+
+    def pcap_counters(self):
+        """
+        Return the number of packets written to and dropped from pcap
+        captures since the dataplane was created.
+        @retval (written, dropped)
+        """
+        written, dropped = self.pcap_written, self.pcap_dropped
+        pcap_writer = self.pcap_writer
+        if pcap_writer:
+            written += pcap_writer.written
+            dropped += pcap_writer.dropped
+        return (written, dropped)
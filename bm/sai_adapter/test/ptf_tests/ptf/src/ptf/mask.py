@@ -1,19 +1,34 @@
+from binascii import hexlify
+
 import packet as scapy
 
+def _to_int(data):
+    """
+    Return the packet bytes as a single big integer, so that a whole packet
+    can be masked and compared at once
+    """
+    if not data:
+        return 0
+    return int(hexlify(data), 16)
+
 class Mask:
     def __init__(self, exp_pkt):
         self.exp_pkt = exp_pkt
-        self.size = len(str(exp_pkt))
+        self.exp_str = str(exp_pkt)
+        self.size = len(self.exp_str)
         self.valid = True
         self.mask = [0xff] * self.size
+        self._compiled = None
 
     def set_do_not_care(self, offset, bitwidth):
-        # a very naive but simple method
-        # we do it bit by bit :)
-        for idx in xrange(offset, offset + bitwidth):
-            offsetB = idx / 8
-            offsetb = idx % 8
-            self.mask[offsetB] = self.mask[offsetB] & (~(1 << (7 - offsetb)))
+        # clear the bits of every byte spanned by the field at once
+        end = offset + bitwidth
+        for offsetB in xrange(offset / 8, (end + 7) / 8):
+            lo = max(offset, offsetB * 8)
+            hi = min(end, offsetB * 8 + 8)
+            bits = ((1 << (hi - lo)) - 1) << (offsetB * 8 + 8 - hi)
+            self.mask[offsetB] = self.mask[offsetB] & (~bits & 0xff)
+        self._compiled = None
 
     def set_do_not_care_scapy(self, hdr_type, field_name):
         if hdr_type not in self.exp_pkt:
@@ -43,16 +58,63 @@ class Mask:
     def is_valid(self):
         return self.valid
 
+    def _compile(self):
+        """
+        Precompute the mask and the masked expected packet as integers
+        @retval (mask, masked expected packet), or None if no bit is masked
+        """
+        if self._compiled is None:
+            if all(b == 0xff for b in self.mask):
+                self._compiled = (None, None)
+            else:
+                mask = _to_int(''.join([chr(b) for b in self.mask]))
+                self._compiled = (mask, _to_int(self.exp_str) & mask)
+        return self._compiled
+
+    def hash_key(self):
+        """
+        Key to look up packets matching the mask in a hash table
+        @retval (bucket, key) where bucket is shared by all masks with the same
+        size and mask, and key is the masked expected packet
+        """
+        mask, exp = self._compile()
+        if mask is None:
+            return (self.size, None), self.exp_str
+        return (self.size, mask), exp
+
+    @staticmethod
+    def packet_key(bucket, pkt):
+        """
+        Key of a received packet of the bucket size, see hash_key
+        """
+        mask = bucket[1]
+        if mask is None:
+            return pkt
+        return _to_int(pkt) & mask
+
     def pkt_match(self, pkt):
         # just to be on the safe side
         pkt = str(pkt)
         if len(pkt) != self.size:
             return False
-        exp_pkt = str(self.exp_pkt)
-        for i in xrange(self.size):
-            if (ord(exp_pkt[i]) & self.mask[i]) != (ord(pkt[i]) & self.mask[i]):
-                return False
-        return True
+        mask, exp = self._compile()
+        if mask is None:
+            return pkt == self.exp_str
+        return _to_int(pkt) & mask == exp
+
+    def match_many(self, pkts):
+        """
+        Match a list of packets against the mask
+        @retval List of booleans, True for every packet which matches
+        """
+        mask, exp = self._compile()
+        size = self.size
+        pkts = [str(pkt) for pkt in pkts]
+        if mask is None:
+            exp_str = self.exp_str
+            return [pkt == exp_str for pkt in pkts]
+        return [len(pkt) == size and _to_int(pkt) & mask == exp
+                for pkt in pkts]
 
     def __str__(self):
         assert(self.valid)
@@ -68,5 +130,6 @@ def utest():
     assert(not m.pkt_match(p1))
     m.set_do_not_care_scapy(scapy.TCP, "chksum")
     assert(m.pkt_match(p1))
+    assert(m.match_many([p, p1, scapy.Ether()]) == [True, True, False])
 
 utest()
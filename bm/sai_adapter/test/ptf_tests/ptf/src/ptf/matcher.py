@@ -0,0 +1,230 @@
+"""
+Expected packet matcher
+
+PacketMatcher resolves a set of expected packets across the ports of a
+device in a single pass over the received packets, with a single deadline,
+instead of polling every port in turn with its own timeout.
+
+Expected packets are hashed once: exact packets by their bytes, masked
+packets by their masked bytes. Every received packet is then looked up in
+the hash tables instead of being compared with every expected packet.
+"""
+
+import time
+
+import mask
+import profiler
+
+EXPECT = 0
+ALLOW = 1
+FORBID = 2
+
+
+class Expectation:
+    """
+    Packet (or one of several packets) expected, allowed or forbidden on
+    a set of ports
+    """
+
+    def __init__(self, pkts, ports, kind, discard_all, strict=False):
+        self.pkts = pkts
+        self.ports = ports
+        self.kind = kind
+        self.discard_all = discard_all
+        self.strict = strict
+        # (port, packet) which matched the expectation
+        self.matched = None
+
+    def covers(self, port):
+        return self.ports is None or port in self.ports
+
+
+class PacketMatcher:
+    """
+    Matches the packets received on a device against expected packets
+
+    Usage:
+        matcher = PacketMatcher(test, device_number)
+        matcher.expect(pkt, ports=[1])
+        matcher.forbid(pkt, ports=[2, 3])
+        matcher.run(timeout=2, negative_timeout=0.1)
+        test.assertFalse(matcher.pending())
+    """
+
+    def __init__(self, test, device_number=0, filters=[]):
+        self.test = test
+        self.dataplane = test.dataplane
+        self.device_number = device_number
+        self.filters = filters
+        self.expectations = []
+        # dict from expected packet length to dict from packet to
+        # list of expectations
+        self.exact = {}
+        # dict from (packet length, mask) to dict from masked packet to
+        # list of expectations
+        self.masked = {}
+        # received packets which didn't match any expectation,
+        # list of (port, packet)
+        self.unexpected = []
+        # received packets which matched a forbidden packet,
+        # list of (port, packet)
+        self.forbidden = []
+        # other packets received on the ports of a pending strict
+        # expectation, list of (port, packet)
+        self.mismatched = []
+
+    def _add(self, pkts, ports, kind, discard_all=False, strict=False):
+        if not isinstance(pkts, (list, tuple)):
+            pkts = [pkts]
+        if ports is not None:
+            ports = set(ports)
+        e = Expectation(pkts, ports, kind, discard_all, strict)
+        self.expectations.append(e)
+
+        for pkt in pkts:
+            if isinstance(pkt, mask.Mask):
+                if not pkt.is_valid():
+                    # an invalid mask never matches
+                    continue
+                bucket, key = pkt.hash_key()
+                self.masked.setdefault(bucket, {}).setdefault(key, []).append(e)
+            else:
+                pkt = str(pkt)
+                self.exact.setdefault(len(pkt), {}).setdefault(pkt, []).append(e)
+        return e
+
+    def expect(self, pkts, ports=None, discard_all=False, strict=False):
+        """
+        Expect a packet, or any one of a list of packets, once on any of
+        the ports (any port of the device if ports is None).
+        While the packet is not received, other packets received on these
+        ports are discarded, or on all ports if discard_all is True.
+        If strict is True, other packets received on these ports are not
+        discarded but reported as mismatched, even with --relax.
+        """
+        return self._add(pkts, ports, EXPECT, discard_all, strict)
+
+    def allow(self, pkts, ports=None):
+        """
+        Accept any number of copies of the packets on the ports
+        """
+        return self._add(pkts, ports, ALLOW)
+
+    def forbid(self, pkts, ports=None):
+        """
+        Report the packets as forbidden if they are received on the ports.
+        Other packets received on these ports are discarded.
+        """
+        return self._add(pkts, ports, FORBID)
+
+    def pending(self):
+        """
+        @retval List of expectations not matched yet
+        """
+        return [e for e in self.expectations
+                if e.kind == EXPECT and e.matched is None]
+
+    def _candidates(self, pkt):
+        """
+        Yield the expectations of the packets which pkt matches
+        """
+        for length, table in self.exact.items():
+            # see match_exp_pkt, padding is ignored for short packets
+            if length < 60:
+                key = pkt[:length]
+            elif len(pkt) != length:
+                continue
+            else:
+                key = pkt
+            for e in table.get(key, ()):
+                yield e
+
+        for bucket, table in self.masked.items():
+            if len(pkt) != bucket[0]:
+                continue
+            for e in table.get(mask.Mask.packet_key(bucket, pkt), ()):
+                yield e
+
+    def _classify(self, port, pkt):
+        """
+        Match a received packet against the expectations
+        """
+        candidates = list(self._candidates(pkt))
+        for kind in (EXPECT, ALLOW, FORBID):
+            for e in candidates:
+                if e.kind != kind or not e.covers(port):
+                    continue
+                if kind == EXPECT:
+                    if e.matched is not None:
+                        continue
+                    e.matched = (port, pkt)
+                elif kind == FORBID:
+                    self.forbidden.append((port, pkt))
+                return
+
+        for e in self.expectations:
+            if e.strict and e.matched is None and e.covers(port):
+                self.mismatched.append((port, pkt))
+                return
+
+        for e in self.expectations:
+            if e.kind == ALLOW or (e.kind == EXPECT and e.matched is not None):
+                continue
+            if e.discard_all or e.covers(port):
+                # like DataPlane.poll with exp_pkt, drop other packets on
+                # the ports of pending and forbidden packets
+                return
+        self.unexpected.append((port, pkt))
+
+    def _drain(self, ports):
+        """
+        Classify all queued packets of the ports (all device ports if None)
+        """
+        if ports is None:
+            sources = [None]
+        else:
+            sources = ports
+        for source in sources:
+            for port, pkt, _ in self.dataplane.packets(self.device_number, source):
+                if not all(f(pkt) for f in self.filters):
+                    continue
+                self.test.at_receive(pkt, device_number=self.device_number,
+                                     port_number=port)
+                self._classify(port, pkt)
+
+    def _wait(self, deadline, done, ports):
+        start = time.time()
+        timed_out = False
+        with self.dataplane.cvar:
+            while True:
+                self._drain(ports)
+                if done():
+                    break
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    timed_out = True
+                    break
+                self.dataplane.cvar.wait(remaining)
+        profiler.record_poll(time.time() - start, timed_out)
+
+    def run(self, timeout=2, negative_timeout=0, ports=None,
+            allow_unexpected=False):
+        """
+        Receive packets until all expected packets are received or
+        the timeout expires, then for negative_timeout more seconds to catch
+        forbidden and unexpected packets.
+        Only packets received on ports are consumed, all packets of the
+        device if ports is None.
+        Stops early on the first forbidden or mismatched packet, or on the
+        first unexpected packet unless allow_unexpected is True.
+        """
+        def failed():
+            return (self.forbidden or self.mismatched or
+                    (self.unexpected and not allow_unexpected))
+
+        deadline = time.time() + timeout
+        self._wait(deadline, lambda: not self.pending() or failed(), ports)
+
+        if negative_timeout and not self.pending() and not failed():
+            deadline = time.time() + negative_timeout
+            self._wait(deadline, failed, ports)
@@ -3,6 +3,12 @@ Pcap file writer
 """
 
 import struct
+import threading
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
 
 PcapHeader = struct.Struct("<LHHLLLL")
 PcapPktHeader = struct.Struct("<LLLL")
@@ -14,7 +20,7 @@ class PcapWriter(object):
         """
         Open a pcap file
         """
-        self.stream = open(filename, 'w')
+        self.stream = open(filename, 'wb')
 
         self.stream.write(PcapHeader.pack(
             0xa1b2c3d4, # magic
@@ -26,6 +32,32 @@ class PcapWriter(object):
             192 # PPI linktype
         ))
 
+    @staticmethod
+    def record(data, timestamp, device, port):
+        """
+        Return the pcap record of a packet
+
+        See write for the arguments.
+        """
+        ppi_len = PPIPktHeader.size + 2 * PPIAggregateField.size
+        return ''.join([
+            PcapPktHeader.pack(
+                int(timestamp), # timestamp seconds
+                int((timestamp - int(timestamp)) * 10**6), # timestamp microseconds
+                len(data) + ppi_len, # truncated length
+                len(data) + ppi_len # un-truncated length
+            ),
+            PPIPktHeader.pack(
+                0, # version
+                0, # flags
+                ppi_len, # length
+                1, # ethernet dlt
+            ),
+            PPIAggregateField.pack(8, PPIAggregateField.size - 4, port),
+            PPIAggregateField.pack(8, PPIAggregateField.size - 4, device),
+            data,
+        ])
+
     def write(self, data, timestamp, device, port):
         """
         Write a packet to a pcap file
@@ -34,26 +66,75 @@ class PcapWriter(object):
         'timestamp' should be a float.
         'port' should be an integer port number.
         """
-        ppi_len = PPIPktHeader.size + 2 * PPIAggregateField.size
-        self.stream.write(PcapPktHeader.pack(
-            int(timestamp), # timestamp seconds
-            int((timestamp - int(timestamp)) * 10**6), # timestamp microseconds
-            len(data) + ppi_len, # truncated length
-            len(data) + ppi_len # un-truncated length
-        ))
-        self.stream.write(PPIPktHeader.pack(
-            0, # version
-            0, # flags
-            ppi_len, # length
-            1, # ethernet dlt
-        ))
-        self.stream.write(PPIAggregateField.pack(8, PPIAggregateField.size - 4, port))
-        self.stream.write(PPIAggregateField.pack(8, PPIAggregateField.size - 4, device))
-        self.stream.write(data)
+        self.stream.write(self.record(data, timestamp, device, port))
 
     def close(self):
         self.stream.close()
 
+class AsyncPcapWriter(PcapWriter):
+    """
+    Pcap file writer which writes packets from a dedicated thread
+
+    write only queues the packet, so that the receive thread of the dataplane
+    is not slowed down by the file. Packets are dropped from the capture when
+    the queue is full; 'dropped' counts them and 'written' counts the packets
+    written to the file.
+    """
+
+    QUEUE_LEN = 16384
+    BATCH_SIZE = 256
+
+    def __init__(self, filename, qlen=QUEUE_LEN):
+        PcapWriter.__init__(self, filename)
+        self.queue = queue.Queue(qlen)
+        self.written = 0
+        self.dropped = 0
+        self.thread = threading.Thread(target=self.run, name="pcap-writer")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def run(self):
+        """
+        Activity function for the writer thread
+        """
+        done = False
+        while not done:
+            # write all queued packets at once, up to BATCH_SIZE
+            item = self.queue.get()
+            batch = []
+            while item is not None:
+                batch.append(item)
+                if len(batch) == self.BATCH_SIZE:
+                    break
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            # None is queued by close
+            done = item is None
+            self.stream.write(''.join([self.record(*p) for p in batch]))
+            self.written += len(batch)
+        self.stream.flush()
+
+    def write(self, data, timestamp, device, port):
+        """
+        Queue a packet to be written to the pcap file
+
+        See PcapWriter.write for the arguments.
+        """
+        try:
+            self.queue.put_nowait((data, timestamp, device, port))
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        """
+        Write the queued packets and close the pcap file
+        """
+        self.queue.put(None)
+        self.thread.join()
+        PcapWriter.close(self)
+
 if __name__ == "__main__":
     import time
     print("Writing test pcap to test.pcap")
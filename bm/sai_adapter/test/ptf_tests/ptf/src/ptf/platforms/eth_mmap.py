@@ -0,0 +1,31 @@
+"""
+Eth mmap platform
+
+This platform uses the --interface command line option to choose the ethernet
+interfaces, like the eth platform, and receives packets from them through
+memory-mapped TPACKET_V3 rings.
+
+The ring size of every interface, 4 MB by default, can be set in MB with
+--platform-args "ring_mb=<size>".
+"""
+
+import eth
+
+def platform_config_update(config):
+    """
+    Update configuration for the eth mmap platform
+
+    @param config The configuration dictionary to use/update
+    """
+
+    eth.platform_config_update(config)
+    dataplane = config.setdefault("dataplane", {})
+    dataplane["portclass"] = "mmap"
+
+    for arg in (config.get("platform_args") or "").split(","):
+        if not arg:
+            continue
+        key, _, value = arg.partition("=")
+        if key != "ring_mb" or not value.isdigit():
+            raise ValueError("Invalid eth_mmap platform argument: %s" % arg)
+        dataplane.setdefault("port_options", {})["ring_size"] = int(value) << 20
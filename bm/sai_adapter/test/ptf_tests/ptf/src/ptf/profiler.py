@@ -0,0 +1,254 @@
+"""
+Per-test profiler
+
+Records, for every test, the duration of its setUp, runTest and tearDown
+phases, the count and latency histogram of every sai_thrift_* RPC grouped by
+function, and the dataplane activity: packets sent, polls and the time spent
+waiting for packets, including the waits which ran into their timeout (e.g.
+negative checks).
+
+The profiler is enabled by the runner (--test-profile). The instrumented code
+calls the record_* functions, which do nothing when it is disabled. Test
+clients are instrumented with profiled_client.
+
+The results are written as JSON:
+    {
+        "histogram_bounds": [upper bound of every latency bucket in seconds],
+        "tests": [
+            {
+                "name": "module.Test",
+                "duration": seconds,
+                "phases": {"setUp": seconds, "runTest": ..., "tearDown": ...},
+                "rpc": {"sai_thrift_...": {"count", "time", "max",
+                                           "histogram": [count per bucket]}},
+                "rpc_count": count, "rpc_time": seconds,
+                "dataplane": {"send_calls", "packets_sent", "polls",
+                              "poll_time", "poll_timeouts",
+                              "poll_timeout_time"}
+            }
+        ],
+        "modules": {"module": totals of the module tests}
+    }
+"""
+
+import json
+import time
+from collections import OrderedDict
+
+RPC_PREFIX = "sai_thrift_"
+
+PHASES = ["setUp", "runTest", "tearDown"]
+
+# Upper bounds of the RPC latency histogram buckets, in seconds,
+# the last bucket has no upper bound
+HISTOGRAM_BOUNDS = [0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                    0.025, 0.05, 0.1, 0.25, 0.5, 1.0]
+
+# Profile of the running test, None when the profiler is disabled or no test
+# is running
+current = None
+
+
+class RpcStats(object):
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self.max = 0.0
+        self.histogram = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+
+    def add(self, duration):
+        self.count += 1
+        self.time += duration
+        if duration > self.max:
+            self.max = duration
+        bucket = 0
+        while bucket < len(HISTOGRAM_BOUNDS) and duration > HISTOGRAM_BOUNDS[bucket]:
+            bucket += 1
+        self.histogram[bucket] += 1
+
+    def to_dict(self):
+        return OrderedDict([("count", self.count),
+                            ("time", self.time),
+                            ("max", self.max),
+                            ("histogram", self.histogram)])
+
+
+class TestProfile(object):
+    """
+    Measurements of one test
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.duration = 0.0
+        self.phases = OrderedDict()
+        self.rpc = {}
+        self.dataplane = OrderedDict([("send_calls", 0),
+                                      ("packets_sent", 0),
+                                      ("polls", 0),
+                                      ("poll_time", 0.0),
+                                      ("poll_timeouts", 0),
+                                      ("poll_timeout_time", 0.0)])
+
+    def to_dict(self):
+        rpc = OrderedDict((name, self.rpc[name].to_dict())
+                          for name in sorted(self.rpc))
+        return OrderedDict([
+            ("name", self.name),
+            ("duration", self.duration),
+            ("phases", self.phases),
+            ("rpc", rpc),
+            ("rpc_count", sum(stats.count for stats in self.rpc.values())),
+            ("rpc_time", sum(stats.time for stats in self.rpc.values())),
+            ("dataplane", self.dataplane),
+        ])
+
+
+def record_rpc(name, duration):
+    profile = current
+    if profile is None:
+        return
+    stats = profile.rpc.get(name)
+    if stats is None:
+        stats = profile.rpc[name] = RpcStats()
+    stats.add(duration)
+
+
+def record_send(packets=1):
+    profile = current
+    if profile is None:
+        return
+    profile.dataplane["send_calls"] += 1
+    profile.dataplane["packets_sent"] += packets
+
+
+def record_poll(duration, timed_out):
+    """
+    Record a wait for received packets
+    @param duration Time spent waiting in seconds
+    @param timed_out True if the wait ended because of its timeout
+    """
+    profile = current
+    if profile is None:
+        return
+    profile.dataplane["polls"] += 1
+    profile.dataplane["poll_time"] += duration
+    if timed_out:
+        profile.dataplane["poll_timeouts"] += 1
+        profile.dataplane["poll_timeout_time"] += duration
+
+
+class ProfiledClient(object):
+    """
+    RPC client proxy which records the duration of the sai_thrift_* calls
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def __getattr__(self, name):
+        attr = getattr(self.client, name)
+        if not name.startswith(RPC_PREFIX):
+            return attr
+
+        def call(*args, **kwargs):
+            start = time.time()
+            try:
+                return attr(*args, **kwargs)
+            finally:
+                record_rpc(name, time.time() - start)
+
+        # cache the wrapper, __getattr__ is only called for missing attributes
+        setattr(self, name, call)
+        return call
+
+
+def profiled_client(client):
+    """
+    Return a client proxy recording the RPC latencies if the profiler is
+    enabled, the client itself otherwise
+    """
+    if profiler is None:
+        return client
+    return ProfiledClient(client)
+
+
+class Profiler(object):
+    """
+    Collects the profiles of the tests run
+    """
+
+    def __init__(self):
+        self.tests = []
+
+    def instrument(self, test):
+        """
+        Profile a test instance when it runs
+        """
+        test_run = test.run
+
+        def run(*args, **kwargs):
+            global current
+            profile = TestProfile("%s.%s" % (test.__class__.__module__,
+                                             test.__class__.__name__))
+            current = profile
+            start = time.time()
+            try:
+                return test_run(*args, **kwargs)
+            finally:
+                profile.duration = time.time() - start
+                current = None
+                self.tests.append(profile)
+
+        test.run = run
+        for phase in PHASES:
+            setattr(test, phase, self._timed_phase(getattr(test, phase), phase))
+
+    @staticmethod
+    def _timed_phase(method, phase):
+        def timed(*args, **kwargs):
+            start = time.time()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                if current is not None:
+                    current.phases[phase] = time.time() - start
+        return timed
+
+    def to_dict(self):
+        tests = [profile.to_dict() for profile in self.tests]
+        modules = OrderedDict()
+        for test in tests:
+            modname = test["name"].split(".")[0]
+            totals = modules.get(modname)
+            if totals is None:
+                totals = modules[modname] = OrderedDict([
+                    ("tests", 0), ("duration", 0.0),
+                    ("rpc_count", 0), ("rpc_time", 0.0),
+                    ("poll_time", 0.0), ("poll_timeout_time", 0.0)])
+            totals["tests"] += 1
+            totals["duration"] += test["duration"]
+            totals["rpc_count"] += test["rpc_count"]
+            totals["rpc_time"] += test["rpc_time"]
+            totals["poll_time"] += test["dataplane"]["poll_time"]
+            totals["poll_timeout_time"] += test["dataplane"]["poll_timeout_time"]
+        return OrderedDict([("histogram_bounds", HISTOGRAM_BOUNDS),
+                            ("tests", tests),
+                            ("modules", modules)])
+
+    def write(self, filename):
+        with open(filename, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+# Profiler of the run, None when disabled
+profiler = None
+
+
+def enable():
+    """
+    Enable the profiler and return it
+    """
+    global profiler
+    profiler = Profiler()
+    return profiler
@@ -8,6 +8,7 @@ import packet as scapy
 
 import ptf
 import ptf.dataplane
+import ptf.matcher
 import ptf.parse
 import ptf.ptfutils
 
@@ -2133,12 +2134,16 @@ def port_to_tuple(port):
             pass
     return None
 
-def send_packet(test, port_id, pkt, count=1):
+def send_packet(test, port_id, pkt, count=1, burst=False):
     """
     Send a packet (or a number of packets) out of port_id
     port_id can either be a single integer (port_number on default device 0)
     or a tuple of 2 integers (device_number, port_number)
+    The packets are sent one at a time, unless burst is True, see
+    send_packet_burst.
     """
+    if burst:
+        return send_packet_burst(test, port_id, pkt, count=count)
     device, port = port_to_tuple(port_id)
     pkt = str(pkt)
     sent = 0
@@ -2149,11 +2154,35 @@ def send_packet(test, port_id, pkt, count=1):
 
     return sent
 
-def send(test, port_id, pkt, count=1):
+def send_packet_burst(test, port_id, pkts, count=1, pps=None):
+    """
+    Send a burst of packets out of port_id
+    port_id can either be a single integer (port_number on default device 0)
+    or a tuple of 2 integers (device_number, port_number)
+    pkts can either be a single packet or a list of packets, e.g. with varied
+    flow fields for hash tests. Every packet is serialized once and the list
+    is sent count times, in batches of system calls.
+    pps is the target rate in packets per second, None to send as fast as
+    possible.
+    """
+    device, port = port_to_tuple(port_id)
+    if not isinstance(pkts, (list, tuple)):
+        pkts = [pkts]
+    pkts = [str(pkt) for pkt in pkts]
+
+    burst = []
+    for n in range(count):
+        for pkt in pkts:
+            test.before_send(pkt, device_number=device, port_number=port)
+            burst.append(pkt)
+
+    return test.dataplane.send_burst(device, port, burst, pps=pps)
+
+def send(test, port_id, pkt, count=1, burst=False):
     """
     See send_packet.
     """
-    return send_packet(test, port_id, pkt, count=count)
+    return send_packet(test, port_id, pkt, count=count, burst=burst)
 
 def dp_poll(test, device_number=0, port_number=None, timeout=-1, exp_pkt=None):
     """
@@ -2216,6 +2245,36 @@ def verify_no_other_packets(test, device_number=0, timeout=None):
         logging.debug("Received unexpected packet on device %d, port %r: %s", device_number, rcv_port, format_packet(rcv_pkt))
     test.assertTrue(rcv_pkt == None, "Unexpected packet on device %d, port %r" % (device_number, rcv_port))
 
+def _device_ports(device_number):
+    """
+    Return the port numbers of the given device
+    """
+    return [port for device, port in ptf_ports() if device == device_number]
+
+def _packet_matcher(test, device_number):
+    return ptf.matcher.PacketMatcher(test, device_number, filters=FILTERS)
+
+def _verify_matcher(test, matcher, device_number, check_others=True):
+    """
+    Check the result of a PacketMatcher run: all expected packets received,
+    no forbidden packets received and, if check_others is True and unless
+    --relax is in effect, no other packets received
+    """
+    for port, pkt in matcher.mismatched:
+        logging.debug("Received wrong packet on device %d, port %r: %s",
+                      device_number, port, format_packet(pkt))
+        test.fail("Received wrong packet on device %d, port %r" % (device_number, port))
+    for e in matcher.pending():
+        test.fail("Did not receive expected pkt(s) on device %d, port(s) %r" %
+                  (device_number, sorted(e.ports) if e.ports else e.ports))
+    for port, pkt in matcher.forbidden:
+        test.fail("Received packet on device %d, port %r" % (device_number, port))
+    if check_others and not ptf.config["relax"]:
+        for port, pkt in matcher.unexpected:
+            logging.debug("Received unexpected packet on device %d, port %r: %s",
+                          device_number, port, format_packet(pkt))
+            test.fail("Unexpected packet on device %d, port %r" % (device_number, port))
+
 def verify_packets(test, pkt, ports=[], device_number=0):
     """
     Check that a packet is received on each of the specified port numbers for a
@@ -2230,14 +2289,19 @@ def verify_packets(test, pkt, ports=[], device_number=0):
     multiple packets on the same port, use the primitive verify_packet,
     verify_no_packet, and verify_no_other_packets functions directly.
     """
-    for device, port in ptf_ports():
-        if device != device_number:
-            continue
+    matcher = _packet_matcher(test, device_number)
+    other_ports = []
+    for port in _device_ports(device_number):
         if port in ports:
-            verify_packet(test, pkt, (device, port))
+            matcher.expect(pkt, [port])
         else:
-            verify_no_packet(test, pkt, (device, port))
-    verify_no_other_packets(test, device_number=device_number)
+            other_ports.append(port)
+    matcher.forbid(pkt, other_ports)
+    logging.debug("Checking for pkt on device %d, ports %r", device_number, ports)
+    matcher.run(timeout=2,
+                negative_timeout=ptf.ptfutils.default_negative_timeout,
+                allow_unexpected=ptf.config["relax"])
+    _verify_matcher(test, matcher, device_number)
 
 def verify_no_packet_any(test, pkt, ports=[], device_number=0):
     """
@@ -2245,12 +2309,14 @@ def verify_no_packet_any(test, pkt, ports=[], device_number=0):
     the given device (default device_number is 0).
     """
     test.assertTrue(len(ports) != 0, "No port available to validate receiving packet on device %d, " % device_number)
-    for device, port in ptf_ports():
-        if device != device_number:
-            continue
-        if port in ports:
-            print 'verifying packet on port device', device_number, 'port', port
-            verify_no_packet(test, pkt, (device, port))
+    ports = [port for port in _device_ports(device_number) if port in ports]
+    logging.debug("Negative check for pkt on device %d, ports %r", device_number, ports)
+    matcher = _packet_matcher(test, device_number)
+    matcher.forbid(pkt, ports)
+    matcher.run(timeout=0,
+                negative_timeout=ptf.ptfutils.default_negative_timeout,
+                ports=ports, allow_unexpected=True)
+    _verify_matcher(test, matcher, device_number, check_others=False)
 
 def verify_packets_any(test, pkt, ports=[], device_number=0):
     """
@@ -2261,22 +2327,18 @@ def verify_packets_any(test, pkt, ports=[], device_number=0):
     device, and that no other packets are received on the device (unless --relax
     is in effect).
     """
-    received = False
-    for device, port in ptf_ports():
-        if device != device_number:
-            continue
-        if port in ports:
-            logging.debug("Checking for pkt on device %d, port %d", device_number, port)
-            (rcv_device, rcv_port, rcv_pkt, pkt_time) = dp_poll(
-                test, device_number=device, port_number=port, exp_pkt=pkt
-            )
-            if rcv_pkt != None:
-                received = True
-        else:
-            verify_no_packet(test, pkt, (device, port))
-    verify_no_other_packets(test)
+    device_ports = _device_ports(device_number)
+    matcher = _packet_matcher(test, device_number)
+    matcher.expect(pkt, [port for port in device_ports if port in ports])
+    matcher.allow(pkt, ports)
+    matcher.forbid(pkt, [port for port in device_ports if port not in ports])
+    logging.debug("Checking for pkt on device %d, ports %r", device_number, ports)
+    matcher.run(timeout=ptf.ptfutils.default_timeout,
+                negative_timeout=ptf.ptfutils.default_negative_timeout,
+                allow_unexpected=ptf.config["relax"])
 
-    test.assertTrue(received == True, "Did not receive expected pkt on any of ports %r for device %d" % (ports, device_number))
+    test.assertTrue(not matcher.pending(), "Did not receive expected pkt on any of ports %r for device %d" % (ports, device_number))
+    _verify_matcher(test, matcher, device_number)
 
 def verify_packet_any_port(test, pkt, ports=[], device_number=0):
     """
@@ -2291,23 +2353,19 @@ def verify_packet_any_port(test, pkt, ports=[], device_number=0):
 
     Returns the index of the port on which the packet is received and the packet.
     """
-    received = False
-    match_index = 0
-    (rcv_device, rcv_port, rcv_pkt, pkt_time) = dp_poll(
-        test,
-        device_number=device_number,
-        exp_pkt=pkt,
-        timeout=1
-    )
-
+    matcher = _packet_matcher(test, device_number)
+    expected = matcher.expect(pkt, ports, discard_all=True)
+    matcher.forbid(pkt, [port for port in _device_ports(device_number)
+                         if port not in ports])
     logging.debug("Checking for pkt on device %d, port %r", device_number, ports)
-    if rcv_port in ports:
-        match_index = ports.index(rcv_port)
-        received = True
-    verify_no_other_packets(test, device_number=device_number)
+    matcher.run(timeout=1,
+                negative_timeout=ptf.ptfutils.default_negative_timeout,
+                allow_unexpected=ptf.config["relax"])
 
-    test.assertTrue(received == True, "Did not receive expected pkt(s) on any of ports %r for device %d" % (ports, device_number))
-    return (match_index, rcv_pkt)
+    test.assertTrue(expected.matched is not None, "Did not receive expected pkt(s) on any of ports %r for device %d" % (ports, device_number))
+    _verify_matcher(test, matcher, device_number)
+    rcv_port, rcv_pkt = expected.matched
+    return (ports.index(rcv_port), rcv_pkt)
 
 def verify_any_packet_any_port(test, pkts=[], ports=[], device_number=0):
     """
@@ -2320,24 +2378,17 @@ def verify_any_packet_any_port(test, pkts=[], ports=[], device_number=0):
 
     Returns the index of the port on which the packet is received.
     """
-    received = False
-    match_index = 0
-    (rcv_device, rcv_port, rcv_pkt, pkt_time) = dp_poll(
-        test,
-        device_number=device_number,
-        timeout=1
-    )
-
+    matcher = _packet_matcher(test, device_number)
+    # like the first packet polled used to, a wrong packet on the ports fails
+    expected = matcher.expect(pkts, ports, strict=True)
     logging.debug("Checking for pkt on device %d, port %r", device_number, ports)
-    if rcv_port in ports:
-        for pkt in pkts:
-            if str(pkt) == str(rcv_pkt):
-                match_index = ports.index(rcv_port)
-                received = True
-    verify_no_other_packets(test, device_number=device_number)
+    matcher.run(timeout=1,
+                negative_timeout=ptf.ptfutils.default_negative_timeout,
+                allow_unexpected=ptf.config["relax"])
 
-    test.assertTrue(received == True, "Did not receive expected pkt(s) on any of ports %r for device %d" % (ports, device_number))
-    return match_index
+    test.assertTrue(expected.matched is not None, "Did not receive expected pkt(s) on any of ports %r for device %d" % (ports, device_number))
+    _verify_matcher(test, matcher, device_number)
+    return ports.index(expected.matched[0])
 
 def verify_each_packet_on_each_port(test, pkts=[], ports=[], device_number=0):
     """
@@ -2348,19 +2399,15 @@ def verify_each_packet_on_each_port(test, pkts=[], ports=[], device_number=0):
     device, and that no other packets are received on the device (unless --relax
     is in effect).
     """
-    pkt_cnt = 0
     test.assertTrue(len(pkts) == len(ports), "packet list count does not match port list count")
+    matcher = _packet_matcher(test, device_number)
     for port, pkt in zip(ports, pkts):
-        logging.debug("Checking for pkt on device %d, port %d", device_number, port)
-        (rcv_device, rcv_port, rcv_pkt, pkt_time) = dp_poll(
-            test,
-            device_number=device_number,
-            port_number=port,
-            exp_pkt=pkt
-        )
-        test.assertTrue(rcv_pkt != None, "Did not receive expected pkt(s) on port %d for device %d" %(port, device_number))
-
-    verify_no_other_packets(test, device_number=device_number)
+        matcher.expect(pkt, [port])
+    logging.debug("Checking for pkts on device %d, ports %r", device_number, ports)
+    matcher.run(timeout=ptf.ptfutils.default_timeout,
+                negative_timeout=ptf.ptfutils.default_negative_timeout,
+                allow_unexpected=ptf.config["relax"])
+    _verify_matcher(test, matcher, device_number)
 
 def verify_packet_prefix(test, pkt, port, len, device_number=0):
     """
@@ -2375,16 +2422,15 @@ def count_matched_packets(test, exp_packet, port, device_number=0, timeout=1):
     Receive all packets on the port and count how many expected packets were received.
     As soon as the packets stop arriving, the function waits for the timeout value and returns the counter
     """
-    total_rcv_pkt_cnt = 0
+    rcv_pkts = []
     while True:
         (rcv_device, rcv_port, rcv_pkt, pkt_time) = dp_poll(test, device_number=device_number, port_number=port, timeout=timeout)
         if rcv_pkt is not None:
-            if ptf.dataplane.match_exp_pkt(exp_packet, rcv_pkt):
-                total_rcv_pkt_cnt += 1
+            rcv_pkts.append(rcv_pkt)
         else:
             break
 
-    return total_rcv_pkt_cnt
+    return sum(ptf.dataplane.match_exp_pkts(exp_packet, rcv_pkts))
 
 
 __all__ = list(set(locals()) - _import_blacklist)
@@ -0,0 +1,180 @@
+"""
+Unit tests of ptf.matcher, run from the ptf directory with
+python -m unittest discover utests
+"""
+
+import os
+import sys
+import threading
+import unittest
+from collections import deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'src'))
+
+from ptf.mask import Mask
+from ptf.matcher import PacketMatcher
+
+
+def frame(payload, length=64):
+    return (payload + '\x00' * length)[:length]
+
+
+class FakeDataPlane:
+    """
+    Received packets of device 0, queued per port
+    """
+
+    def __init__(self):
+        self.cvar = threading.Condition()
+        self.queues = {}
+
+    def receive(self, port, pkt):
+        self.queues.setdefault(port, deque()).append(pkt)
+
+    def packets(self, device, port=None):
+        ports = sorted(self.queues) if port is None else [port]
+        for rcv_port in ports:
+            queue = self.queues.get(rcv_port, ())
+            while queue:
+                yield (rcv_port, queue.popleft(), 0)
+
+
+class FakeTest:
+    def __init__(self):
+        self.dataplane = FakeDataPlane()
+
+    def at_receive(self, pkt, device_number=0, port_number=0):
+        pass
+
+
+class MatcherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.test = FakeTest()
+        self.matcher = PacketMatcher(self.test)
+
+    def receive(self, port, pkt):
+        self.test.dataplane.receive(port, pkt)
+
+    def run_matcher(self, **kwargs):
+        self.matcher.run(timeout=0, **kwargs)
+
+
+class ExactBucketTest(MatcherTest):
+
+    def test_packets_are_hashed_by_length(self):
+        first, second = frame('first'), frame('second', 80)
+        self.matcher.expect(first, [1])
+        self.matcher.expect(second, [2])
+        self.assertEqual(sorted(self.matcher.exact), [64, 80])
+        self.receive(1, first)
+        self.receive(2, second)
+        self.run_matcher()
+        self.assertEqual(self.matcher.pending(), [])
+        self.assertEqual(self.matcher.unexpected, [])
+
+    def test_short_packet_matches_padded_frame(self):
+        expected = self.matcher.expect('short', [1])
+        self.receive(1, frame('short'))
+        self.run_matcher()
+        self.assertEqual(expected.matched, (1, frame('short')))
+
+    def test_packet_on_other_port_is_unexpected(self):
+        pkt = frame('pkt')
+        expected = self.matcher.expect(pkt, [1])
+        self.receive(2, pkt)
+        self.run_matcher()
+        self.assertIsNone(expected.matched)
+        self.assertEqual(self.matcher.unexpected, [(2, pkt)])
+
+    def test_other_packet_on_expected_port_is_discarded(self):
+        pkt = frame('pkt')
+        expected = self.matcher.expect(pkt, [1])
+        self.receive(1, frame('other'))
+        self.receive(1, pkt)
+        self.run_matcher()
+        self.assertEqual(expected.matched, (1, pkt))
+        self.assertEqual(self.matcher.unexpected, [])
+
+    def test_each_copy_matches_one_expectation(self):
+        pkt = frame('pkt')
+        self.matcher.expect(pkt, [1])
+        self.matcher.expect(pkt, [1])
+        self.receive(1, pkt)
+        self.run_matcher()
+        self.assertEqual(len(self.matcher.pending()), 1)
+        self.receive(1, pkt)
+        self.run_matcher()
+        self.assertEqual(self.matcher.pending(), [])
+
+    def test_forbidden_packet(self):
+        pkt = frame('pkt')
+        self.matcher.expect(pkt, [1])
+        self.matcher.forbid(pkt, [2])
+        self.receive(2, pkt)
+        self.run_matcher()
+        self.assertEqual(self.matcher.forbidden, [(2, pkt)])
+
+    def test_strict_expectation_reports_other_packets(self):
+        pkt, other = frame('pkt'), frame('other')
+        self.matcher.expect([pkt], [1, 2], strict=True)
+        self.receive(1, other)
+        self.run_matcher(allow_unexpected=True)
+        self.assertEqual(self.matcher.mismatched, [(1, other)])
+        self.assertEqual(self.matcher.unexpected, [])
+
+
+class MaskedBucketTest(MatcherTest):
+
+    def mask(self, pkt, offset=0, bitwidth=8):
+        m = Mask(pkt)
+        m.set_do_not_care(offset * 8, bitwidth)
+        return m
+
+    def test_masks_share_a_bucket(self):
+        self.matcher.expect(self.mask(frame('aaa')), [1])
+        self.matcher.expect(self.mask(frame('abb')), [1])
+        self.matcher.expect(self.mask(frame('aaa'), offset=1), [1])
+        self.assertEqual(len(self.matcher.masked), 2)
+        self.assertEqual(sum(len(table) for table in self.matcher.masked.values()), 3)
+
+    def test_do_not_care_bytes_are_ignored(self):
+        expected = self.matcher.expect(self.mask(frame('xpkt')), [1])
+        self.receive(1, frame('ypkt'))
+        self.run_matcher()
+        self.assertEqual(expected.matched, (1, frame('ypkt')))
+
+    def test_cared_bytes_must_match(self):
+        expected = self.matcher.expect(self.mask(frame('xpkt')), [1])
+        self.receive(2, frame('xpku'))
+        self.run_matcher()
+        self.assertIsNone(expected.matched)
+        self.assertEqual(self.matcher.unexpected, [(2, frame('xpku'))])
+
+    def test_length_must_match(self):
+        expected = self.matcher.expect(self.mask(frame('xpkt')), [1])
+        self.receive(1, frame('xpkt', 80))
+        self.run_matcher()
+        self.assertIsNone(expected.matched)
+
+    def test_mask_without_do_not_care_bits(self):
+        pkt = frame('pkt')
+        expected = self.matcher.expect(Mask(pkt), [1])
+        self.assertEqual(list(self.matcher.masked), [(64, None)])
+        self.receive(1, pkt)
+        self.run_matcher()
+        self.assertEqual(expected.matched, (1, pkt))
+
+    def test_invalid_mask_never_matches(self):
+        m = self.mask(frame('pkt'))
+        m.valid = False
+        expected = self.matcher.expect(m, [1])
+        self.assertEqual(self.matcher.masked, {})
+        self.receive(1, frame('pkt'))
+        self.run_matcher()
+        self.assertIsNone(expected.matched)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -15,6 +15,7 @@ from ptf.base_tests import BaseTest
 from ptf import config
 import ptf.dataplane as dataplane
 import ptf.testutils as testutils
+import ptf.profiler as profiler
 
 ################################################################
 #
@@ -69,12 +70,18 @@ class ThriftInterface(BaseTest):
             server = self.test_params['server']
         else:
             server = 'localhost'
-        
-        self.transport = TSocket.TSocket(server, 9092)
+
+        # set per job when several switches are tested in parallel (ptf --jobs)
+        if self.test_params.has_key("thrift_port"):
+            port = int(self.test_params['thrift_port'])
+        else:
+            port = 9092
+
+        self.transport = TSocket.TSocket(server, port)
         self.transport = TTransport.TBufferedTransport(self.transport)
         self.protocol = TBinaryProtocol.TBinaryProtocol(self.transport)
 
-        self.client = switch_sai_rpc.Client(self.protocol)
+        self.client = profiler.profiled_client(switch_sai_rpc.Client(self.protocol))
         self.transport.open()
         return
  
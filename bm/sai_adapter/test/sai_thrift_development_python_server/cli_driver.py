@@ -23,16 +23,36 @@ import sys
 sys.path.append('../../tools/')
 import runtime_CLI as cli
 from subprocess import Popen, call
+from contextlib import contextmanager
 import shlex
 
+class BatchError(Exception):
+    """
+    Raised by SwitchThriftClient.Batch when some of the queued writes failed
+    applied: the commands of the writes that were pushed
+    errors: list of (command, exception) of the failed writes
+    """
+    def __init__(self, applied, errors):
+        Exception.__init__(self, '%d of %d table writes failed: %s' % (
+            len(errors), len(applied) + len(errors),
+            ', '.join(cmd for cmd, _ in errors)))
+        self.applied = applied
+        self.errors = errors
+
 class SwitchThriftClient():
     def __init__(self, ip='localhost', port=9090,services=cli.PreType.SimplePreLAG,
                  json='../../../p4-softswitch/targets/P4-SAI/sai.json',
-                 default_config='../../../p4-softswitch/targets/P4-SAI/p4src/DefaultConfig.txt'):
+                 default_config='../../../p4-softswitch/targets/P4-SAI/p4src/DefaultConfig.txt',
+                 verbose=True):
         self.pre = services
         self.standard_client, self.mc_client = self.ConnectToThrift(ip, port, services, json)
         self.json = json
         self.default_config = default_config
+        self.verbose = verbose
+        # one RuntimeAPI session for all the commands
+        self.api = cli.RuntimeAPI(self.pre, self.standard_client, self.mc_client)
+        # table writes queued by Batch, None when not batching
+        self.pending = None
 
     def ConnectToThrift(self, ip, port, services, json):
         standard_client, mc_client = cli.thrift_connect(
@@ -44,19 +64,131 @@ class SwitchThriftClient():
 
     def AddTable(self, table_name, action_name, match_string, value_string):
         cmd = '%s %s %s => %s' % (table_name, action_name, match_string, value_string)
-        print 'table_add ' + cmd
-        cli.RuntimeAPI(self.pre, self.standard_client, self.mc_client).do_table_add(cmd)
-
+        if self.verbose and self.pending is None:
+            print 'table_add ' + cmd
+        return self.Write('table_add ' + cmd,
+                          self.ParseAddEntry(table_name, action_name,
+                                             match_string, value_string))
 
     def RemoveTableEntry(self, table_name, match_string):
-        return cli.RuntimeAPI(self.pre, self.standard_client, self.mc_client).do_table_delete_entry_from_key('%s %s' % (table_name, match_string))
+        cmd = 'table_delete %s %s' % (table_name, match_string)
+        return self.Write(cmd, self.ParseRemoveEntry(table_name, match_string))
+
+    def GetTable(self, table_name):
+        return self.api.get_res('table', table_name, cli.ResType.table)
+
+    def PopPriority(self, table, fields):
+        """
+        Ternary and range entries end with their priority, as in table_add
+        """
+        if table.match_type in (cli.MatchType.TERNARY, cli.MatchType.RANGE):
+            return int(fields.pop(-1))
+        return 0
+
+    def ParseAddEntry(self, table_name, action_name, match_string, value_string):
+        """
+        Parse an entry once into the arguments of bm_mt_add_entry,
+        as the table_add command does
+        """
+        table = self.GetTable(table_name)
+        action = self.api.get_res('action', action_name, cli.ResType.action)
+        params = value_string.split()
+        priority = self.PopPriority(table, params)
+        match_key = cli.parse_match_key(table, match_string.split())
+        runtime_data = cli.parse_runtime_data(action, params)
+        return (self.AddEntry, table.name, match_key, action.name, runtime_data,
+                cli.BmAddEntryOptions(priority=priority))
+
+    def ParseRemoveEntry(self, table_name, match_string):
+        """
+        Parse an entry key once into the arguments of RemoveEntry
+        """
+        table = self.GetTable(table_name)
+        fields = match_string.split()
+        priority = self.PopPriority(table, fields)
+        match_key = cli.parse_match_key(table, fields)
+        return (self.RemoveEntry, table.name, match_key,
+                cli.BmAddEntryOptions(priority=priority))
+
+    def AddEntry(self, table_name, match_key, action_name, runtime_data, options):
+        return self.standard_client.bm_mt_add_entry(
+            0, table_name, match_key, action_name, runtime_data, options)
+
+    def RemoveEntry(self, table_name, match_key, options):
+        entry = self.standard_client.bm_mt_get_entry_from_key(
+            0, table_name, match_key, options)
+        return self.standard_client.bm_mt_delete_entry(
+            0, table_name, entry.entry_handle)
+
+    def Write(self, cmd, write):
+        """
+        Run a parsed table write, or queue it in a batch
+        cmd: the CLI command of the write, used in the batch report
+        """
+        if self.pending is not None:
+            self.pending.append((cmd, write))
+            return
+        return write[0](*write[1:])
+
+    def AddTableEntries(self, entries):
+        """
+        Add many entries in one call
+        entries: list of (table_name, action_name, match_string, value_string)
+        """
+        with self.Batch():
+            for entry in entries:
+                self.AddTable(*entry)
+
+    def RemoveTableEntries(self, entries):
+        """
+        Remove many entries in one call
+        entries: list of (table_name, match_string)
+        """
+        with self.Batch():
+            for entry in entries:
+                self.RemoveTableEntry(*entry)
+
+    @contextmanager
+    def Batch(self):
+        """
+        Queue the table writes of the block and push them together at the end.
+        The entries are parsed when queued, and pushed with the bm_runtime
+        calls of the client session, without going through the CLI commands.
+        Nested batches are pushed with the outermost one.
+        A failed write does not stop the batch: all the writes are tried,
+        and a BatchError listing the applied and the failed writes is
+        raised at the end.
+        """
+        if self.pending is not None:
+            yield
+            return
+        self.pending = []
+        try:
+            yield
+            pending = self.pending
+        finally:
+            self.pending = None
+        applied = []
+        errors = []
+        for cmd, write in pending:
+            try:
+                write[0](*write[1:])
+                applied.append(cmd)
+            except Exception as e:
+                errors.append((cmd, e))
+        if self.verbose:
+            print 'pushed %d of %d table writes' % (len(applied), len(pending))
+            for cmd, e in errors:
+                print 'failed %s: %r' % (cmd, e)
+        if errors:
+            raise BatchError(applied, errors)
 
     def ReloadDefaultConfig(self):
-        cli.RuntimeAPI(self.pre, self.standard_client, self.mc_client).do_load_new_config_file(self.json)
+        self.api.do_load_new_config_file(self.json)
         with open(self.default_config,'r') as def_file:
             for line in def_file:
-                cli.RuntimeAPI(self.pre, self.standard_client, self.mc_client).onecmd(line.strip('\n'))
-        cli.RuntimeAPI(self.pre, self.standard_client, self.mc_client).do_swap_configs('')
+                self.api.onecmd(line.strip('\n'))
+        self.api.do_swap_configs('')
 
 def main():
     args = cli.get_parser().parse_args()
@@ -1,3 +1,3 @@
 rm -rf config.log
-python switch_sai_server.py > config.log
+python switch_sai_server.py "$@" > config.log
 # python switch_sai_server.py
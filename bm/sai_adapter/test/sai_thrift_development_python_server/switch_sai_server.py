@@ -11,9 +11,13 @@ from thrift.transport import TSocket
 from thrift.transport import TTransport
 from thrift.protocol import TBinaryProtocol
 from thrift.server import TServer
+from thrift.server import TNonblockingServer
 
 
+import argparse
 import socket
+import heapq
+import threading
 
 def list_to_str(num_list):
   st = ''
@@ -22,15 +26,34 @@ def list_to_str(num_list):
   return st
 
 
-def GetNewIndex(num_list):
-  return min(set(xrange(len(num_list)+1)) - set(num_list))
-
-def CreateNewItem(obj_list, obj_class, forbidden_list=[]):
-    new_id = GetNewIndex(forbidden_list)
-    new_obj = obj_class(sai_object_id=new_id)
-    obj_list[new_id] = new_obj
-    # obj_list.update({new_id: new_obj})
-    return new_id, new_obj
+class IndexAllocator():
+  """Allocates the lowest free index, in O(log n)."""
+  def __init__(self):
+    self.next_index = 0
+    # released indexes lower than next_index
+    self.free = []
+
+  def allocate(self):
+    if self.free:
+      return heapq.heappop(self.free)
+    index = self.next_index
+    self.next_index += 1
+    return index
+
+  def release(self, index):
+    heapq.heappush(self.free, index)
+
+def CreateNewItem(obj_list, obj_class, allocator):
+  new_id = allocator.allocate()
+  new_obj = obj_class(sai_object_id=new_id)
+  obj_list[new_id] = new_obj
+  return new_id, new_obj
+
+def RemoveItem(obj_list, obj_id, allocator):
+  obj = obj_list.pop(obj_id, None)
+  if obj is not None:
+    allocator.release(obj_id)
+  return obj
 
 class Sai_obj():
     def __init__(self, sai_object_id):
@@ -100,6 +123,30 @@ class Bridge_obj(Sai_obj):
         self.bridge_port_list = bridge_port_list
 
 
+class LockedHandler():
+  """
+  Proxy serializing the calls to a handler, for the multi-threaded servers.
+
+  The handler object dicts and its bmv2 client are not thread-safe, so
+  every call holds the lock; the servers still read and write the
+  requests of the connections concurrently.
+  """
+  def __init__(self, handler):
+    self.handler = handler
+    self.lock = threading.RLock()
+
+  def __getattr__(self, name):
+    attr = getattr(self.handler, name)
+    if not callable(attr):
+      return attr
+
+    def call(*args, **kwargs):
+      with self.lock:
+        return attr(*args, **kwargs)
+    setattr(self, name, call)
+    return call
+
+
 class SaiHandler():
   def __init__(self):
     self.switch_id = 0
@@ -109,20 +156,14 @@ class SaiHandler():
     self.hw_port_list = [0, 1, 2, 3, 4, 5, 6, 7]
     self.sai_thrift_create_switch([])
 
-  def get_all_oids(self):
-    return self.ports.keys() + self.vlans.keys() + self.vlan_members.keys() + self.bridge_ports.keys() + self.bridges.keys() + self.lag_members.keys() + self.lags.keys()
-
   def get_new_l2_if(self):
-    l2_ifs = [x.l2_if for x in self.ports.values() + self.lags.values()]
-    return GetNewIndex(l2_ifs)
+    return self.l2_if_allocator.allocate()
 
   def get_new_bridge_id(self):
-    bridge_ids = [x.bridge_id for x in self.bridges.values()]
-    return GetNewIndex(bridge_ids)
+    return self.bridge_id_allocator.allocate()
   
   def get_new_bridge_port(self):
-    bridge_ports = [x.bridge_port for x in self.bridge_ports.values()]
-    return GetNewIndex(bridge_ports)
+    return self.bridge_port_allocator.allocate()
 
   # Switch API
   def sai_thrift_create_switch(self, thrift_attr_list):
@@ -134,16 +175,27 @@ class SaiHandler():
     self.bridges = {}
     self.lag_members = {}
     self.lags = {}
-    self.l2_ifs = []
-    bridge_object_id, bridge_obj = CreateNewItem(self.bridges, Bridge_obj, forbidden_list=self.get_all_oids())
-    bridge_obj.bridge_id = 1
+    # object ids are unique across all the object types
+    self.oid_allocator = IndexAllocator()
+    self.l2_if_allocator = IndexAllocator()
+    self.bridge_id_allocator = IndexAllocator()
+    self.bridge_port_allocator = IndexAllocator()
+    # secondary indexes
+    self.port_by_hw_port = {}
+    self.vlan_by_vid = {}
+    bridge_object_id, bridge_obj = CreateNewItem(self.bridges, Bridge_obj, self.oid_allocator)
+    # the default .1Q bridge is 1, 0 is left for the first created bridge
+    unused_bridge_id = self.get_new_bridge_id()
+    bridge_obj.bridge_id = self.get_new_bridge_id()
+    self.bridge_id_allocator.release(unused_bridge_id)
     for port_num in self.hw_port_list:
-      port_id, port_obj = CreateNewItem(self.ports, Port_obj, forbidden_list=self.get_all_oids())
+      port_id, port_obj = CreateNewItem(self.ports, Port_obj, self.oid_allocator)
       port_obj.hw_port = port_num
-      port_obj.l2_if = port_num
-      br_port_id, br_port_obj = CreateNewItem(self.bridge_ports, BridgePort_obj, forbidden_list=self.get_all_oids())
+      port_obj.l2_if = self.get_new_l2_if()
+      self.port_by_hw_port[port_num] = port_id
+      br_port_id, br_port_obj = CreateNewItem(self.bridge_ports, BridgePort_obj, self.oid_allocator)
       br_port_obj.port_id = port_id
-      br_port_obj.bridge_port = port_num
+      br_port_obj.bridge_port = self.get_new_bridge_port()
       bridge_obj.bridge_port_list.append(br_port_id)
     return self.switch_id
 
@@ -158,10 +210,7 @@ class SaiHandler():
     return sai_thrift_attribute_list_t(attr_list=thrift_attr_list, attr_count = len(thrift_attr_list))
 
   def sai_thrift_get_port_id_by_front_port(self, port_name):
-    for port in self.ports.values():
-      if port.hw_port == int(port_name):
-        return port.sai_object_id
-    return -1
+    return self.port_by_hw_port.get(int(port_name), -1)
 
   # FDB API
   def sai_thrift_create_fdb_entry(self, thrift_fdb_entry, thrift_attr_list):
@@ -194,33 +243,38 @@ class SaiHandler():
     for attr in thrift_attr_list:
       if attr.id == SAI_VLAN_ATTR_VLAN_ID:
         vid = attr.value.u16
-    if vid in [x.vid for x in self.vlans]:
+    if vid in self.vlan_by_vid:
       print "vlan id %d already exists" % vid
       return SAI_STATUS_ITEM_ALREADY_EXISTS
     else:
       print "vlan id %d created" % vid
-      vlan_oid, vlan_obj = CreateNewItem(self.vlans, Vlan_obj, forbidden_list=self.get_all_oids())
+      vlan_oid, vlan_obj = CreateNewItem(self.vlans, Vlan_obj, self.oid_allocator)
       vlan_obj.vid = vid
       vlan_obj.vlan_members = []
+      self.vlan_by_vid[vid] = vlan_oid
       return vlan_oid
 
   def sai_thrift_delete_vlan(self, vlan_oid):
-    self.vlans.pop(vlan_oid, None)
+    vlan_obj = RemoveItem(self.vlans, vlan_oid, self.oid_allocator)
+    if vlan_obj is not None:
+      del self.vlan_by_vid[vlan_obj.vid]
     return 0
 
   def sai_thrift_remove_vlan_member(self, vlan_member_id):
     vlan_member = self.vlan_members[vlan_member_id]
     bridge_port_id = vlan_member.bridge_port_id
     vid = vlan_member.vid
-    self.cli_client.RemoveTableEntry('table_egress_vlan_filtering', list_to_str([bridge_port_id, vid]))
-    self.cli_client.RemoveTableEntry('table_ingress_vlan_filtering', list_to_str([bridge_port_id, vid]))
     out_if = self.ports[self.bridge_ports[bridge_port_id].port_id].hw_port
     if vlan_member.tagging_mode == SAI_VLAN_TAGGING_MODE_UNTAGGED:
-      self.cli_client.RemoveTableEntry('table_egress_vlan_tag', list_to_str([out_if, vid, 1]))
+      tag_key = list_to_str([out_if, vid, 1])
     else:
-      self.cli_client.RemoveTableEntry('table_egress_vlan_tag', list_to_str([out_if, vid, 0]))
+      tag_key = list_to_str([out_if, vid, 0])
+    self.cli_client.RemoveTableEntries([
+      ('table_egress_vlan_filtering', list_to_str([bridge_port_id, vid])),
+      ('table_ingress_vlan_filtering', list_to_str([bridge_port_id, vid])),
+      ('table_egress_vlan_tag', tag_key)])
     self.vlans[vlan_member.vlan_oid].vlan_members.remove(vlan_member_id)
-    self.vlan_members.pop(vlan_member_id, None)
+    RemoveItem(self.vlan_members, vlan_member_id, self.oid_allocator)
     return 0
 
   def sai_thrift_create_vlan_member(self, vlan_member_attr_list):
@@ -235,7 +289,7 @@ class SaiHandler():
         tagging_mode = attr.value.s32
     vlan_obj = self.vlans[vlan_oid]
     vlan_id = vlan_obj.vid
-    vlan_member_id, vlan_member_obj = CreateNewItem(self.vlan_members, VlanMember_obj, forbidden_list=self.get_all_oids())
+    vlan_member_id, vlan_member_obj = CreateNewItem(self.vlan_members, VlanMember_obj, self.oid_allocator)
     vlan_member_obj.bridge_port_id = bridge_port_id
     vlan_member_obj.vid = vlan_id
     vlan_member_obj.vlan_oid = vlan_oid
@@ -244,7 +298,7 @@ class SaiHandler():
 
     port_id = self.bridge_ports[bridge_port_id].port_id
     bridge_port = self.bridge_ports[bridge_port_id].bridge_port
-    if port_id in self.lags.keys():
+    if port_id in self.lags:
       out_if = self.lags[port_id].l2_if
     else:
       out_if = self.ports[port_id].hw_port
@@ -252,21 +306,21 @@ class SaiHandler():
     if tagging_mode == SAI_VLAN_TAGGING_MODE_TAGGED:
       vlan_pcp = 0 
       vlan_cfi = 0
-      self.cli_client.AddTable('table_egress_vlan_tag','action_forward_vlan_tag',
-                               list_to_str([out_if, vlan_id, 0]), list_to_str([vlan_pcp, vlan_cfi, vlan_id]))
+      tag_entry = ('table_egress_vlan_tag','action_forward_vlan_tag',
+                   list_to_str([out_if, vlan_id, 0]), list_to_str([vlan_pcp, vlan_cfi, vlan_id]))
     elif tagging_mode == SAI_VLAN_TAGGING_MODE_PRIORITY_TAGGED:
       vlan_pcp = 0 
       vlan_cfi = 0
-      self.cli_client.AddTable('table_egress_vlan_tag','action_forward_vlan_tag',
-                               list_to_str([out_if, vlan_id, 0]), list_to_str([vlan_pcp, vlan_cfi, 0]))
+      tag_entry = ('table_egress_vlan_tag','action_forward_vlan_tag',
+                   list_to_str([out_if, vlan_id, 0]), list_to_str([vlan_pcp, vlan_cfi, 0]))
     else:
-      self.cli_client.AddTable('table_egress_vlan_tag','action_forward_vlan_untag',
-                              list_to_str([out_if, vlan_id, 1]),'')
+      tag_entry = ('table_egress_vlan_tag','action_forward_vlan_untag',
+                   list_to_str([out_if, vlan_id, 1]),'')
 
-    self.cli_client.AddTable('table_egress_vlan_filtering','_nop',
-                              list_to_str([bridge_port, vlan_id]),'')
-    self.cli_client.AddTable('table_ingress_vlan_filtering','_nop',
-                              list_to_str([bridge_port, vlan_id]),'')
+    self.cli_client.AddTableEntries([
+      tag_entry,
+      ('table_egress_vlan_filtering','_nop', list_to_str([bridge_port, vlan_id]),''),
+      ('table_ingress_vlan_filtering','_nop', list_to_str([bridge_port, vlan_id]),'')])
 
     return vlan_member_id
 
@@ -277,7 +331,7 @@ class SaiHandler():
                                                                                                                    port_obj.drop_tagged, port_obj.drop_untagged]))
 
   def sai_thrift_create_port(self, thrift_attr_list):
-    port, port_obj = CreateNewItem(self.ports, Port_obj, forbidden_list=self.get_all_oids())
+    port, port_obj = CreateNewItem(self.ports, Port_obj, self.oid_allocator)
     for attr in thrift_attr_list:
       if attr.id == SAI_PORT_ATTR_PORT_VLAN_ID:
         vlan_id = attr.value.u16
@@ -291,6 +345,7 @@ class SaiHandler():
     hw_port = hw_port_list[0]
     port_obj.hw_port = hw_port
     port_obj.l2_if = self.get_new_l2_if()
+    self.port_by_hw_port[hw_port] = port
     self.cli_client.AddTable('table_ingress_lag', 'action_set_lag_l2if', str(port_obj.hw_port), list_to_str([0,port_obj.l2_if]))
     self.config_port(port_obj, port_obj.l2_if)
     return port
@@ -300,7 +355,10 @@ class SaiHandler():
     l2_if = self.ports[port_id].l2_if
     self.cli_client.RemoveTableEntry('table_ingress_lag', str(hw_port))
     self.cli_client.RemoveTableEntry('table_port_configurations', str(l2_if))
-    self.ports.pop(port_id, None)
+    RemoveItem(self.ports, port_id, self.oid_allocator)
+    self.l2_if_allocator.release(l2_if)
+    if self.port_by_hw_port.get(hw_port) == port_id:
+      del self.port_by_hw_port[hw_port]
     return 0
 
   def sai_thrift_set_port_attribute(self, port, attr):
@@ -335,18 +393,19 @@ class SaiHandler():
 
   # LAG Api
   def sai_thrift_create_lag(self, thrift_attr_list):
-    lag_id, lag_obj = CreateNewItem(self.lags, Lag_obj, forbidden_list=self.get_all_oids())
+    lag_id, lag_obj = CreateNewItem(self.lags, Lag_obj, self.oid_allocator)
     lag_obj.l2_if = self.get_new_l2_if()
     return lag_id
 
   def sai_thrift_remove_lag(self, lag_id):
-    lag = self.lags.pop(lag_id, None)
+    lag = RemoveItem(self.lags, lag_id, self.oid_allocator)
     self.cli_client.RemoveTableEntry('table_port_configurations', str(lag.l2_if))
     self.cli_client.RemoveTableEntry('table_lag_hash',str(lag.l2_if))
+    self.l2_if_allocator.release(lag.l2_if)
     return 0
 
   def sai_thrift_create_lag_member(self, thrift_attr_list):
-    lag_member_id, lag_member_obj = CreateNewItem(self.lag_members, LagMember_obj, forbidden_list=self.get_all_oids())
+    lag_member_id, lag_member_obj = CreateNewItem(self.lag_members, LagMember_obj, self.oid_allocator)
     for attr in thrift_attr_list:
       if attr.id == SAI_LAG_MEMBER_ATTR_PORT_ID:
         port_id = attr.value.oid
@@ -369,7 +428,7 @@ class SaiHandler():
     return lag_member_id
 
   def sai_thrift_remove_lag_member(self, lag_member_id):
-    lag_member = self.lag_members.pop(lag_member_id, None)
+    lag_member = RemoveItem(self.lag_members, lag_member_id, self.oid_allocator)
     if not lag_member:
       return 0
     lag = self.lags[lag_member.lag_id]
@@ -390,7 +449,7 @@ class SaiHandler():
 
   # Bridge API
   def sai_thrift_create_bridge(self, thrift_attr_list):
-    bridge_id, bridge_obj = CreateNewItem(self.bridges, Bridge_obj, forbidden_list=self.get_all_oids())
+    bridge_id, bridge_obj = CreateNewItem(self.bridges, Bridge_obj, self.oid_allocator)
     bridge_obj.bridge_id = self.get_new_bridge_id()
     for attr in thrift_attr_list:
       if attr.id == SAI_BRIDGE_ATTR_TYPE:
@@ -399,7 +458,9 @@ class SaiHandler():
     return bridge_id
 
   def sai_thrift_remove_bridge(self, bridge_id):
-    self.bridges.pop(bridge_id, None)
+    bridge_obj = RemoveItem(self.bridges, bridge_id, self.oid_allocator)
+    if bridge_obj is not None:
+      self.bridge_id_allocator.release(bridge_obj.bridge_id)
     return 0
 
   def sai_thirft_get_bridge_attribute(self, bridge_id, thrift_attr_list):
@@ -422,7 +483,7 @@ class SaiHandler():
       elif attr.id == SAI_BRIDGE_PORT_ATTR_PORT_ID:
         port_id = attr.value.oid
     br_port = self.get_new_bridge_port()
-    br_port_id, br_port_obj = CreateNewItem(self.bridge_ports, BridgePort_obj, forbidden_list=self.get_all_oids())
+    br_port_id, br_port_obj = CreateNewItem(self.bridge_ports, BridgePort_obj, self.oid_allocator)
     br_port_obj.bridge_port = br_port
     br_port_obj.port_id = port_id
     br_port_obj.vlan_id = vlan_id
@@ -435,7 +496,7 @@ class SaiHandler():
     elif bridge_port_type == SAI_BRIDGE_PORT_TYPE_PORT: #.1Q
       self.cli_client.AddTable('table_bridge_id_1q', 'action_set_bridge_id', str(vlan_id), str(bridge_id))
       l2_if_type = 3 
-    if port_id in self.lags.keys(): # LAG
+    if port_id in self.lags: # LAG
       l2_if = self.lags[port_id].l2_if
       self.cli_client.AddTable('table_egress_br_port_to_if', 'action_forward_set_outIfType', str(br_port), list_to_str([l2_if, 1]))
       bind_mode = self.lags[port_id].port_obj.bind_mode
@@ -463,8 +524,9 @@ class SaiHandler():
     return SAI_STATUS_SUCCESS
 
   def sai_thrift_remove_bridge_port(self, bridge_port_id):
-    br_port_obj = self.bridge_ports.pop(bridge_port_id, None)
+    br_port_obj = RemoveItem(self.bridge_ports, bridge_port_id, self.oid_allocator)
     bridge_port = br_port_obj.bridge_port
+    self.bridge_port_allocator.release(bridge_port)
     port_id = br_port_obj.port_id
     vlan_id = br_port_obj.vlan_id
     self.cli_client.RemoveTableEntry('table_egress_br_port_to_if', str(bridge_port))
@@ -516,13 +578,48 @@ class SaiHandler():
     return SAI_STATUS_SUCCESS
 
 
-handler = SaiHandler()
-processor = switch_sai_rpc.Processor(handler)
-transport = TSocket.TServerSocket(port=9092)
-tfactory = TTransport.TBufferedTransportFactory()
-pfactory = TBinaryProtocol.TBinaryProtocolFactory()
+def create_server(args, handler):
+  if args.server != 'simple':
+    handler = LockedHandler(handler)
+  processor = switch_sai_rpc.Processor(handler)
+  pfactory = TBinaryProtocol.TBinaryProtocolFactory()
+
+  if args.server == 'nonblocking':
+    # TNonblockingServer only supports framed transport clients
+    transport = TSocket.TServerSocket(port=args.port)
+    return TNonblockingServer.TNonblockingServer(processor, transport, pfactory,
+                                                 threads=args.threads)
+
+  transport = TSocket.TServerSocket(port=args.port)
+  tfactory = TTransport.TBufferedTransportFactory()
+  if args.server == 'threaded':
+    server = TServer.TThreadedServer(processor, transport, tfactory, pfactory,
+                                     daemon=True)
+  elif args.server == 'threadpool':
+    server = TServer.TThreadPoolServer(processor, transport, tfactory, pfactory,
+                                       daemon=True)
+    server.setNumThreads(args.threads)
+  else:
+    server = TServer.TSimpleServer(processor, transport, tfactory, pfactory)
+  return server
+
+
+parser = argparse.ArgumentParser(description='Python dev SAI Thrift server')
+parser.add_argument('--port', type=int, default=9092,
+                    help='Thrift server port')
+parser.add_argument('--server', default='simple',
+                    choices=['simple', 'threaded', 'threadpool', 'nonblocking'],
+                    help='simple serves one connection at a time, threaded '
+                         'uses a thread per connection, threadpool a fixed '
+                         'number of threads, nonblocking a fixed number of '
+                         'threads with framed transport clients only')
+parser.add_argument('--threads', type=int, default=10,
+                    help='Number of threads of the threadpool and nonblocking '
+                         'servers')
+args = parser.parse_args()
 
-server = TServer.TSimpleServer(processor, transport, tfactory, pfactory)
-print "Starting python server..."
+handler = SaiHandler()
+server = create_server(args, handler)
+print "Starting python %s server..." % args.server
 server.serve()
-print "done!"
\ No newline at end of file
+print "done!"
@@ -157,6 +157,7 @@ my $vars = {
     apis            => $data->{apis},
     functions       => $data->{functions},
     methods         => $data->{methods},
+    bulk_methods    => $data->{bulk_methods},
     structs         => $data->{structs},
     dbg             => $dbg,
     mandatory_attrs => $mandatory_attrs,
@@ -337,6 +338,7 @@ sub get_api_name {
 # types definitions.
 sub get_definitions {
     my %methods_table;
+    my %bulk_methods_table;
     my %all_functions;
     my %all_structs;
     my %all_attrs;
@@ -379,7 +381,7 @@ sub get_definitions {
 
                     next
                       if get_struct( $apis{$api}, \%all_structs,
-                        \%methods_table, $_ );
+                        \%methods_table, \%bulk_methods_table, $_ );
 
                     next
                       if $api ne 'common'
@@ -401,11 +403,12 @@ sub get_definitions {
     my $api_list = assign_attr_types( \%apis, \@all_enums );
 
     return {
-        apis      => $api_list,
-        attrs     => \%all_attrs,
-        structs   => \%all_structs,
-        functions => \%all_functions,
-        methods   => \%methods_table
+        apis         => $api_list,
+        attrs        => \%all_attrs,
+        structs      => \%all_structs,
+        functions    => \%all_functions,
+        methods      => \%methods_table,
+        bulk_methods => \%bulk_methods_table
     };
 }
 
@@ -548,12 +551,42 @@ sub get_method_names {
     return \%methods;
 }
 
+# Generic bulk methods share their function types among all APIs
+# (e.g. sai_bulk_object_create_fn), so they cannot be found by the type
+# name. Assign them to the objects instead, basing on the method name,
+# e.g. create_vlan_members -> vlan_member.
+sub get_bulk_object_methods {
+    my $api    = shift;
+    my $struct = shift;
+
+    my %methods;
+
+    for my $method ( GetStructKeysInOrder($struct) ) {
+        my $type =
+          { SAI::Struct::Member->parse_xml_typedef( $struct->{$method} ) }
+          ->{type};
+        next
+          unless $type =~
+          /^sai_bulk_object_(create|remove|set_attribute|get_attribute)_fn$/;
+        my $operation = $1;
+
+        next
+          unless $method =~ /^(?:create|remove|set|get)_(\w+)s(?:_attribute)?$/;
+
+        $methods{$1}->{api} = $api;
+        $methods{$1}->{$operation} = $method;
+    }
+
+    return \%methods;
+}
+
 # Create and store the Struct object.
 # The struct of API function pointers is an exception - just the its name.
 sub get_struct {
     my $api           = shift;
     my $all_structs   = shift;
     my $methods_table = shift;
+    my $bulk_methods  = shift;
     my $xml_typedef   = shift;
 
     my @members;
@@ -570,6 +603,11 @@ sub get_struct {
     if ( $name =~ /_api_t$/ ) {
         my $method_names = get_method_names( \%struct_def );
         %{$methods_table} = ( %{$methods_table}, %{$method_names} );
+
+        my ($api_name) = $name =~ /^sai_(\w+)_api_t$/;
+        my $bulk_object_methods =
+          get_bulk_object_methods( $api_name, \%struct_def );
+        %{$bulk_methods} = ( %{$bulk_methods}, %{$bulk_object_methods} );
         return 1;
     }
 
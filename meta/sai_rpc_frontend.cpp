@@ -24,10 +24,37 @@
 
 #include <arpa/inet.h>
 
+#include <algorithm>
+#include <chrono>
+#include <condition_variable>
+#include <deque>
 #include <iostream>
 #include <cstring>
+#include <mutex>
+#include <string>
 #include "sai_rpc.h"
 
+#include <thrift/TProcessor.h>
+// Before Thrift 0.13 ThreadFactory is abstract, the thread factory
+// of the platform is PlatformThreadFactory, removed in 0.13
+#if defined(__has_include)
+#if __has_include(<thrift/concurrency/PlatformThreadFactory.h>)
+#define SAI_THRIFT_PLATFORM_THREAD_FACTORY
+#endif
+#endif
+#ifdef SAI_THRIFT_PLATFORM_THREAD_FACTORY
+#include <thrift/concurrency/PlatformThreadFactory.h>
+#else
+#include <thrift/concurrency/ThreadFactory.h>
+#endif
+#include <thrift/concurrency/ThreadManager.h>
+#include <thrift/server/TThreadPoolServer.h>
+#include <thrift/server/TThreadedServer.h>
+#ifdef SAI_THRIFT_NONBLOCKING_SERVER
+#include <thrift/server/TNonblockingServer.h>
+#include <thrift/transport/TNonblockingServerSocket.h>
+#endif
+
 extern "C" {
 #include "sai.h"
 #include "saitypes.h"
@@ -37,6 +64,13 @@ extern "C" {
 }
 
 using namespace ::sai;
+#ifdef SAI_THRIFT_PLATFORM_THREAD_FACTORY
+typedef ::apache::thrift::concurrency::PlatformThreadFactory
+    sai_thrift_thread_factory;
+#else
+typedef ::apache::thrift::concurrency::ThreadFactory sai_thrift_thread_factory;
+#endif
+using ::apache::thrift::concurrency::ThreadManager;
 
 /**
  *  @brief Convert Thrift MAC format to SAI MAC format
@@ -515,6 +549,23 @@ std::string sai_ip6_t_to_thrift(const sai_ip6_t ip6) {
   return str;
 }
 
+/**
+ *  @brief Convert SAI MAC format to Thrift MAC format
+ */
+std::string sai_mac_t_to_thrift(const sai_mac_t mac) {
+  char mac_str[18];
+  snprintf(mac_str,
+           sizeof(mac_str),
+           "%02x:%02x:%02x:%02x:%02x:%02x",
+           mac[0],
+           mac[1],
+           mac[2],
+           mac[3],
+           mac[4],
+           mac[5]);
+  return mac_str;
+}
+
 /**
  *  @brief Convert SAI IP address format to Thrift IP address format
  */
@@ -592,19 +643,9 @@ void convert_attr_sai_to_thrift(const sai_object_type_t sai_ot,
     case SAI_ATTR_VALUE_TYPE_POINTER:
       // not supported
       break;
-    case SAI_ATTR_VALUE_TYPE_MAC: {
-      char mac_str[18];
-      snprintf(mac_str,
-               sizeof(mac_str),
-               "%02x:%02x:%02x:%02x:%02x:%02x",
-               sai_attr.value.mac[0],
-               sai_attr.value.mac[1],
-               sai_attr.value.mac[2],
-               sai_attr.value.mac[3],
-               sai_attr.value.mac[4],
-               sai_attr.value.mac[5]);
-      thrift_attr.value.mac = mac_str;
-    } break;
+    case SAI_ATTR_VALUE_TYPE_MAC:
+      thrift_attr.value.mac = sai_mac_t_to_thrift(sai_attr.value.mac);
+      break;
     case SAI_ATTR_VALUE_TYPE_IPV4:
       thrift_attr.value.ip4 = sai_ip4_t_to_thrift(sai_attr.value.ip4);
       break;
@@ -799,6 +840,81 @@ void sai_thrift_nat_type_t_parse(const sai_thrift_nat_type_t &thrift_nat_type,
 // including it here we never have to modify the generated file
 #include "sai_rpc_server.cpp"
 
+/**
+ * Notifications received from SAI, numbered in order. The clients read them
+ * with sai_thrift_get_notifications() from the last sequence number they
+ * got. Only the most recent ones are kept.
+ */
+static const size_t notification_queue_size = 4096;
+static std::mutex notification_mutex;
+static std::condition_variable notification_cv;
+static std::deque<sai_thrift_notification_t> notification_queue;
+static int64_t notification_sequence = 0;
+
+/**
+ * @brief Add a notification to the queue and wake up the waiting clients
+ */
+static void sai_thrift_push_notification(
+    sai_thrift_notification_t &notification) {
+  std::lock_guard<std::mutex> lock(notification_mutex);
+  notification.sequence = ++notification_sequence;
+  notification_queue.push_back(notification);
+  if (notification_queue.size() > notification_queue_size) {
+    notification_queue.pop_front();
+  }
+  notification_cv.notify_all();
+}
+
+static void sai_thrift_port_state_change_notification(
+    uint32_t count, const sai_port_oper_status_notification_t *data) {
+  for (uint32_t i = 0; i < count; i++) {
+    sai_thrift_notification_t notification;
+    notification.type = sai_thrift_notification_type_t::PORT_STATE_CHANGE;
+    notification.object_id = data[i].port_id;
+    notification.state = data[i].port_state;
+    sai_thrift_push_notification(notification);
+  }
+}
+
+static void sai_thrift_fdb_event_notification(
+    uint32_t count, const sai_fdb_event_notification_data_t *data) {
+  for (uint32_t i = 0; i < count; i++) {
+    sai_thrift_notification_t notification;
+    notification.type = sai_thrift_notification_type_t::FDB_EVENT;
+    notification.state = data[i].event_type;
+    notification.object_id = SAI_NULL_OBJECT_ID;
+    for (uint32_t j = 0; j < data[i].attr_count; j++) {
+      if (data[i].attr[j].id == SAI_FDB_ENTRY_ATTR_BRIDGE_PORT_ID) {
+        notification.object_id = data[i].attr[j].value.oid;
+      }
+    }
+    notification.fdb_entry.switch_id = data[i].fdb_entry.switch_id;
+    notification.fdb_entry.mac_address =
+        sai_mac_t_to_thrift(data[i].fdb_entry.mac_address);
+    notification.fdb_entry.bv_id = data[i].fdb_entry.bv_id;
+    notification.__isset.fdb_entry = true;
+    sai_thrift_push_notification(notification);
+  }
+}
+
+static void sai_thrift_switch_state_change_notification(
+    sai_object_id_t switch_id, sai_switch_oper_status_t switch_oper_status) {
+  sai_thrift_notification_t notification;
+  notification.type = sai_thrift_notification_type_t::SWITCH_STATE_CHANGE;
+  notification.object_id = switch_id;
+  notification.state = switch_oper_status;
+  sai_thrift_push_notification(notification);
+}
+
+static void sai_thrift_switch_shutdown_request_notification(
+    sai_object_id_t switch_id) {
+  sai_thrift_notification_t notification;
+  notification.type = sai_thrift_notification_type_t::SWITCH_SHUTDOWN_REQUEST;
+  notification.object_id = switch_id;
+  notification.state = 0;
+  sai_thrift_push_notification(notification);
+}
+
 class sai_rpcHandlerFrontend : virtual public sai_rpcHandler {
 
   /**
@@ -882,32 +998,315 @@ class sai_rpcHandlerFrontend : virtual public sai_rpcHandler {
     }
     free(caps_list);
   }
+
+  /**
+   * @brief Register the notification callbacks of the given types on the
+   *        switch, returns the sequence number of the last notification
+   */
+  int64_t sai_thrift_subscribe_notifications(
+      const std::vector<sai_thrift_notification_type_t::type> &types) {
+    sai_status_t status = SAI_STATUS_SUCCESS;
+    sai_switch_api_t *switch_api;
+
+    status = sai_api_query(SAI_API_SWITCH, (void **)&switch_api);
+    for (uint32_t i = 0; status == SAI_STATUS_SUCCESS && i < types.size();
+         i++) {
+      sai_attribute_t attr = {};
+      switch (types[i]) {
+        case sai_thrift_notification_type_t::PORT_STATE_CHANGE:
+          attr.id = SAI_SWITCH_ATTR_PORT_STATE_CHANGE_NOTIFY;
+          attr.value.ptr = (void *)sai_thrift_port_state_change_notification;
+          break;
+        case sai_thrift_notification_type_t::FDB_EVENT:
+          attr.id = SAI_SWITCH_ATTR_FDB_EVENT_NOTIFY;
+          attr.value.ptr = (void *)sai_thrift_fdb_event_notification;
+          break;
+        case sai_thrift_notification_type_t::SWITCH_STATE_CHANGE:
+          attr.id = SAI_SWITCH_ATTR_SWITCH_STATE_CHANGE_NOTIFY;
+          attr.value.ptr = (void *)sai_thrift_switch_state_change_notification;
+          break;
+        case sai_thrift_notification_type_t::SWITCH_SHUTDOWN_REQUEST:
+          attr.id = SAI_SWITCH_ATTR_SWITCH_SHUTDOWN_REQUEST_NOTIFY;
+          attr.value.ptr =
+              (void *)sai_thrift_switch_shutdown_request_notification;
+          break;
+        default:
+          status = SAI_STATUS_INVALID_PARAMETER;
+          continue;
+      }
+      status = switch_api->set_switch_attribute(switch_id, &attr);
+    }
+
+    if (status != SAI_STATUS_SUCCESS) {
+      sai_thrift_exception e;
+      e.status = status;
+      throw e;
+    }
+
+    std::lock_guard<std::mutex> lock(notification_mutex);
+    return notification_sequence;
+  }
+
+  /**
+   * @brief Get the notifications of the given types (all if empty) after
+   *        the given sequence number, waiting up to timeout_ms for the
+   *        first one
+   */
+  void sai_thrift_get_notifications(
+      std::vector<sai_thrift_notification_t> &notifications,
+      const int64_t sequence,
+      const std::vector<sai_thrift_notification_type_t::type> &types,
+      const int32_t max_count,
+      const int32_t timeout_ms) {
+    auto deadline = std::chrono::steady_clock::now() +
+                    std::chrono::milliseconds(timeout_ms);
+    std::unique_lock<std::mutex> lock(notification_mutex);
+
+    do {
+      for (const auto &notification : notification_queue) {
+        if (notification.sequence <= sequence) {
+          continue;
+        }
+        if (!types.empty() &&
+            std::find(types.begin(), types.end(), notification.type) ==
+                types.end()) {
+          continue;
+        }
+        notifications.push_back(notification);
+        if (max_count > 0 && notifications.size() >= (size_t)max_count) {
+          return;
+        }
+      }
+      if (!notifications.empty()) {
+        return;
+      }
+    } while (notification_cv.wait_until(lock, deadline) ==
+             std::cv_status::no_timeout);
+  }
 };
 
-static pthread_mutex_t cookie_mutex;
-static pthread_cond_t cookie_cv;
+/**
+ * Thread-safety policy of the SAI calls, when the server serves several
+ * connections in parallel (threaded, threadpool and nonblocking modes):
+ *  - serialized (default): one RPC at a time calls SAI, whatever its
+ *    connection, so the SAI library does not need to be thread-safe.
+ *  - concurrent: the RPCs of different connections call SAI in parallel,
+ *    for SAI libraries which are thread-safe. The switch create and remove
+ *    RPCs and sai_api_uninitialize() still run alone.
+ * sai_thrift_get_notifications() only reads the notification queue, which
+ * has its own lock, so a client waiting for notifications never blocks the
+ * other ones.
+ */
+class sai_thrift_call_lock : public TProcessorEventHandler {
+ public:
+  explicit sai_thrift_call_lock(bool serialized) : serialized(serialized) {
+    pthread_rwlock_init(&lock, NULL);
+  }
+
+  ~sai_thrift_call_lock() { pthread_rwlock_destroy(&lock); }
+
+  /**
+   * @brief Called by the processor before reading an RPC call, the context
+   *        is given back to freeContext() once the reply is written
+   */
+  void *getContext(const char *fn_name, void *server_context) {
+    (void)server_context;
+    if (has_suffix(fn_name, "get_notifications")) {
+      return NULL;
+    }
+    if (serialized || has_suffix(fn_name, "create_switch") ||
+        has_suffix(fn_name, "remove_switch") ||
+        has_suffix(fn_name, "api_uninitialize")) {
+      pthread_rwlock_wrlock(&lock);
+    } else {
+      pthread_rwlock_rdlock(&lock);
+    }
+    return &lock;
+  }
+
+  void freeContext(void *ctx, const char *fn_name) {
+    (void)fn_name;
+    if (ctx != NULL) {
+      pthread_rwlock_unlock(&lock);
+    }
+  }
+
+ private:
+  static bool has_suffix(const char *name, const char *suffix) {
+    size_t name_len = strlen(name);
+    size_t suffix_len = strlen(suffix);
+    return name_len >= suffix_len &&
+           strcmp(name + name_len - suffix_len, suffix) == 0;
+  }
+
+  bool serialized;
+  pthread_rwlock_t lock;
+};
+
+/**
+ * @brief Create a handler and processor per connection, so any state of
+ *        the handler belongs to its connection. All the connections drive
+ *        the same switch: the switch handle is shared by the process, it is
+ *        only set by the switch create and remove RPCs, which always run
+ *        alone (see sai_thrift_call_lock).
+ */
+class sai_rpcFrontendProcessorFactory : public TProcessorFactory {
+ public:
+  explicit sai_rpcFrontendProcessorFactory(
+      const std::shared_ptr<TProcessorEventHandler> &call_lock)
+      : call_lock(call_lock) {}
+
+  std::shared_ptr<TProcessor> getProcessor(const TConnectionInfo &conn_info) {
+    (void)conn_info;
+    std::shared_ptr<sai_rpcHandlerFrontend> handler(
+        new sai_rpcHandlerFrontend());
+    std::shared_ptr<TProcessor> processor(new sai_rpcProcessor(handler));
+    processor->setEventHandler(call_lock);
+    return processor;
+  }
+
+ private:
+  std::shared_ptr<TProcessorEventHandler> call_lock;
+};
+
+/**
+ * RPC server options, set by configure_sai_thrift_rpc_server(). The options
+ * not set are read from the environment, or get their default value:
+ *  - mode (SAI_RPC_SERVER_MODE): simple (default, one connection at a
+ *    time), threaded (one thread per connection), threadpool (a pool of
+ *    threads, one per connection) or nonblocking (a pool of threads
+ *    serving the calls of all the connections, requires framed transport,
+ *    built with SAI_THRIFT_NONBLOCKING_SERVER)
+ *  - threads (SAI_RPC_SERVER_THREADS): threads of the threadpool and
+ *    nonblocking modes, 8 by default
+ *  - transport (SAI_RPC_SERVER_TRANSPORT): buffered (default) or framed,
+ *    the clients have to use the same one
+ *  - thread_safety (SAI_RPC_SERVER_THREAD_SAFETY): serialized (default) or
+ *    concurrent, see sai_thrift_call_lock
+ */
+static std::string rpc_server_mode;
+static int rpc_server_threads = 0;
+static std::string rpc_server_transport;
+static std::string rpc_server_thread_safety;
+
+static std::string sai_thrift_rpc_server_option(const std::string &value,
+                                                const char *env_name,
+                                                const char *default_value) {
+  if (!value.empty()) {
+    return value;
+  }
+  const char *env_value = getenv(env_name);
+  return env_value != NULL && *env_value ? env_value : default_value;
+}
+
+/**
+ * The cookie is the running server, stopped by
+ * stop_p4_sai_thrift_rpc_server(). It is reset when the server returns.
+ */
+static pthread_mutex_t cookie_mutex = PTHREAD_MUTEX_INITIALIZER;
+static pthread_cond_t cookie_cv = PTHREAD_COND_INITIALIZER;
 static void *cookie;
+static bool cookie_ready;
 
 /**
  * @brief Create a Thrift RPC server thread
  */
 static void *sai_thrift_rpc_server_thread(void *arg) {
   int port = *(int *)arg;
-  std::shared_ptr<sai_rpcHandlerFrontend> handler(new sai_rpcHandlerFrontend());
-  std::shared_ptr<TProcessor> processor(new sai_rpcProcessor(handler));
-  std::shared_ptr<TServerTransport> serverTransport(new TServerSocket(port));
-  std::shared_ptr<TTransportFactory> transportFactory(
-      new TBufferedTransportFactory());
+  std::string mode = sai_thrift_rpc_server_option(
+      rpc_server_mode, "SAI_RPC_SERVER_MODE", "simple");
+  std::string transport = sai_thrift_rpc_server_option(
+      rpc_server_transport, "SAI_RPC_SERVER_TRANSPORT", "buffered");
+  std::string thread_safety =
+      sai_thrift_rpc_server_option(rpc_server_thread_safety,
+                                   "SAI_RPC_SERVER_THREAD_SAFETY",
+                                   "serialized");
+  int threads = rpc_server_threads;
+  if (threads < 1) {
+    const char *env_threads = getenv("SAI_RPC_SERVER_THREADS");
+    threads = env_threads != NULL ? atoi(env_threads) : 0;
+  }
+  if (threads < 1) {
+    threads = 8;
+  }
+  // unsupported modes fall back to simple before the mode selects the
+  // transport and the thread manager
+  if (mode != "simple" && mode != "threaded" && mode != "threadpool"
+#ifdef SAI_THRIFT_NONBLOCKING_SERVER
+      && mode != "nonblocking"
+#endif
+  ) {
+    std::cerr << "Unsupported SAI RPC server mode " << mode
+              << ", using simple" << std::endl;
+    mode = "simple";
+  }
+  if (mode == "nonblocking") {
+    transport = "framed";
+  }
+
+  std::shared_ptr<TProcessorEventHandler> call_lock(
+      new sai_thrift_call_lock(thread_safety != "concurrent"));
+  std::shared_ptr<TProcessorFactory> processorFactory(
+      new sai_rpcFrontendProcessorFactory(call_lock));
+  std::shared_ptr<TTransportFactory> transportFactory;
+  if (transport == "framed") {
+    transportFactory.reset(new TFramedTransportFactory());
+  } else {
+    transportFactory.reset(new TBufferedTransportFactory());
+  }
   std::shared_ptr<TProtocolFactory> protocolFactory(
       new TBinaryProtocolFactory());
 
-  TSimpleServer server(
-      processor, serverTransport, transportFactory, protocolFactory);
+  std::shared_ptr<ThreadManager> threadManager;
+  if (mode == "threadpool" || mode == "nonblocking") {
+    threadManager = ThreadManager::newSimpleThreadManager(threads);
+    threadManager->threadFactory(
+        std::make_shared<sai_thrift_thread_factory>());
+    threadManager->start();
+  }
+
+  std::shared_ptr<TServer> server;
+  if (mode == "threaded") {
+    server.reset(new TThreadedServer(processorFactory,
+                                     std::make_shared<TServerSocket>(port),
+                                     transportFactory,
+                                     protocolFactory));
+  } else if (mode == "threadpool") {
+    server.reset(new TThreadPoolServer(processorFactory,
+                                       std::make_shared<TServerSocket>(port),
+                                       transportFactory,
+                                       protocolFactory,
+                                       threadManager));
+#ifdef SAI_THRIFT_NONBLOCKING_SERVER
+  } else if (mode == "nonblocking") {
+    server.reset(new TNonblockingServer(
+        processorFactory,
+        protocolFactory,
+        std::make_shared<TNonblockingServerSocket>(port),
+        threadManager));
+#endif
+  } else {
+    server.reset(new TSimpleServer(processorFactory,
+                                   std::make_shared<TServerSocket>(port),
+                                   transportFactory,
+                                   protocolFactory));
+  }
+  std::cerr << "SAI RPC server mode: " << mode << ", transport: " << transport
+            << ", SAI calls: " << thread_safety << std::endl;
+
   pthread_mutex_lock(&cookie_mutex);
-  cookie = (void *)processor.get();
+  cookie = (void *)server.get();
+  cookie_ready = true;
   pthread_cond_signal(&cookie_cv);
   pthread_mutex_unlock(&cookie_mutex);
-  server.serve();
+  server->serve();
+
+  pthread_mutex_lock(&cookie_mutex);
+  cookie = NULL;
+  pthread_mutex_unlock(&cookie_mutex);
+  if (threadManager) {
+    threadManager->stop();
+  }
   return 0;
 }
 
@@ -915,6 +1314,29 @@ static pthread_t sai_thrift_rpc_thread;
 
 extern "C" {
 
+/**
+ * @brief Configure the Thrift RPC server, before starting it. NULL or 0
+ *        leaves an option to its environment or default value.
+ */
+int configure_sai_thrift_rpc_server(const char *mode,
+                                    int threads,
+                                    const char *transport,
+                                    const char *thread_safety) {
+  if (mode != NULL) {
+    rpc_server_mode = mode;
+  }
+  if (threads > 0) {
+    rpc_server_threads = threads;
+  }
+  if (transport != NULL) {
+    rpc_server_transport = transport;
+  }
+  if (thread_safety != NULL) {
+    rpc_server_thread_safety = thread_safety;
+  }
+  return 0;
+}
+
 /**
  * @brief Start Thrift RPC server
  */
@@ -924,16 +1346,15 @@ int start_p4_sai_thrift_rpc_server(char *port) {
   std::cerr << "Starting SAI RPC server on port " << port << std::endl;
 
   cookie = NULL;
+  cookie_ready = false;
   int status = pthread_create(
       &sai_thrift_rpc_thread, NULL, sai_thrift_rpc_server_thread, param);
   if (status) return status;
   pthread_mutex_lock(&cookie_mutex);
-  while (!cookie) {
+  while (!cookie_ready) {
     pthread_cond_wait(&cookie_cv, &cookie_mutex);
   }
   pthread_mutex_unlock(&cookie_mutex);
-  pthread_mutex_destroy(&cookie_mutex);
-  pthread_cond_destroy(&cookie_cv);
   return status;
 }
 
@@ -951,11 +1372,12 @@ int start_sai_thrift_rpc_server(int port)
  * @brief Stop Thrift RPC server
  */
 int stop_p4_sai_thrift_rpc_server(void) {
-  int status = pthread_cancel(sai_thrift_rpc_thread);
-  if (status == 0) {
-    int s = pthread_join(sai_thrift_rpc_thread, NULL);
-    if (s) return s;
+  // the server returns from serve() and the thread stops its thread manager
+  pthread_mutex_lock(&cookie_mutex);
+  if (cookie) {
+    static_cast<TServer *>(cookie)->stop();
   }
-  return status;
+  pthread_mutex_unlock(&cookie_mutex);
+  return pthread_join(sai_thrift_rpc_thread, NULL);
 }
 }
@@ -21,6 +21,7 @@ and/or dataplane automatically set up.
 """
 import os
 import time
+import atexit
 import inspect
 from threading import Thread
 
@@ -36,6 +37,7 @@ from thrift.protocol import TBinaryProtocol
 
 from sai_thrift import sai_rpc
 import LogConfig
+from sai_rpc_pipeline import AdapterPipeline, PipelinedClient
 from data_module.port import Port
 
 from sai_utils import *
@@ -53,6 +55,105 @@ PLATFORM = os.environ.get('PLATFORM')
 platform_map = {'broadcom': 'brcm', 'barefoot': 'bfn',
                 'mellanox': 'mlnx', 'common': 'common'}
 
+# Test attributes which are bound to a test instance
+# and never shared between tests
+SESSION_EXCLUDED_ATTRS = ['port_configer', 'shared_switch', 'session_kept']
+
+# Attributes a test may change on the objects of the shared setup,
+# checked and restored after every test
+SESSION_PORT_ATTRS = ['admin_state', 'mtu', 'port_vlan_id']
+SESSION_LAG_ATTRS = ['port_vlan_id']
+SESSION_SWITCH_ATTRS = ['src_mac_address',
+                        'fdb_aging_time',
+                        'fdb_unicast_miss_packet_action',
+                        'fdb_broadcast_miss_packet_action',
+                        'fdb_multicast_miss_packet_action',
+                        'ecmp_default_hash_seed',
+                        'lag_default_hash_seed']
+
+
+class SessionLayer:
+    """
+    Snapshot of a shared session layer
+
+    Attributes:
+        attrs: test attributes set by the layer
+        previous: values of those attributes before the layer was built,
+                  attributes which didn't exist are absent
+        teardown: function which removes the layer objects,
+                  called with the test as argument
+        resources: number of available switch resources
+                   after the layer was built
+        state: port, LAG and switch attributes after the layer was built,
+               dict from object OID (None for the switch) to attributes
+    """
+
+    def __init__(self, attrs, previous, teardown, resources, state):
+        self.attrs = attrs
+        self.previous = previous
+        self.teardown = teardown
+        self.resources = resources
+        self.state = state
+
+
+class SharedSession:
+    """
+    Switch configuration shared by the tests of a PTF run in shared switch mode
+
+    The configuration is built in layers, e.g. the base switch setup of
+    SaiHelperBase and the topology of SaiHelper on top of it.
+
+    Attributes:
+        layers: dict from layer name to SessionLayer,
+                in the order the layers were built
+    """
+
+    def __init__(self):
+        self.layers = OrderedDict()
+
+    def top_layer(self):
+        """
+        Get the last built layer
+
+        Returns:
+            SessionLayer: the top layer, None if no layer is built
+        """
+        if not self.layers:
+            return None
+        return next(reversed(self.layers.values()))
+
+
+shared_session = SharedSession()
+
+
+def teardown_shared_session():
+    """
+    Remove the shared layers at the end of the PTF run
+
+    Registered once with atexit, the layers are removed with a client
+    of their own, as the tests which built them are already finished.
+    """
+    if not shared_session.layers:
+        return
+    cleaner = _SharedSessionCleaner()
+    cleaner.test_params = test_params_get()
+    cleaner.createRpcClient()
+    try:
+        cleaner.set_accepted_exception()
+        cleaner.drop_session_layers(keep=['base'])
+        cleaner.restore_session_layer('base')
+        for port in cleaner.port_list:
+            sai_thrift_set_port_attribute(
+                cleaner.client, port, port_vlan_id=0)
+        shared_session.layers.clear()
+    finally:
+        if cleaner.pipeline is not None:
+            cleaner.pipeline.shutdown()
+        cleaner.transport.close()
+
+
+atexit.register(teardown_shared_session)
+
 
 class ThriftInterface(BaseTest):
     """
@@ -67,6 +168,7 @@ class ThriftInterface(BaseTest):
         interface_to_front_mapping: Config from port_map_file for the interface (local) to front(PTF) mapping 
         protocol: Thrift protocol object
         client: RPC client which used in Thrift
+        pipeline: AdapterPipeline for pipelined calls, None if not enabled
     """
 
     def __init__(self, *args, **kwargs):
@@ -123,6 +225,11 @@ class ThriftInterface(BaseTest):
         RPC client which used in Thrift
         """
 
+        self.pipeline = None
+        """
+        AdapterPipeline, set if 'rpc_pipeline_depth' test param is given
+        """
+
 
     def setUp(self):
         super(ThriftInterface, self).setUp()
@@ -199,6 +306,14 @@ class ThriftInterface(BaseTest):
 
 
     def tearDown(self):
+        if counter_wait_times:
+            print("Counter waits: {}, converged in {:.2f} sec".format(
+                len(counter_wait_times),
+                sum(elapsed for _, elapsed, _ in counter_wait_times)))
+            del counter_wait_times[:]
+        if self.pipeline is not None:
+            self.pipeline.shutdown()
+            self.pipeline = None
         self.transport.close()
         super(ThriftInterface, self).tearDown()
 
@@ -249,12 +364,23 @@ class ThriftInterface(BaseTest):
             server = 'localhost'
 
         self.transport = TSocket.TSocket(server, THRIFT_PORT)
-        self.transport = TTransport.TBufferedTransport(self.transport)
+        # must be the transport of the RPC server
+        if self.test_params.get('thrift_transport') == 'framed':
+            self.transport = TTransport.TFramedTransport(self.transport)
+        else:
+            self.transport = TTransport.TBufferedTransport(self.transport)
         self.protocol = TBinaryProtocol.TBinaryProtocol(self.transport)
 
         self.client = sai_rpc.Client(self.protocol)
         self.transport.open()
 
+        # Pipelined mode: requests share the connection with the regular
+        # calls, so the client is replaced with the pipelined proxy
+        if 'rpc_pipeline_depth' in self.test_params:
+            self.client = PipelinedClient(self.client)
+            self.pipeline = AdapterPipeline(
+                self.client, int(self.test_params['rpc_pipeline_depth']))
+
 
 
 class ThriftInterfaceDataPlane(ThriftInterface):
@@ -312,10 +438,23 @@ class SaiHelperBase(ThriftInterfaceDataPlane):
         self.port_list - list of all active port objects
         self.portX objects for all active ports (where X is a port number)
         self.port_configer for config ports
+
+    Shared switch mode (test param 'shared_switch=True'):
+        The switch setup is built by the first test only, and the created
+        OIDs are restored from a snapshot by the next tests. A test must
+        remove the objects it creates; if the available switch resources
+        differ after the test, the shared setup is removed and built again
+        by the next test. The port, LAG and switch attributes changed by
+        the test are set back to the values of the shared setup.
     """
 
     platform = 'common'
 
+    shared_layers = ['base']
+    """
+    Shared session layers used by the test class
+    """
+
     def __init__(self, *args, **kwargs):
         """
         Init the T0 Test Object.
@@ -360,6 +499,182 @@ class SaiHelperBase(ThriftInterfaceDataPlane):
         """
         self.def_bridge_port_list = []
         self.def_vlan_member_list = []
+        self.shared_switch = False
+        """
+        If the switch setup is shared with other tests
+        """
+        self.session_kept = None
+        """
+        If the shared setup is kept after the test, None if not checked yet
+        """
+
+
+    def session_baseline(self):
+        """
+        Get the test attributes before a shared session layer is built
+
+        Returns:
+            dict: copy of the test attributes
+        """
+        return dict(vars(self))
+
+
+    def save_session_layer(self, layer, baseline, teardown=None):
+        """
+        Snapshot the attributes set since the baseline as a shared layer
+
+        Together with the test attributes, the available switch resources
+        and the port, LAG and switch attributes are saved, so the layer
+        can be checked after the tests which use it.
+
+        Args:
+            layer (str): layer name
+            baseline (dict): test attributes before the layer was built
+            teardown (Callable): function which removes the layer objects,
+                                 called with the test as argument
+        """
+        attrs = {name: value for name, value in vars(self).items()
+                 if name not in SESSION_EXCLUDED_ATTRS and
+                 (name not in baseline or baseline[name] is not value)}
+        previous = {name: baseline[name] for name in attrs
+                    if name in baseline}
+        shared_session.layers[layer] = SessionLayer(
+            attrs, previous, teardown,
+            self.saveNumberOfAvaiableResources(), self.session_state())
+
+
+    def restore_session_layer(self, layer):
+        """
+        Restore the attributes of a shared layer
+
+        Args:
+            layer (str): layer name
+
+        Returns:
+            bool: True if the layer is built
+        """
+        if layer not in shared_session.layers:
+            return False
+        for name, value in shared_session.layers[layer].attrs.items():
+            # lists are copied so the test can't change the snapshot
+            setattr(self, name, list(value) if isinstance(value, list) else value)
+        return True
+
+
+    def drop_session_layers(self, keep=()):
+        """
+        Remove the shared layers which are not in keep, from the top one
+
+        The attributes of a removed layer are set back to their values
+        before the layer was built.
+
+        Args:
+            keep (List): names of the layers to keep
+        """
+        for layer in reversed(list(shared_session.layers)):
+            if layer in keep:
+                continue
+            self.restore_session_layer(layer)
+            snapshot = shared_session.layers.pop(layer)
+            if snapshot.teardown is not None:
+                snapshot.teardown(self)
+            for name in snapshot.attrs:
+                if name in snapshot.previous:
+                    setattr(self, name, snapshot.previous[name])
+                elif name in vars(self):
+                    delattr(self, name)
+
+
+    def session_state(self):
+        """
+        Read the port, LAG and switch attributes a test may change
+
+        Returns:
+            dict: object OID (None for the switch) to dict of attributes,
+                  attributes the switch doesn't support are absent
+        """
+        def read(getter, oid, names):
+            values = {}
+            for name in names:
+                attr = getter(self.client, oid, **{name: True})
+                if self.status() == SAI_STATUS_SUCCESS and attr:
+                    values[name] = attr[name]
+            return values
+
+        def switch_getter(client, _, **kwargs):
+            return sai_thrift_get_switch_attribute(client, **kwargs)
+
+        skip_on_error = adapter.SKIP_TEST_ON_EXPECTED_ERROR
+        adapter.SKIP_TEST_ON_EXPECTED_ERROR = False
+        try:
+            state = {None: read(switch_getter, None, SESSION_SWITCH_ATTRS)}
+            for port in self.port_list:
+                state[port] = read(sai_thrift_get_port_attribute,
+                                   port, SESSION_PORT_ATTRS)
+            for lag in getattr(self, 'def_lag_list', []):
+                state[lag] = read(sai_thrift_get_lag_attribute,
+                                  lag, SESSION_LAG_ATTRS)
+        finally:
+            adapter.SKIP_TEST_ON_EXPECTED_ERROR = skip_on_error
+        return state
+
+
+    def restore_session_state(self, state):
+        """
+        Set back the port, LAG and switch attributes changed by a test
+
+        Args:
+            state (dict): attributes saved by session_state
+
+        Returns:
+            bool: True if all the changed attributes are restored
+        """
+        setters = {None: lambda client, _, **kwargs:
+                   sai_thrift_set_switch_attribute(client, **kwargs)}
+        for port in self.port_list:
+            setters[port] = sai_thrift_set_port_attribute
+        for lag in getattr(self, 'def_lag_list', []):
+            setters[lag] = sai_thrift_set_lag_attribute
+
+        restored = True
+        current = self.session_state()
+        for oid, attrs in state.items():
+            for name, value in attrs.items():
+                if current.get(oid, {}).get(name) == value:
+                    continue
+                print("Restore shared setup attribute {} of {}".format(
+                    name, 'switch' if oid is None else hex(oid)))
+                if oid not in setters:
+                    restored = False
+                    continue
+                setters[oid](self.client, oid, **{name: value})
+                restored = restored and self.status() == SAI_STATUS_SUCCESS
+        return restored
+
+
+    def keep_shared_session(self):
+        """
+        Check if the test left the switch in the state of the shared setup
+
+        The available resources must match the top layer, the port, LAG and
+        switch attributes changed by the test are set back.
+
+        Returns:
+            bool: True if the shared setup can be used by the next test
+        """
+        if not self.shared_switch or not shared_session.layers:
+            return False
+        if self.session_kept is None:
+            layer = shared_session.top_layer()
+            self.session_kept = self.verifyNumberOfAvaiableResources(
+                layer.resources, debug=True)
+            if not self.session_kept:
+                print("Switch resources changed, shared setup will be rebuilt")
+            elif not self.restore_session_state(layer.state):
+                print("Switch attributes not restored, "
+                      "shared setup will be rebuilt")
+                self.session_kept = False
+        return self.session_kept
 
 
     def set_logger_name(self):
@@ -427,29 +742,65 @@ class SaiHelperBase(ThriftInterfaceDataPlane):
         
 
         # For brcm devices, need to init and setup the ports at once after start the switch.
-        retries = 10
-        down_port_list = []
-        for index, oid in enumerate(self.port_list):
-            port_attr = sai_thrift_get_port_attribute(
-                self.client, oid, oper_status=True)
-            print("Turn up port {}".format(oid))
-            port_up = True
-            if port_attr['oper_status'] != SAI_PORT_OPER_STATUS_UP:
-                port_up = False
-                for num_of_tries in range(retries):
-                    port_attr = sai_thrift_get_port_attribute(
-                        self.client, oid, oper_status=True)
-                    if port_attr['oper_status'] == SAI_PORT_OPER_STATUS_UP:
-                        port_up = True
-                        break
-                    time.sleep(5)
-                    print("port {}:{} is not up, status: {}. Retry. Waiting for Admin State Up.".format(
-                        index, oid, port_attr['oper_status']))
-            if not port_up:
-                down_port_list.append(index)
-        if down_port_list:
+        down_ports = self.wait_ports_up(self.port_list, timeout=50)
+        if down_ports:
+            down_port_list = [self.port_list.index(oid) for oid in down_ports]
             print("Ports {} are  down after retries.".format(down_port_list))
 
+    def wait_ports_up(self, ports, timeout, interval=5):
+        """
+        Wait for ports to be UP.
+
+        Waits for the port state change notifications if the RPC server
+        supports them, and reads the oper status of the ports still down
+        every interval, in case a notification is missed.
+
+        Args:
+            ports (list): port objects
+            timeout (int): timeout in sec
+            interval (int): oper status polling interval in sec
+
+        Returns:
+            list: ports still down after the timeout
+        """
+        def port_down(port):
+            attr = sai_thrift_get_port_attribute(
+                self.client, port, oper_status=True)
+            return attr['oper_status'] != SAI_PORT_OPER_STATUS_UP
+
+        # subscribe before reading the status, not to miss any change
+        stream = open_notification_stream(
+            self.client, [sai_thrift_notification_type_t.PORT_STATE_CHANGE])
+        down_ports = set(port for port in ports if port_down(port))
+
+        if stream is not None:
+            def all_up(notification):
+                if notification.object_id in ports:
+                    if notification.state == SAI_PORT_OPER_STATUS_UP:
+                        down_ports.discard(notification.object_id)
+                    else:
+                        down_ports.add(notification.object_id)
+                return not down_ports
+
+            deadline = time.time() + timeout
+            while down_ports:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                if stream.wait(all_up, min(interval, remaining)):
+                    break
+                down_ports.intersection_update(
+                    [port for port in down_ports if port_down(port)])
+        else:
+            deadline = time.time() + timeout
+            while down_ports and time.time() < deadline:
+                print("Ports {} are not up. Retry.".format(sorted(down_ports)))
+                time.sleep(interval)
+                down_ports = set(port for port in down_ports
+                                 if port_down(port))
+
+        return [port for port in ports if port in down_ports]
+
 
     def shell(self):
         '''
@@ -567,6 +918,20 @@ class SaiHelperBase(ThriftInterfaceDataPlane):
 
     def setUp(self):
         super(SaiHelperBase, self).setUp()
+        self.shared_switch = self.test_params.get('shared_switch', False)
+        self.session_kept = None
+        if self.shared_switch and self.restore_session_layer('base'):
+            self.port_configer = PortConfiger(self)
+            self.set_logger_name()
+            self.set_accepted_exception()
+            self.getSwitchPorts()
+            # remove the shared layers this test doesn't use
+            self.drop_session_layers(keep=self.shared_layers)
+            self.restore_session_layer('base')
+            print("Reuse shared SaiHelperBase setup")
+            return
+
+        baseline = self.session_baseline()
         if 'port_config_ini' in self.test_params:
             self.port_config_ini_loader = PortConfigInILoader(self.test_params['port_config_ini'])
         else:
@@ -617,15 +982,24 @@ class SaiHelperBase(ThriftInterfaceDataPlane):
         # get cpu port queue handles
         self.check_cpu_port_hdl()
 
+        if self.shared_switch:
+            shared_session.layers.clear()
+            self.save_session_layer('base', baseline)
+
         print("Finish SaiHelperBase setup")
 
 
     def tearDown(self):
         try:
+            keep = self.keep_shared_session()
+            if self.shared_switch and not keep:
+                shared_session.layers.clear()
             for port in self.port_list:
                 sai_thrift_clear_port_stats(self.client, port)
-                sai_thrift_set_port_attribute(
-                    self.client, port, port_vlan_id=0)
+                # the port VLAN IDs of a kept setup are already restored
+                if not keep:
+                    sai_thrift_set_port_attribute(
+                        self.client, port, port_vlan_id=0)
             #Todo: Remove this condition after brcm's remove_switch issue fixed
             if get_platform() == 'brcm':
                 return
@@ -694,22 +1068,9 @@ class SaiHelperBase(ThriftInterfaceDataPlane):
         Args:
             timeout (int): port verification timeout in sec
         """
-        allup = False
-        timer_start = time.time()
-
-        while allup is False and time.time() - timer_start < timeout:
-            allup = True
-            for port in self.port_list:
-                attr = sai_thrift_get_port_attribute(
-                    self.client, port, oper_status=True)
-                if attr['oper_status'] != SAI_SWITCH_OPER_STATUS_UP:
-                    allup = False
-                    break
-            if allup:
-                break
-            time.sleep(5)
+        down_ports = self.wait_ports_up(self.port_list, timeout)
 
-        self.assertTrue(allup)
+        self.assertEqual(down_ports, [])
 
     def getSwitchPorts(self):
         """
@@ -817,17 +1178,37 @@ class SaiHelperBase(ThriftInterfaceDataPlane):
         """
         return adapter.status
 
-    @staticmethod
-    def saiWaitFdbAge(timeout):
+    def saiWaitFdbAge(self, timeout, macs=None):
         """
         Wait for fdb entry to ageout
 
+        Waits for the FDB aged notifications of the given entries if the
+        RPC server supports them, sleeps for timeout and the aging interval
+        otherwise.
+
         Args:
             timeout (int): Timeout value in seconds
+            macs (list): MAC addresses of all the learned entries which must
+                         age, sleeps for the whole interval if None
         """
         print("Waiting for fdb entry to age")
         aging_interval_buffer = 10
-        time.sleep(timeout + aging_interval_buffer)
+        stream = None
+        if macs:
+            stream = open_notification_stream(
+                self.client, [sai_thrift_notification_type_t.FDB_EVENT])
+        if stream is None:
+            time.sleep(timeout + aging_interval_buffer)
+            return
+
+        pending = set(mac.lower() for mac in macs)
+
+        def aged(notification):
+            if notification.state == SAI_FDB_EVENT_AGED:
+                pending.discard(notification.fdb_entry.mac_address)
+            return not pending
+
+        stream.wait(aged, timeout + aging_interval_buffer)
 
 
 class SaiHelperUtilsMixin:
@@ -1076,9 +1457,16 @@ class SaiHelper(SaiHelperUtilsMixin, SaiHelperBase):
             packet_action=SAI_PACKET_ACTION_DROP)
         self.assertEqual(self.status(), SAI_STATUS_SUCCESS)
 
+    shared_layers = ['base', 'topology']
+
     def setUp(self):
         super(SaiHelper, self).setUp()
 
+        if self.shared_switch and self.restore_session_layer('topology'):
+            print("Reuse shared SaiHelper topology")
+            return
+        baseline = self.session_baseline()
+
         # lists of default objects
         self.def_bridge_port_list = []
         self.def_lag_list = []
@@ -1130,19 +1518,41 @@ class SaiHelper(SaiHelperUtilsMixin, SaiHelperBase):
         # Create default route before create route in detaul VRF
         self.create_default_v4_v6_route_entry()
 
-    def tearDown(self):
+        if self.shared_switch:
+            self.save_session_layer('topology', baseline,
+                                    teardown=SaiHelper.destroy_topology)
+
+    def destroy_topology(self):
+        """
+        Remove the common ports configuration.
+
+        Only uses SaiHelperUtilsMixin, so it can remove a shared topology
+        from a test of any SaiHelperBase class.
+        """
         sai_thrift_set_port_attribute(self.client, self.port2, port_vlan_id=0)
         sai_thrift_set_lag_attribute(self.client, self.lag1, port_vlan_id=0)
         sai_thrift_set_port_attribute(self.client, self.port0, port_vlan_id=0)
 
-        self.destroy_routing_interfaces()
-        self.destroy_vlans_with_members()
-        self.destroy_bridge_ports()
-        self.destroy_lags_with_members()
+        SaiHelperUtilsMixin.destroy_routing_interfaces(self)
+        SaiHelperUtilsMixin.destroy_vlans_with_members(self)
+        SaiHelperUtilsMixin.destroy_bridge_ports(self)
+        SaiHelperUtilsMixin.destroy_lags_with_members(self)
+
+    def tearDown(self):
+        if not self.keep_shared_session():
+            self.destroy_topology()
+            shared_session.layers.pop('topology', None)
 
         super(SaiHelper, self).tearDown()
 
 
+class _SharedSessionCleaner(SaiHelperUtilsMixin, SaiHelperBase):
+    """
+    Test object used by teardown_shared_session to remove the shared layers,
+    it has no runTest so it is never collected as a test
+    """
+
+
 class MinimalPortVlanConfig(SaiHelperBase):
     """
     Minimal port and vlan configuration. Create port_num bridge ports and add
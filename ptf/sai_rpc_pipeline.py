@@ -0,0 +1,251 @@
+# Copyright 2021-present Intel Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Pipelined mode of the SAI RPC client.
+
+Thrift replies on a connection come back in the order of requests, so many
+requests can be sent before their replies are read. PipelinedClient takes
+a ticket for every request and reads the replies in the ticket order, which
+lets several sai_adapter calls be in flight on a single connection.
+
+AdapterPipeline runs sai_adapter functions on a pool of threads and returns
+futures. sai_adapter keeps the 'status' per thread, and every call runs
+with the error handling settings (CATCH_EXCEPTIONS, ...) of the thread which
+submitted it, so their semantics are kept per call.
+
+Usage:
+    pipeline = AdapterPipeline(client, depth=16)
+    futures = [pipeline.submit(sai_thrift_create_vlan, vlan_id=vlan_id)
+               for vlan_id in range(100, 200)]
+    vlans = [future.result() for future in futures]
+"""
+
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+import sai_thrift.sai_adapter as adapter
+
+RPC_PREFIX = 'sai_thrift_'
+
+
+class PipelinedClient(object):
+    """
+    SAI RPC client proxy which allows many requests in flight
+
+    Requests are sent as soon as they are called and replies are read
+    in the same order. A call blocks until its own reply is read, so
+    the proxy can be used as a regular client as well.
+
+    Attributes:
+        client: Thrift RPC client
+    """
+
+    def __init__(self, client):
+        """
+        Init PipelinedClient
+
+        Args:
+            client (Client): Thrift RPC client
+        """
+        self.client = client
+        self._send_lock = threading.Lock()
+        self._reply_cv = threading.Condition()
+        self._next_ticket = 0
+        self._served_ticket = 0
+
+    def __getattr__(self, name):
+        if not name.startswith(RPC_PREFIX):
+            return getattr(self.client, name)
+
+        send = getattr(self.client, 'send_' + name)
+        recv = getattr(self.client, 'recv_' + name)
+
+        def call(*args):
+            """
+            Send the request and wait for its reply
+
+            Args:
+                args (List): RPC function arguments
+
+            Returns:
+                Any: RPC function return value
+            """
+            with self._send_lock:
+                send(*args)
+                ticket = self._next_ticket
+                self._next_ticket += 1
+
+            with self._reply_cv:
+                while self._served_ticket != ticket:
+                    self._reply_cv.wait()
+
+            try:
+                return recv()
+            finally:
+                with self._reply_cv:
+                    self._served_ticket += 1
+                    self._reply_cv.notify_all()
+
+        return call
+
+    def pending(self):
+        """
+        Get the number of requests waiting for replies
+
+        Returns:
+            int: number of pending requests
+        """
+        with self._send_lock:
+            return self._next_ticket - self._served_ticket
+
+
+class AdapterFuture(object):
+    """
+    Result of an sai_adapter function executed by AdapterPipeline
+    """
+
+    def __init__(self, future):
+        """
+        Init AdapterFuture
+
+        Args:
+            future (Future): future of (retval, status) tuple
+        """
+        self._future = future
+
+    def done(self):
+        """
+        Check if the call is finished
+
+        Returns:
+            bool: True if the call is finished
+        """
+        return self._future.done()
+
+    def result(self, timeout=None):
+        """
+        Get the value returned by the sai_adapter function
+
+        Args:
+            timeout (float): time to wait for the call in sec
+
+        Returns:
+            Any: sai_adapter function return value
+
+        Raises:
+            sai_thrift_exception: If an error occured
+                                  and sai_adapter.CATCH_EXCEPTIONS is False.
+        """
+        return self._future.result(timeout)[0]
+
+    def status(self, timeout=None):
+        """
+        Get the sai_adapter status of the call
+
+        Args:
+            timeout (float): time to wait for the call in sec
+
+        Returns:
+            int: the error code
+        """
+        return self._future.result(timeout)[1]
+
+
+class AdapterPipeline(object):
+    """
+    Executes sai_adapter functions concurrently on a pipelined client
+
+    Attributes:
+        client: PipelinedClient used by all calls
+        depth: maximum number of requests in flight
+    """
+
+    def __init__(self, client, depth=16):
+        """
+        Init AdapterPipeline
+
+        Args:
+            client (Client): Thrift RPC client or PipelinedClient
+            depth (int): maximum number of requests in flight
+        """
+        if not isinstance(client, PipelinedClient):
+            client = PipelinedClient(client)
+        self.client = client
+        self.depth = depth
+        self._executor = ThreadPoolExecutor(max_workers=depth)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+
+    def _call(self, name, settings, args, kwargs):
+        """
+        Execute the sai_adapter function in the worker thread
+
+        Args:
+            name (str): sai_adapter function name
+            settings (Dict): sai_adapter error handling settings
+            args (List): function arguments (without client)
+            kwargs (Dict): function keyword arguments
+
+        Returns:
+            Tuple[Any, int]: function return value and status
+        """
+        adapter.set_thread_settings(**settings)
+        retval = getattr(adapter, name)(self.client, *args, **kwargs)
+        return retval, adapter.status
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Schedule the sai_adapter function call
+
+        Args:
+            func (Callable): sai_adapter function, e.g. sai_thrift_create_vlan
+            args (List): function arguments (without client)
+            kwargs (Dict): function keyword arguments
+
+        Returns:
+            AdapterFuture: result of the call
+        """
+        future = self._executor.submit(
+            self._call, func.__name__, adapter.get_thread_settings(),
+            args, kwargs)
+
+        return AdapterFuture(future)
+
+    def map(self, func, kwargs_list):
+        """
+        Schedule the sai_adapter function call for every keyword arguments
+
+        Args:
+            func (Callable): sai_adapter function
+            kwargs_list (List[Dict]): keyword arguments of every call
+
+        Returns:
+            List[AdapterFuture]: results of the calls in the same order
+        """
+        return [self.submit(func, **kwargs) for kwargs in kwargs_list]
+
+    def shutdown(self, wait=True):
+        """
+        Stop the pipeline
+
+        Args:
+            wait (bool): wait for the scheduled calls
+        """
+        self._executor.shutdown(wait=wait)
@@ -23,6 +23,8 @@ import json
 
 from functools import wraps
 
+from thrift.Thrift import TApplicationException
+
 from ptf.packet import *
 from ptf.testutils import *
 
@@ -130,6 +132,129 @@ def sai_thrift_api_uninitialize(client):
     return obj_type
 
 
+NOTIFICATION_POLL_TIMEOUT = 0.5
+
+
+def sai_thrift_subscribe_notifications(client, types):
+    """
+    sai_thrift_subscribe_notifications() RPC client function
+    implementation
+
+    Args:
+        client (Client): SAI RPC client
+        types (list): sai_thrift_notification_type_t values
+
+    Returns:
+        int: sequence number of the last notification received by the
+             server, the next ones are returned by
+             sai_thrift_get_notifications()
+    """
+    return client.sai_thrift_subscribe_notifications(types)
+
+
+def sai_thrift_get_notifications(client, sequence, types=None, max_count=0,
+                                 timeout=NOTIFICATION_POLL_TIMEOUT):
+    """
+    sai_thrift_get_notifications() RPC client function
+    implementation
+
+    The server answers as soon as a notification is received, or after
+    the timeout. The RPC server may not serve other calls meanwhile, so
+    the timeout should be short.
+
+    Args:
+        client (Client): SAI RPC client
+        sequence (int): sequence number of the last notification read
+        types (list): sai_thrift_notification_type_t values, all if None
+        max_count (int): maximum number of notifications, 0 for all
+        timeout (float): maximum wait in sec
+
+    Returns:
+        list: sai_thrift_notification_t notifications after sequence
+    """
+    return client.sai_thrift_get_notifications(
+        sequence, types or [], max_count, int(timeout * 1000))
+
+
+class NotificationStream(object):
+    """
+    Notifications received by the switch since the stream was opened.
+
+        class attributes:
+            client: SAI RPC client
+            types: sai_thrift_notification_type_t values of the stream
+            sequence: sequence number of the last notification read
+    """
+
+    def __init__(self, client, types):
+        """
+        Init the stream, subscribes to the notifications.
+
+        Args:
+            client (Client): SAI RPC client
+            types (list): sai_thrift_notification_type_t values
+        """
+        self.client = client
+        self.types = list(types)
+        self.sequence = sai_thrift_subscribe_notifications(client, self.types)
+
+    def poll(self, timeout=NOTIFICATION_POLL_TIMEOUT):
+        """
+        Get the next notifications.
+
+        Args:
+            timeout (float): maximum wait for the first one in sec
+
+        Returns:
+            list: sai_thrift_notification_t notifications
+        """
+        notifications = sai_thrift_get_notifications(
+            self.client, self.sequence, self.types, timeout=timeout)
+        if notifications:
+            self.sequence = notifications[-1].sequence
+        return notifications
+
+    def wait(self, match, timeout):
+        """
+        Read the notifications until one of them matches.
+
+        Args:
+            match (function): called with every notification, returns True
+                              when the wait is over
+            timeout (float): timeout in sec
+
+        Returns:
+            bool: False if the timeout expired
+        """
+        deadline = time.time() + timeout
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return False
+            for notification in self.poll(
+                    min(remaining, NOTIFICATION_POLL_TIMEOUT)):
+                if match(notification):
+                    return True
+
+
+def open_notification_stream(client, types):
+    """
+    Open a notification stream, if the RPC server supports notifications.
+
+    Args:
+        client (Client): SAI RPC client
+        types (list): sai_thrift_notification_type_t values
+
+    Returns:
+        NotificationStream: the stream, None if not supported
+    """
+    try:
+        return NotificationStream(client, types)
+    except (sai_thrift_exception, TApplicationException) as e:
+        print("Notifications are not supported: {}".format(e))
+        return None
+
+
 def sai_thrift_get_debug_counter_port_stats(client, port_oid, counter_ids):
     """
     Get port statistics for given debug counters
@@ -347,6 +472,141 @@ def delay_wrapper(func, delay=2):
 sai_thrift_flush_fdb_entries = delay_wrapper(sai_thrift_flush_fdb_entries)
 
 
+COUNTER_WAIT_TIMEOUT = 5
+COUNTER_WAIT_INTERVAL = 0.02
+COUNTER_WAIT_MAX_INTERVAL = 0.5
+COUNTER_STABLE_POLLS = 2
+
+counter_wait_times = []
+"""
+Convergence time of every counter wait, as (name, seconds, converged)
+"""
+
+
+class CounterWatch(object):
+    """
+    Polls counters until they reach expected values or stop changing.
+
+    The interval between two reads starts short and doubles up to
+    max_interval, so counters which are updated at once are read right
+    away, while slow targets are not flooded with RPCs.
+
+        class attributes:
+            read: function returning the counters, e.g. a dict of stats
+            expected: expected counters, a dict is compared to the same keys
+                      of the counters, a function is called with the
+                      counters, any other value is compared to the
+                      counters. None waits until the counters stop changing
+            name: name used in the metrics
+            stats: the last counters read
+            converged: if the counters converged before the timeout
+            elapsed: time to converge, or the timeout, in seconds
+            polls: number of reads
+    """
+
+    def __init__(self, read, expected=None, name=None,
+                 timeout=COUNTER_WAIT_TIMEOUT,
+                 interval=COUNTER_WAIT_INTERVAL,
+                 max_interval=COUNTER_WAIT_MAX_INTERVAL,
+                 stable_polls=COUNTER_STABLE_POLLS):
+        """
+        Init the counter watch.
+
+        Args:
+            read (function): function returning the counters
+            expected (dict): expected counters or function checking them,
+                             None to wait until they stop changing
+            name (str): name used in the metrics, name of read by default
+            timeout (float): maximum wait in sec
+            interval (float): first interval between reads in sec
+            max_interval (float): maximum interval between reads in sec
+            stable_polls (int): number of identical reads after which the
+                                counters stopped changing
+        """
+        self.read = read
+        self.expected = expected
+        self.name = name or getattr(read, '__name__', 'counters')
+        self.timeout = timeout
+        self.interval = interval
+        self.max_interval = max_interval
+        self.stable_polls = stable_polls
+        self.stats = None
+        self.converged = False
+        self.elapsed = 0.0
+        self.polls = 0
+
+    def reached(self, stats):
+        """
+        If the counters have the expected values.
+
+        Args:
+            stats: counters read
+
+        Returns:
+            bool: True if the counters have the expected values
+        """
+        if callable(self.expected):
+            return self.expected(stats)
+        if isinstance(self.expected, dict):
+            return all(stats.get(key) == value
+                       for key, value in self.expected.items())
+        return stats == self.expected
+
+    def wait(self):
+        """
+        Poll the counters until they converge or the timeout expires.
+
+        Returns:
+            the last counters read
+        """
+        start = time.time()
+        interval = self.interval
+        unchanged = 0
+        self.stats = None
+        self.converged = False
+        self.polls = 0
+        while True:
+            stats = self.read()
+            self.polls += 1
+            if self.expected is not None:
+                self.converged = self.reached(stats)
+            else:
+                unchanged = unchanged + 1 if stats == self.stats else 0
+                self.converged = unchanged >= self.stable_polls
+            self.stats = stats
+            self.elapsed = time.time() - start
+            if self.converged or self.elapsed >= self.timeout:
+                break
+            time.sleep(min(interval, self.timeout - self.elapsed))
+            interval = min(interval * 2, self.max_interval)
+
+        counter_wait_times.append((self.name, self.elapsed, self.converged))
+        if not self.converged:
+            print("{} did not converge in {:.2f} sec after {} reads: {}"
+                  .format(self.name, self.elapsed, self.polls, self.stats))
+        return self.stats
+
+
+def wait_for_counters(read, expected=None, **kwargs):
+    """
+    Wait for counters to reach the expected values, or to stop changing.
+
+    Used instead of a fixed sleep before verifying counters, the counters
+    are returned as soon as they converge, and after the timeout otherwise,
+    for the test to verify them.
+
+    Args:
+        read (function): function returning the counters
+        expected (dict): expected counters or function checking them, None
+                         to wait until they stop changing
+        kwargs (dict): CounterWatch options
+
+    Returns:
+        the last counters read
+    """
+    return CounterWatch(read, expected, **kwargs).wait()
+
+
 def warm_test(is_test_rebooting:bool=False, time_out=60, interval=1):
     """
     Method decorator for the method on warm testing.
@@ -38,7 +38,6 @@ class BufferStatistics(MinimalPortVlanConfig):
         self.pkt_len = 700
         self.reserved_buf_size = 1400
         self.buf_size = self.reserved_buf_size * 1000
-        self.sleep_time = 2
         self.pkt = simple_udp_packet(
             pktlen=self.pkt_len - 4)  # account for 4B FCS
 
@@ -130,9 +129,17 @@ class BufferStatistics(MinimalPortVlanConfig):
 
         traffic.join()
 
-        time.sleep(self.sleep_time)
+        def read_counters():
+            return (sai_thrift_get_buffer_pool_stats(
+                        self.client, self.ingr_pool),
+                    sai_thrift_get_ingress_priority_group_stats(
+                        self.client, self.ipg))
 
-        stats = sai_thrift_get_buffer_pool_stats(self.client, self.ingr_pool)
+        def rx_done(counters):
+            return (counters[1]["SAI_INGRESS_PRIORITY_GROUP_STAT_PACKETS"]
+                    == self.tx_cnt)
+
+        stats, ipg_stats = wait_for_counters(read_counters, rx_done)
 
         if verify_reserved_buffer_size:
             expected_watermark = self.reserved_buf_size
@@ -148,8 +155,7 @@ class BufferStatistics(MinimalPortVlanConfig):
         self.assertGreaterEqual(
             stats["SAI_BUFFER_POOL_STAT_WATERMARK_BYTES"], expected_watermark)
 
-        stats = sai_thrift_get_ingress_priority_group_stats(
-            self.client, self.ipg)
+        stats = ipg_stats
 
         print("SAI_INGRESS_PRIORITY_GROUP_STAT_CURR_OCCUPANCY_BYTES "
               "(max measured)", ipg_curr_occupancy_bytes)
@@ -326,12 +332,24 @@ class Forwarding(MinimalPortVlanConfig):
             send_packet(self, self.dev_port0, self.pkt)
 
         print("Verify traffic\n")
-        time.sleep(2)
 
-        stats_ipg = sai_thrift_get_ingress_priority_group_stats(
-            self.client, self.ipg)
-        stats_p1 = sai_thrift_get_port_stats(self.client, self.port1)
-        stats_p2 = sai_thrift_get_port_stats(self.client, self.port2)
+        def read_counters():
+            return {
+                "ipg": sai_thrift_get_ingress_priority_group_stats(
+                    self.client, self.ipg),
+                "p1": sai_thrift_get_port_stats(self.client, self.port1),
+                "p2": sai_thrift_get_port_stats(self.client, self.port2)}
+
+        def tx_done(counters):
+            return (counters["ipg"]["SAI_INGRESS_PRIORITY_GROUP_STAT_PACKETS"]
+                    == counters["p1"]["SAI_PORT_STAT_IF_OUT_UCAST_PKTS"]
+                    == counters["p2"]["SAI_PORT_STAT_IF_OUT_UCAST_PKTS"]
+                    == self.tx_cnt)
+
+        counters = wait_for_counters(read_counters, tx_done)
+        stats_ipg = counters["ipg"]
+        stats_p1 = counters["p1"]
+        stats_p2 = counters["p2"]
 
         self.assertEqual(
             stats_ipg["SAI_INGRESS_PRIORITY_GROUP_STAT_PACKETS"], self.tx_cnt)
@@ -614,17 +632,20 @@ class BufferPoolNumber(MinimalPortVlanConfig):
             send_packet(self, self.dev_port1, pkt)
 
         print("Verify traffic")
-        time.sleep(2)
 
-        for i in range(ingr_pool_num):
-            stats = sai_thrift_get_ingress_priority_group_stats(
-                self.client, self.ipgs[i])
-            self.assertEqual(
-                stats["SAI_INGRESS_PRIORITY_GROUP_STAT_PACKETS"], 1)
-
-        for i in range(egr_pool_num):
-            stats = sai_thrift_get_queue_stats(self.client, self.queues[i])
-            self.assertEqual(stats["SAI_QUEUE_STAT_PACKETS"], 1)
+        def read_counters():
+            ipg_counters = sai_thrift_get_ingress_priority_group_stats_multi(
+                self.client, self.ipgs[:ingr_pool_num],
+                counter_ids=[SAI_INGRESS_PRIORITY_GROUP_STAT_PACKETS])
+            queue_counters = sai_thrift_get_queue_stats_multi(
+                self.client, self.queues[:egr_pool_num],
+                counter_ids=[SAI_QUEUE_STAT_PACKETS])
+            return {"ipg": ipg_counters, "queue": queue_counters}
+
+        expected = {"ipg": [1] * ingr_pool_num, "queue": [1] * egr_pool_num}
+        counters = wait_for_counters(read_counters, expected)
+        self.assertEqual(counters["ipg"], expected["ipg"])
+        self.assertEqual(counters["queue"], expected["queue"])
 
     def tearDown(self):
         # Unset QoS maps.
@@ -2607,7 +2607,7 @@ class FdbAgeTest(SaiHelper):
             verify_packets(self, tag_pkt, [lrn_port])
             print("\tOK")
 
-            self.saiWaitFdbAge(self.age_time)
+            self.saiWaitFdbAge(self.age_time, macs=[lrn_mac])
             print("Verify if aged MAC address was removed")
             flood_port_list = [[self.dev_port0], [self.dev_port1],
                                [self.dev_port4, self.dev_port5,
@@ -2662,7 +2662,7 @@ class FdbAgeTest(SaiHelper):
             verify_packet_any_port(self, pkt, lag_ports)
             print("\tOK")
 
-            self.saiWaitFdbAge(self.age_time)
+            self.saiWaitFdbAge(self.age_time, macs=[lrn_mac])
 
             print("Verify if aged MAC address was removed")
             flood_port_list = [[self.dev_port0], [self.dev_port1],
@@ -2769,7 +2769,7 @@ class FdbAgeTest(SaiHelper):
             verify_packets(self, pkt, [mv_port])
             print("\tOK")
             new_learn_timeout = age_time - (time.time() - timer_start)
-            self.saiWaitFdbAge(new_learn_timeout)
+            self.saiWaitFdbAge(new_learn_timeout, macs=[lrn_mac])
 
             print("Verify if aged MAC address was removed")
             flood_port_list = [[self.dev_port0], [self.dev_port1],
@@ -2819,7 +2819,7 @@ class FdbAgeTest(SaiHelper):
             verify_packets(self, lrn_pkt, [self.vrf_port_dev])
             time.sleep(2)
 
-            self.saiWaitFdbAge(self.age_time)
+            self.saiWaitFdbAge(self.age_time, macs=[lrn_mac])
 
             print("Moving learned MAC address to port %d" % mv_port)
             print("Sending packet on port %d, %s -> %s to move MAC address" %
@@ -2843,7 +2843,7 @@ class FdbAgeTest(SaiHelper):
             send_packet(self, self.vrf_port_dev, pkt)
             verify_packets(self, pkt, [mv_port])
             print("\tOK")
-            self.saiWaitFdbAge(self.age_time)
+            self.saiWaitFdbAge(self.age_time, macs=[lrn_mac])
 
             print("Verify if aged MAC address was removed")
             flood_port_list = [[self.dev_port0], [self.dev_port1],
@@ -3679,7 +3679,7 @@ class FdbEventTest(SaiHelper):
             self.assertEqual(fdb_attr["type"], SAI_FDB_ENTRY_TYPE_DYNAMIC)
 
             print("Waiting until aging interval is gone")
-            self.saiWaitFdbAge(age_time)
+            self.saiWaitFdbAge(age_time, macs=[self.src_mac])
 
             print("Verifying FDB attributes")
             fdb_attr = sai_thrift_get_fdb_entry_attribute(self.client,
@@ -23,7 +23,6 @@ from sai_base_test import *
 TEST_QOS_DEFAULT_TC = 7
 TEST_DEFAULT_SPEED = 25000
 TEST_QOS_MAP_ON_CREATE_PORT = False
-TEST_SLEEP_TIME = 2
 
 QOS_TYPE_DICT = {
     SAI_QOS_MAP_TYPE_DSCP_TO_TC: (
@@ -1994,19 +1993,18 @@ class PortAclBindingClass(PortFloodClass):
             self.assignPortIngressAcl(ports_with_acl, acl=ingress_acl)
 
             for port in ports_with_acl:
-                time.sleep(TEST_SLEEP_TIME)
-                if_in_discards_pre = self.getPortStats(
-                    [port],
-                    ['SAI_PORT_STAT_IF_IN_DISCARDS'])
+                if_in_discards_pre = wait_for_counters(
+                    lambda: self.getPortStats(
+                        [port], ['SAI_PORT_STAT_IF_IN_DISCARDS']))
                 print("Sending packet on bridge port%d, ingress_acl enabled"
                       % (port))
                 send_packet(self, port, pkt)
                 verify_no_other_packets(self, timeout=1)
                 print("\tPacket dropped. OK")
-                time.sleep(TEST_SLEEP_TIME)
-                if_in_discards = self.getPortStats(
-                    [port],
-                    ['SAI_PORT_STAT_IF_IN_DISCARDS'])
+                if_in_discards = wait_for_counters(
+                    lambda: self.getPortStats(
+                        [port], ['SAI_PORT_STAT_IF_IN_DISCARDS']),
+                    if_in_discards_pre + 1)
                 print("if_in_discards_pre=", if_in_discards_pre,
                       "if_in_discards", if_in_discards)
                 assert if_in_discards_pre + 1 == if_in_discards
@@ -2096,9 +2094,9 @@ class PortAclBindingClass(PortFloodClass):
             # Verify ingress_acl drops for all ports with acl binded
             for port in ports_with_acl:
                 # Get initial discard counter
-                time.sleep(TEST_SLEEP_TIME)
-                if_in_discards_pre = self.getPortStats(
-                    [port], ['SAI_PORT_STAT_IF_IN_DISCARDS'])
+                if_in_discards_pre = wait_for_counters(
+                    lambda: self.getPortStats(
+                        [port], ['SAI_PORT_STAT_IF_IN_DISCARDS']))
 
                 print("Sending packet on bridge port%d, ingress_acl enabled"
                       % (port))
@@ -2106,9 +2104,10 @@ class PortAclBindingClass(PortFloodClass):
                 verify_no_other_packets(self, timeout=1)
                 print("\tPacket dropped. OK")
                 # Get after drop discard counter
-                time.sleep(TEST_SLEEP_TIME)
-                if_in_discards = self.getPortStats(
-                    [port], ['SAI_PORT_STAT_IF_IN_DISCARDS'])
+                if_in_discards = wait_for_counters(
+                    lambda: self.getPortStats(
+                        [port], ['SAI_PORT_STAT_IF_IN_DISCARDS']),
+                    if_in_discards_pre + 1)
                 print("if_in_discards_pre=", if_in_discards_pre,
                       "if_in_discards", if_in_discards)
                 assert if_in_discards_pre + 1 == if_in_discards
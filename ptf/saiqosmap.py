@@ -44,6 +44,15 @@ QOS_TYPE_DICT = {
     SAI_QOS_MAP_TYPE_TC_AND_COLOR_TO_DSCP: (
         "tc", "dscp", "color")}
 
+# counter IDs of the queue and priority group stats names
+QUEUE_STAT_IDS = {
+    name: counter_id
+    for counter_id, name in sai_get_queue_stats_counter_ids_dict.items()}
+PPG_STAT_IDS = {
+    name: counter_id
+    for counter_id, name in
+    sai_get_ingress_priority_group_stats_counter_ids_dict.items()}
+
 
 def combine_ingress_pfc_tc_to_pg_mapping(pfc_prio_list, pg_list, tc_pg_list):
     ''' Function creates mapping
@@ -299,7 +308,6 @@ class L2QosMapBaseClass(SaiHelperBase):
         Returns:
             uint: port queue counters statistics
         '''
-        total_cnt = 0
         sai_list = sai_thrift_u32_list_t(count=100, uint32list=[])
         attr = sai_thrift_get_port_attribute(self.client,
                                              port,
@@ -308,10 +316,10 @@ class L2QosMapBaseClass(SaiHelperBase):
         queue = queue_list[index]
         attr = sai_thrift_get_queue_attribute(self.client, queue, index=True)
         self.assertTrue(attr['index'] == index, "Failed to get the queue")
-        for q_stat in qstats:
-            stats = sai_thrift_get_queue_stats(self.client, queue)
-            total_cnt += stats[q_stat]
-        return total_cnt
+        counters = sai_thrift_get_queue_stats_multi(
+            self.client, [queue],
+            counter_ids=[QUEUE_STAT_IDS[q_stat] for q_stat in qstats])
+        return sum(counters)
 
 
 @group("draft")
@@ -437,7 +445,6 @@ class L3QosMapBaseClass(SaiHelperBase):
         Returns:
             uint: port queue counters statistics
         '''
-        total_cnt = 0
         sai_list = sai_thrift_u32_list_t(count=100, uint32list=[])
         attr = sai_thrift_get_port_attribute(self.client,
                                              port,
@@ -446,10 +453,10 @@ class L3QosMapBaseClass(SaiHelperBase):
         queue = queue_list[index]
         attr = sai_thrift_get_queue_attribute(self.client, queue, index=True)
         self.assertTrue(attr['index'] == index, "Failed to get the queue")
-        for q_stat in qstats:
-            stats = sai_thrift_get_queue_stats(self.client, queue)
-            total_cnt += stats[q_stat]
-        return total_cnt
+        counters = sai_thrift_get_queue_stats_multi(
+            self.client, [queue],
+            counter_ids=[QUEUE_STAT_IDS[q_stat] for q_stat in qstats])
+        return sum(counters)
 
     def getQueueStats(self, queues, qstats):
         ''' Returns the queue stats.
@@ -459,12 +466,10 @@ class L3QosMapBaseClass(SaiHelperBase):
         Returns:
             uint: queue counters statistics
         '''
-        total_cnt = 0
-        for queue_oid in queues:
-            stats = sai_thrift_get_queue_stats(self.client, queue_oid)
-            for q_stat in qstats:
-                total_cnt += stats[q_stat]
-        return total_cnt
+        counters = sai_thrift_get_queue_stats_multi(
+            self.client, queues,
+            counter_ids=[QUEUE_STAT_IDS[q_stat] for q_stat in qstats])
+        return sum(counters)
 
     def comparePortPPGStats(self, stats1, stats2):
         ''' Compares the tro ppg stats.
@@ -495,14 +500,20 @@ class L3QosMapBaseClass(SaiHelperBase):
         Returns:
             uint: ports priority group statistics
         '''
+        ppg_oids = [self.ppg_list[port][ppg]
+                    for port in range(0, len(ports)) for ppg in range(8)]
+        counter_ids = [SAI_INGRESS_PRIORITY_GROUP_STAT_PACKETS]
+        counters = sai_thrift_get_ingress_priority_group_stats_multi(
+            self.client, ppg_oids, counter_ids=counter_ids)
+        ppg_stats = stats_per_object(
+            counters, counter_ids,
+            sai_get_ingress_priority_group_stats_counter_ids_dict)
         stats = [0] * 4
         for port in range(0, len(ports)):
-            stats[port] = [0] * 8
-            for ppg in range(8):
-                ppg_oid = self.ppg_list[port][ppg]
-                cnt = self.getPpGroupStats(
-                    [ppg_oid], ['SAI_INGRESS_PRIORITY_GROUP_STAT_PACKETS'])
-                stats[port][ppg] = cnt
+            stats[port] = [
+                ppg_stats[port * 8 + ppg][
+                    'SAI_INGRESS_PRIORITY_GROUP_STAT_PACKETS']
+                for ppg in range(8)]
         return stats
 
     def getPpGroupStats(self, ppg_oids, ppg_stats):
@@ -514,13 +525,10 @@ class L3QosMapBaseClass(SaiHelperBase):
         Returns:
             uint: ports priority group statistics
         '''
-        total_cnt = 0
-        for ppg_oid in ppg_oids:
-            stats = sai_thrift_get_ingress_priority_group_stats(
-                self.client, ppg_oid)
-            for ppg_stat in ppg_stats:
-                total_cnt += stats[ppg_stat]
-        return total_cnt
+        counters = sai_thrift_get_ingress_priority_group_stats_multi(
+            self.client, ppg_oids,
+            counter_ids=[PPG_STAT_IDS[ppg_stat] for ppg_stat in ppg_stats])
+        return sum(counters)
 
     def setPortMultipleQosMapIds(self,
                                  port,
@@ -104,6 +104,22 @@ class QueueConfigData(SaiHelper):
         sai_thrift_remove_virtual_router(self.client, self.vr_id)
         super(QueueConfigData, self).tearDown()
 
+    def getQueueStats(self, queues, counter_ids):
+        """
+        Returns the counters of the queues, read in a single call.
+
+        Args:
+            queues (list): queue object ids
+            counter_ids (list): counters to read
+
+        Returns:
+            list: dict of the counters of every queue
+        """
+        counters = sai_thrift_get_queue_stats_multi(
+            self.client, queues, counter_ids=counter_ids)
+        return stats_per_object(counters, counter_ids,
+                                sai_get_queue_stats_counter_ids_dict)
+
     def queueCreateTest(self):
         """
         The test verifies a queue creation.
@@ -243,8 +259,8 @@ class QueueConfigData(SaiHelper):
         send_packet(self, self.dev_port25, pkt)
         verify_packet(self, exp_pkt, self.dev_port26)
         print("\tPacket received on PORT26")
-        stats = sai_thrift_get_queue_stats(self.client, queue_id[0])
-        cnt = stats["SAI_QUEUE_STAT_PACKETS"]
+        stats = self.getQueueStats(queue_id[:1], [SAI_QUEUE_STAT_PACKETS])
+        cnt = stats[0]["SAI_QUEUE_STAT_PACKETS"]
         self.assertEqual(cnt, 1)
 
         # Now the buffer profile is being detached.
@@ -282,8 +298,8 @@ class QueueConfigData(SaiHelper):
         send_packet(self, self.dev_port25, pkt)
         verify_packet(self, exp_pkt, self.dev_port26)
         print("\tPacket received on PORT26")
-        stats = sai_thrift_get_queue_stats(self.client, queue_id[0])
-        cnt = stats["SAI_QUEUE_STAT_PACKETS"]
+        stats = self.getQueueStats(queue_id[:1], [SAI_QUEUE_STAT_PACKETS])
+        cnt = stats[0]["SAI_QUEUE_STAT_PACKETS"]
         self.assertEqual(cnt, 1)
         print("\tTest completed successfully")
 
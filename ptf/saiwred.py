@@ -240,6 +240,19 @@ class WredBaseTest(SaiHelper):
             print("\t", name, "stats:", WredBaseTest._statsDiff(i_stats,
                                                                 e_stats))
 
+    def _getQueueStats(self, queues):
+        """ Returns the stats of the queues, read in a single call
+        Args:
+            queues(list): queue object ids
+
+        Returns:
+            list: stats dict of every queue
+        """
+        counters = sai_thrift_get_queue_stats_multi(self.client, queues)
+        return stats_per_object(counters,
+                                sai_get_queue_stats_counter_ids,
+                                sai_get_queue_stats_counter_ids_dict)
+
     def _verifyStat(self, i_stats, e_stats, stat, delta):
         self.assertEqual(e_stats[stat]-i_stats[stat], delta)
 
@@ -384,8 +397,7 @@ class WredTest(WredBaseTest):
         print("---------------------")
         i_port_stats = sai_thrift_get_port_stats(self.client,
                                                  self.port11)
-        i_queue_stats = sai_thrift_get_queue_stats(self.client,
-                                                   self.queues11[0])
+        i_queue_stats = self._getQueueStats(self.queues11)
         try:
             pkt1 = simple_tcp_packet(
                 eth_dst='00:77:66:55:44:00',
@@ -411,18 +423,24 @@ class WredTest(WredBaseTest):
             print("Send and receive a packet.")
             send_packet(self, self.dev_port10, pkt1)
             verify_packet(self, exp_pkt1, self.dev_port11)
-            time.sleep(2)
+            e_queue_stats = wait_for_counters(
+                lambda: self._getQueueStats(self.queues11),
+                lambda stats: (stats[0]['SAI_QUEUE_STAT_PACKETS'] ==
+                               i_queue_stats[0]['SAI_QUEUE_STAT_PACKETS'] + 1))
             e_port_stats = sai_thrift_get_port_stats(self.client,
                                                      self.port11)
-            e_queue_stats = sai_thrift_get_queue_stats(self.client,
-                                                       self.queues11[0])
+
+            self._printStats(*[("queue%d" % index, i_stats, e_stats)
+                               for index, (i_stats, e_stats)
+                               in enumerate(zip(i_queue_stats,
+                                                e_queue_stats))])
 
             # Verify stats
             self._verifyStats(
                 i_port_stats, e_port_stats,
                 ('SAI_PORT_STAT_ECN_MARKED_PACKETS', 0))
             self._verifyStats(
-                i_queue_stats, e_queue_stats,
+                i_queue_stats[0], e_queue_stats[0],
                 ('SAI_QUEUE_STAT_PACKETS', 1))
         finally:
             status = sai_thrift_set_queue_attribute(self.client,
@@ -22,6 +22,7 @@ from sai_utils import *  # pylint: disable=wildcard-import; lgtm[py/polluting-im
 from sai_thrift.sai_adapter import *
 from data_module.device import Device
 from typing import TYPE_CHECKING
+from config.topology_plan import TopologyPlan
 
 if TYPE_CHECKING:
     from sai_test_base import T0TestBase
@@ -41,21 +42,29 @@ def t0_fdb_config_helper(test_obj: 'T0TestBase', is_create_fdb=True):
     configer = FdbConfiger(test_obj)
 
     if is_create_fdb:
+        plan = TopologyPlan(test_obj)
         configer.create_fdb_entries(
             switch_id=test_obj.dut.switch_id,
             server_list=test_obj.servers[0][0:1],
             port_idxs=range(0, 1),
-            vlan_oid=test_obj.dut.default_vlan_id)
+            vlan_oid=test_obj.dut.default_vlan_id,
+            plan=plan)
         configer.create_fdb_entries(
             switch_id=test_obj.dut.switch_id,
             server_list=test_obj.servers[1][1:9],
             port_idxs=range(1, 9),
-            vlan_oid=test_obj.dut.vlans[10].oid)
+            vlan_oid=test_obj.dut.vlans[10].oid,
+            plan=plan)
         configer.create_fdb_entries(
             switch_id=test_obj.dut.switch_id,
             server_list=test_obj.servers[2][1:9],
             port_idxs=range(9, 17),
-            vlan_oid=test_obj.dut.vlans[20].oid)
+            vlan_oid=test_obj.dut.vlans[20].oid,
+            plan=plan)
+        plan.apply()
+        test_obj.dut.fdb_plans.append(plan)
+        print("Waiting for FDB to get refreshed, {} seconds ...".format(2))
+        time.sleep(2)
     # Todo dynamic use the vlan_member_port_map to add data to fdb
 
 
@@ -64,9 +73,11 @@ def t0_fdb_tear_down_helper(test_obj: 'T0TestBase'):
     Args:
         test_obj: test object
     '''
-    for item in test_obj.dut.fdb_entry_list:
-        sai_thrift_remove_fdb_entry(test_obj.client, item)
-        test_obj.dut.fdb_entry_list.remove(item)
+    # the test may have removed or flushed some of the entries
+    for plan in reversed(test_obj.dut.fdb_plans):
+        plan.teardown_plan(test_obj).apply(check_status=False)
+    test_obj.dut.fdb_plans.clear()
+    test_obj.dut.fdb_entry_list.clear()
 
 
 class FdbConfiger(object):
@@ -92,7 +103,8 @@ class FdbConfiger(object):
                            vlan_oid=None,
                            packet_action=SAI_PACKET_ACTION_FORWARD,
                            allow_mac_move=True,
-                           wait_sec=2):
+                           wait_sec=2,
+                           plan: TopologyPlan = None):
         """
         Create FDB entries.
 
@@ -103,9 +115,15 @@ class FdbConfiger(object):
             type: SAI_FDB_ENTRY_ATTR_TYPE
             vlan_oid: vlan id for the mac
             packet_action:SAI_FDB_ENTRY_ATTR_PACKET_ACTION
+            plan: add the entries to this topology plan, the caller applies
+                  it, waits for the FDB and adds it to dut.fdb_plans.
+                  If None, create them now.
 
         """
         print("Add FDBs ...")
+        apply_plan = plan is None
+        if apply_plan:
+            plan = TopologyPlan(self.test_obj)
         fdb_list = []
         for index, server in enumerate(server_list):
             srv: Device = server
@@ -114,8 +132,8 @@ class FdbConfiger(object):
                 mac_address=srv.mac,
                 bv_id=vlan_oid)
             port_index = port_idxs[index]
-            status = sai_thrift_create_fdb_entry(
-                self.client,
+            plan.create(
+                'fdb_entry',
                 fdb_entry,
                 type=type,
                 bridge_port_id=self.test_obj.dut.port_obj_list[port_index].bridge_port_oid,
@@ -126,11 +144,13 @@ class FdbConfiger(object):
                 self.test_obj.dut.port_obj_list[port_index].oid,
                 self.test_obj.dut.port_obj_list[port_index].bridge_port_oid,
                 srv.mac))
-            self.test_obj.assertEqual(status, SAI_STATUS_SUCCESS)
             fdb_list.append(fdb_entry)
             srv.l2_egress_port_idx = port_index
             self.test_obj.dut.fdb_entry_list.append(fdb_entry)
-        print("Waiting for FDB to get refreshed, {} seconds ...".format(
-            wait_sec))
-        time.sleep(wait_sec)
+        if apply_plan:
+            plan.apply()
+            self.test_obj.dut.fdb_plans.append(plan)
+            print("Waiting for FDB to get refreshed, {} seconds ...".format(
+                wait_sec))
+            time.sleep(wait_sec)
         return fdb_list
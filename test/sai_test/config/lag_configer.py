@@ -23,6 +23,7 @@ from sai_thrift.sai_adapter import *
 from sai_utils import *  # pylint: disable=wildcard-import; lgtm[py/polluting-import]
 from typing import TYPE_CHECKING
 from data_module.lag import Lag
+from config.topology_plan import TopologyPlan
 
 if TYPE_CHECKING:
     from sai_test_base import T0TestBase
@@ -96,15 +97,17 @@ class LagConfiger(object):
         """
         lag: Lag = lag_obj
 
+        plan = TopologyPlan(self.test_obj)
+        member_steps = [plan.create('lag_member',
+                                    lag_id=lag.oid,
+                                    port_id=self.test_obj.dut.port_obj_list[port_index].oid)
+                        for port_index in lag_port_idxs]
+        plan.apply()
+
         lag_members = []
-        for port_index in lag_port_idxs:
-            lag_member = sai_thrift_create_lag_member(self.client,
-                                                      lag_id=lag.oid,
-                                                      port_id=self.test_obj.dut.port_obj_list[port_index].oid)
-            self.test_obj.assertEqual(
-                self.test_obj.status(), SAI_STATUS_SUCCESS)
-            lag_members.append(lag_member)
-            lag.lag_members.append(lag_member)
+        for port_index, member in zip(lag_port_idxs, member_steps):
+            lag_members.append(member.oid)
+            lag.lag_members.append(member.oid)
             lag.member_port_indexs.append(port_index)
         return lag_members
 
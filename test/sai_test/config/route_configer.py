@@ -33,6 +33,7 @@ from typing import Dict, List
 
 from data_module.nexthop import Nexthop
 from data_module.nexthop_group import NexthopGroup
+from config.topology_plan import TopologyPlan, resolve
 
 if TYPE_CHECKING:
     from sai_test_base import T0TestBase
@@ -67,6 +68,8 @@ def t0_route_config_helper(
         neighbor and route for lag
     """
     route_configer = RouteConfiger(test_obj)
+    # the neighbors, nexthops, nexthop groups and routes are created together
+    route_plan = TopologyPlan(test_obj)
     if is_create_default_route:
         print("Create default route")
         route_configer.create_default_route()
@@ -91,21 +94,23 @@ def t0_route_config_helper(
             net_interface=test_obj.dut.lag_list[0])
         route_configer.create_neighbor_by_rif(rif=rif,
                                               nexthop_device=test_obj.t1_list[1][100],
-                                              no_host=False)
+                                              no_host=False,
+                                              plan=route_plan)
         nhv4, nhv6 = route_configer.create_nexthop_by_rif(rif=rif,
-                                                          nexthop_device=test_obj.t1_list[1][100])
+                                                          nexthop_device=test_obj.t1_list[1][100],
+                                                          plan=route_plan)
         test_obj.dut.lag_list[0].nexthopv4_list.append(nhv4)
         test_obj.dut.lag_list[0].nexthopv6_list.append(nhv6)
         routev4, routev6 = route_configer.create_route_by_nexthop(
             dest_device=test_obj.servers[11][0],
             nexthopv4=nhv4,
-            nexthopv6=nhv6)
+            nexthopv6=nhv6,
+            plan=route_plan)
         # set expected dest server
-        for item in test_obj.servers[11]:
-            item.l3_lag_obj = test_obj.dut.lag_list[0]
-            item.l3_lag_obj.neighbor_mac = test_obj.t1_list[1][100].mac
-            item.routev4 = routev4
-            item.routev6 = routev6
+        test_obj.dut.lag_list[0].neighbor_mac = test_obj.t1_list[1][100].mac
+        test_obj.servers[11].set_attributes(l3_lag_obj=test_obj.dut.lag_list[0],
+                                            routev4=routev4,
+                                            routev6=routev6)
         # set expected dest T1
         test_obj.t1_list[1][100].l3_lag_obj = test_obj.dut.lag_list[0]
 
@@ -116,13 +121,13 @@ def t0_route_config_helper(
         routev4, routev6 = route_configer.create_route_by_nexthop(
             dest_device=test_obj.servers[21][0],
             nexthopv4=nhv4,
-            nexthopv6=nhv6)
+            nexthopv6=nhv6,
+            plan=route_plan)
         # set expected dest server
-        for item in test_obj.servers[21]:
-            item.l3_lag_obj = test_obj.dut.lag_list[0]
-            item.l3_lag_obj.neighbor_mac = test_obj.t1_list[1][100].mac
-            item.routev4 = routev4
-            item.routev6 = routev6
+        test_obj.dut.lag_list[0].neighbor_mac = test_obj.t1_list[1][100].mac
+        test_obj.servers[21].set_attributes(l3_lag_obj=test_obj.dut.lag_list[0],
+                                            routev4=routev4,
+                                            routev6=routev6)
 
         print(
             "Create route for server with in ip {}/{}".format(test_obj.servers[12][0].ipv4, 24))
@@ -132,21 +137,23 @@ def t0_route_config_helper(
             net_interface=test_obj.dut.lag_list[1])
         route_configer.create_neighbor_by_rif(rif=rif,
                                               nexthop_device=test_obj.t1_list[2][100],
-                                              no_host=False)
+                                              no_host=False,
+                                              plan=route_plan)
         nhv4, nhv6 = route_configer.create_nexthop_by_rif(rif=rif,
-                                                          nexthop_device=test_obj.t1_list[2][100])
+                                                          nexthop_device=test_obj.t1_list[2][100],
+                                                          plan=route_plan)
         test_obj.dut.lag_list[1].nexthopv4_list.append(nhv4)
         test_obj.dut.lag_list[1].nexthopv6_list.append(nhv6)
         routev4, routev6 = route_configer.create_route_by_nexthop(
             dest_device=test_obj.servers[12][0],
             nexthopv4=nhv4,
-            nexthopv6=nhv6)
+            nexthopv6=nhv6,
+            plan=route_plan)
         # set expected dest server
-        for item in test_obj.servers[12]:
-            item.l3_lag_obj = test_obj.dut.lag_list[1]
-            item.l3_lag_obj.neighbor_mac = test_obj.t1_list[2][100].mac
-            item.routev4 = routev4
-            item.routev6 = routev6
+        test_obj.dut.lag_list[1].neighbor_mac = test_obj.t1_list[2][100].mac
+        test_obj.servers[12].set_attributes(l3_lag_obj=test_obj.dut.lag_list[1],
+                                            routev4=routev4,
+                                            routev6=routev6)
         # set expected dest T1
         test_obj.t1_list[2][100].l3_lag_obj = test_obj.dut.lag_list[1]
 
@@ -159,14 +166,36 @@ def t0_route_config_helper(
         route_configer.create_neighbor_by_rif(
             nexthop_device=test_obj.dut.vlans[10].broadcast_neighbor_device,
             rif=test_obj.dut.vlans[10].rif_list[0],
-            no_host=False)
+            no_host=False,
+            plan=route_plan)
         for index in range(1, 9):
             route_configer.create_neighbor_by_rif(
                 nexthop_device=test_obj.servers[1][index],
-                rif=test_obj.dut.vlans[10].rif_list[0])
+                rif=test_obj.dut.vlans[10].rif_list[0],
+                plan=route_plan)
             route_configer.create_neighbor_by_rif(
                 nexthop_device=test_obj.servers[1][90+index],
-                rif=test_obj.dut.vlans[10].rif_list[0])
+                rif=test_obj.dut.vlans[10].rif_list[0],
+                plan=route_plan)
+
+        test_obj.dut.vlans[20].broadcast_neighbor_device = Device(
+            device_type=DeviceType.server, id=255, group_id=2)
+        test_obj.dut.vlans[20].broadcast_neighbor_device.mac = BROADCAST_MAC
+        test_obj.dut.vlans[20].broadcast_neighbor_device.ipv6 = None
+        route_configer.create_neighbor_by_rif(
+            nexthop_device=test_obj.dut.vlans[20].broadcast_neighbor_device,
+            rif=test_obj.dut.vlans[20].rif_list[0],
+            no_host=False,
+            plan=route_plan)
+        for index in range(0, 8):
+            route_configer.create_neighbor_by_rif(
+                nexthop_device=test_obj.servers[2][9+index],
+                rif=test_obj.dut.vlans[20].rif_list[0],
+                plan=route_plan)
+            route_configer.create_neighbor_by_rif(
+                nexthop_device=test_obj.servers[2][91+index],
+                rif=test_obj.dut.vlans[20].rif_list[0],
+                plan=route_plan)
 
         test_obj.servers[1][0].ip_prefix = '24'
         test_obj.servers[1][0].ip_prefix_v6 = '112'
@@ -174,37 +203,24 @@ def t0_route_config_helper(
         test_obj.servers[1][1].ip_prefix_v6 = '112'
         nhopv4, nhopv6 = route_configer.create_nexthop_by_rif(
             rif=test_obj.dut.vlans[10].rif_list[0],
-            nexthop_device=test_obj.servers[1][1])
+            nexthop_device=test_obj.servers[1][1],
+            plan=route_plan)
         test_obj.dut.vlans[10].nexthopv4_list.append(nhopv4)
         test_obj.dut.vlans[10].nexthopv6_list.append(nhopv6)
         route_configer.create_route_by_nexthop(
             dest_device=test_obj.servers[1][0],
             nexthopv4=nhopv4,
-            nexthopv6=nhopv6)
+            nexthopv6=nhopv6,
+            plan=route_plan)
         print(
             "Create route for server with in ip {}/{}".format(test_obj.servers[1][0].ipv4, 24))
 
-        test_obj.dut.vlans[20].broadcast_neighbor_device = Device(
-            device_type=DeviceType.server, id=255, group_id=2)
-        test_obj.dut.vlans[20].broadcast_neighbor_device.mac = BROADCAST_MAC
-        test_obj.dut.vlans[20].broadcast_neighbor_device.ipv6 = None
-        route_configer.create_neighbor_by_rif(
-            nexthop_device=test_obj.dut.vlans[20].broadcast_neighbor_device,
-            rif=test_obj.dut.vlans[20].rif_list[0],
-            no_host=False)
-        for index in range(0, 8):
-            route_configer.create_neighbor_by_rif(
-                nexthop_device=test_obj.servers[2][9+index],
-                rif=test_obj.dut.vlans[20].rif_list[0])
-            route_configer.create_neighbor_by_rif(
-                nexthop_device=test_obj.servers[2][91+index],
-                rif=test_obj.dut.vlans[20].rif_list[0])
-
         test_obj.servers[2][0].ip_prefix = '24'
         test_obj.servers[2][0].ip_prefix_v6 = '112'
         route_configer.create_route_by_rif(
             dest_device=test_obj.servers[2][0],
-            rif=test_obj.dut.vlans[20].rif_list[0])
+            rif=test_obj.dut.vlans[20].rif_list[0],
+            plan=route_plan)
         test_obj.dut.vlans[20].nexthopv4_list.append(Nexthop(
             nexthop_device=test_obj.dut.vlans[20], rif_id=test_obj.dut.vlans[20].rif_list[0]))
         test_obj.dut.vlans[20].nexthopv6_list.append(Nexthop(
@@ -222,9 +238,11 @@ def t0_route_config_helper(
                 net_interface=test_obj.dut.lag_list[lag_idx])
             route_configer.create_neighbor_by_rif(rif=rif,
                                                 nexthop_device=test_obj.t1_list[t1_idx][100],
-                                                no_host=False)
+                                                no_host=False,
+                                                plan=route_plan)
             nhv4, nhv6 = route_configer.create_nexthop_by_rif(rif=rif,
-                                                            nexthop_device=test_obj.t1_list[t1_idx][100])
+                                                            nexthop_device=test_obj.t1_list[t1_idx][100],
+                                                            plan=route_plan)
             nhpv4_list.append(nhv4)
             nhpv6_list.append(nhv6)
 
@@ -234,13 +252,18 @@ def t0_route_config_helper(
         nhp_grpv4, nhp_grpv6 = route_configer.create_nexthop_group_by_nexthops(
             nexthopv4_list=nhpv4_list,
             nexthopv6_list=nhpv6_list,
-            dest_device=test_obj.servers[60][0])
+            dest_device=test_obj.servers[60][0],
+            plan=route_plan)
 
         # set expected dest lag
         for lag in test_obj.dut.lag_list:
             lag.nexthop_groupv4 = nhp_grpv4
             lag.nexthop_groupv6 = nhp_grpv6
 
+    route_plan.apply()
+    route_configer.resolve_planned_oids()
+
+
 class RouteConfiger(object):
     """
     Class use to make all the route configurations.
@@ -306,17 +329,16 @@ class RouteConfiger(object):
             packet_action=SAI_PACKET_ACTION_DROP)
         self.test_obj.assertEqual(self.test_obj.status(), SAI_STATUS_SUCCESS)
 
-    def create_route_by_rif(
-            self, dest_device: Device, rif, virtual_router=None):
+    def create_routes(self, dest_device: Device, next_hop_idv4, next_hop_idv6, virtual_router=None, plan: TopologyPlan = None):
         """
-        Create a complete route path to a dest_device device, via route interface.
-
-        Set Device attribute: routev4, routev6
+        Create the ipv4 and ipv6 routes to a dest_device device.
 
         Attrs:
             dest_device: Simulating the destinate device that this dut direct connect to.
-            rif: route_interface
+            next_hop_idv4: next hop id of the ipv4 route, rif, nexthop or nexthop group
+            next_hop_idv6: next hop id of the ipv6 route
             virtual_router_id: virtual route id, if not defined, will use default route
+            plan: add the routes to this topology plan, if None create them now
 
         Return: routev4, routev6
         """
@@ -328,9 +350,6 @@ class RouteConfiger(object):
             # destination cannot use sai_ipaddress
             net_routev4 = sai_thrift_route_entry_t(
                 vr_id=vr_id, destination=sai_ipprefix(dest_device.ipv4+'/32'))
-        status = sai_thrift_create_route_entry(
-            self.client, net_routev4, next_hop_id=rif)
-        self.test_obj.assertEqual(status, SAI_STATUS_SUCCESS)
 
         if dest_device.ip_prefix_v6:
             net_routev6 = sai_thrift_route_entry_t(
@@ -339,17 +358,40 @@ class RouteConfiger(object):
             # destination cannot use sai_ipaddress
             net_routev6 = sai_thrift_route_entry_t(
                 vr_id=vr_id, destination=sai_ipprefix(dest_device.ipv6+'/128'))
-        status = sai_thrift_create_route_entry(
-            self.client, net_routev6, next_hop_id=rif)
-        self.test_obj.assertEqual(status, SAI_STATUS_SUCCESS)
+
+        apply_plan = plan is None
+        if apply_plan:
+            plan = TopologyPlan(self.test_obj)
+        plan.create('route_entry', net_routev4, next_hop_id=next_hop_idv4)
+        plan.create('route_entry', net_routev6, next_hop_id=next_hop_idv6)
+        if apply_plan:
+            plan.apply()
 
         self.test_obj.dut.routev4_list.append(net_routev4)
         self.test_obj.dut.routev6_list.append(net_routev6)
 
         return net_routev4, net_routev6
 
+    def create_route_by_rif(
+            self, dest_device: Device, rif, virtual_router=None, plan: TopologyPlan = None):
+        """
+        Create a complete route path to a dest_device device, via route interface.
+
+        Set Device attribute: routev4, routev6
+
+        Attrs:
+            dest_device: Simulating the destinate device that this dut direct connect to.
+            rif: route_interface
+            virtual_router_id: virtual route id, if not defined, will use default route
+            plan: add the routes to this topology plan, if None create them now
+
+        Return: routev4, routev6
+        """
+        return self.create_routes(dest_device, rif, rif, virtual_router, plan)
+
     def create_route_by_nexthop(
-            self, dest_device: Device, nexthopv4: Nexthop, nexthopv6: Nexthop, virtual_router=None):
+            self, dest_device: Device, nexthopv4: Nexthop, nexthopv6: Nexthop, virtual_router=None,
+            plan: TopologyPlan = None):
         """
         Create a complete route path to a dest_device device, via from nexthop.
 
@@ -360,39 +402,15 @@ class RouteConfiger(object):
             nexthopv4: nexthopv4
             nexthopv6: nexthopv6
             virtual_router_id: virtual route id, if not defined, will use default route
+            plan: add the routes to this topology plan, if None create them now
 
         Return: routev4, routev6
         """
-        vr_id = self.choice_virtual_route(virtual_router)
-        if dest_device.ip_prefix:
-            net_routev4 = sai_thrift_route_entry_t(
-                vr_id=vr_id, destination=sai_ipprefix(dest_device.ipv4+'/'+dest_device.ip_prefix))
-        else:
-            # destination cannot use sai_ipaddress
-            net_routev4 = sai_thrift_route_entry_t(
-                vr_id=vr_id, destination=sai_ipprefix(dest_device.ipv4+'/32'))
-        status = sai_thrift_create_route_entry(
-            self.client, net_routev4, next_hop_id=nexthopv4.oid)
-        self.test_obj.assertEqual(status, SAI_STATUS_SUCCESS)
-
-        if dest_device.ip_prefix_v6:
-            net_routev6 = sai_thrift_route_entry_t(
-                vr_id=vr_id, destination=sai_ipprefix(dest_device.ipv6+'/'+dest_device.ip_prefix_v6))
-        else:
-            # destination cannot use sai_ipaddress
-            net_routev6 = sai_thrift_route_entry_t(
-                vr_id=vr_id, destination=sai_ipprefix(dest_device.ipv6+'/128'))
-        status = sai_thrift_create_route_entry(
-            self.client, net_routev6, next_hop_id=nexthopv6.oid)
-        self.test_obj.assertEqual(status, SAI_STATUS_SUCCESS)
-
-        self.test_obj.dut.routev4_list.append(net_routev4)
-        self.test_obj.dut.routev6_list.append(net_routev6)
-
-        return net_routev4, net_routev6
+        return self.create_routes(dest_device, nexthopv4.oid, nexthopv6.oid, virtual_router, plan)
 
     def create_route_by_nexthop_group(
-            self, dest_device: Device, nexthop_groupv4: NexthopGroup, nexthop_groupv6: NexthopGroup, virtual_router=None):
+            self, dest_device: Device, nexthop_groupv4: NexthopGroup, nexthop_groupv6: NexthopGroup, virtual_router=None,
+            plan: TopologyPlan = None):
         """
         Create a complete route path to a dest_device device, via nexthop group.
         Set Device attribute: routev4, routev6
@@ -401,37 +419,12 @@ class RouteConfiger(object):
             nexthop_groupv4: nexthop group ipv4
             nexthop_groupv6: nexthop group ipv6
             virtual_router_id: virtual route id, if not defined, will use default route
+            plan: add the routes to this topology plan, if None create them now
         Return: routev4, routev6
         """
-        vr_id = self.choice_virtual_route(virtual_router)
-        if dest_device.ip_prefix:
-            net_routev4 = sai_thrift_route_entry_t(
-                vr_id=vr_id, destination=sai_ipprefix(dest_device.ipv4+'/'+dest_device.ip_prefix))
-        else:
-            # destination cannot use sai_ipaddress
-            net_routev4 = sai_thrift_route_entry_t(
-                vr_id=vr_id, destination=sai_ipprefix(dest_device.ipv4+'/32'))
-        status = sai_thrift_create_route_entry(
-            self.client, net_routev4, next_hop_id=nexthop_groupv4.nhp_grp_id)
-        self.test_obj.assertEqual(status, SAI_STATUS_SUCCESS)
-
-        if dest_device.ip_prefix_v6:
-            net_routev6 = sai_thrift_route_entry_t(
-                vr_id=vr_id, destination=sai_ipprefix(dest_device.ipv6+'/'+dest_device.ip_prefix_v6))
-        else:
-            # destination cannot use sai_ipaddress
-            net_routev6 = sai_thrift_route_entry_t(
-                vr_id=vr_id, destination=sai_ipprefix(dest_device.ipv6+'/128'))
-        status = sai_thrift_create_route_entry(
-            self.client, net_routev6, next_hop_id=nexthop_groupv6.nhp_grp_id)
-        self.test_obj.assertEqual(status, SAI_STATUS_SUCCESS)
+        return self.create_routes(dest_device, nexthop_groupv4.nhp_grp_id, nexthop_groupv6.nhp_grp_id, virtual_router, plan)
 
-        self.test_obj.dut.routev4_list.append(net_routev4)
-        self.test_obj.dut.routev6_list.append(net_routev6)
-
-        return net_routev4, net_routev6
-
-    def create_neighbor_by_rif(self, nexthop_device: Device, rif, no_host=True):
+    def create_neighbor_by_rif(self, nexthop_device: Device, rif, no_host=True, plan: TopologyPlan = None):
         """
         Create neighbor.
 
@@ -442,19 +435,21 @@ class RouteConfiger(object):
             nexthop_device: Simulating the bypass device that the packet will be forwarded to.
             rif: the router interface this neighbor mapping.
             no_host: Neighbor in no_host (neighbor direct) mode
+            plan: add the neighbors to this topology plan, if None create them now
 
         return neighborv4, neighborv6
         """
+        apply_plan = plan is None
+        if apply_plan:
+            plan = TopologyPlan(self.test_obj)
         if nexthop_device.ipv4:
             nbr_entry_v4 = sai_thrift_neighbor_entry_t(
                 rif_id=rif,
                 ip_address=sai_ipaddress(nexthop_device.ipv4))
-            status = sai_thrift_create_neighbor_entry(
-                self.client,
-                nbr_entry_v4,
-                dst_mac_address=nexthop_device.mac,
-                no_host_route=no_host)
-            self.test_obj.assertEqual(status, SAI_STATUS_SUCCESS)
+            plan.create('neighbor_entry',
+                        nbr_entry_v4,
+                        dst_mac_address=nexthop_device.mac,
+                        no_host_route=no_host)
         else:
             nbr_entry_v4 = None
 
@@ -462,14 +457,14 @@ class RouteConfiger(object):
             nbr_entry_v6 = sai_thrift_neighbor_entry_t(
                 rif_id=rif,
                 ip_address=sai_ipaddress(nexthop_device.ipv6))
-            status = sai_thrift_create_neighbor_entry(
-                self.client,
-                nbr_entry_v6,
-                dst_mac_address=nexthop_device.mac,
-                no_host_route=no_host)
-            self.test_obj.assertEqual(status, SAI_STATUS_SUCCESS)
+            plan.create('neighbor_entry',
+                        nbr_entry_v6,
+                        dst_mac_address=nexthop_device.mac,
+                        no_host_route=no_host)
         else:
             nbr_entry_v6 = None
+        if apply_plan:
+            plan.apply()
 
         if nbr_entry_v4:
             self.test_obj.dut.neighborv4_list.append(nbr_entry_v4)
@@ -551,7 +546,7 @@ class RouteConfiger(object):
             self.test_obj.dut.rif_list.append(rif)
         return net_interface.rif_list[-1]
 
-    def create_nexthop_by_rif(self, rif, nexthop_device: Device):
+    def create_nexthop_by_rif(self, rif, nexthop_device: Device, plan: TopologyPlan = None):
         """
         Create nexthop by bridge port index for a port.
 
@@ -562,34 +557,41 @@ class RouteConfiger(object):
             rif: route interface id
             nexthop_device: Simulating the bypass device, use this device to get the ipaddress, ipprefix_v4 and ipprefix_v6
             virtual_router_id: virtual route id, if not defined, will use default route
+            plan: add the nexthops to this topology plan, if None create them now.
+                  The nexthop oids are the plan steps until resolve_planned_oids
 
         return nexthop object for v4 and nexthop object for v6 
         """
+        apply_plan = plan is None
+        if apply_plan:
+            plan = TopologyPlan(self.test_obj)
         if nexthop_device.ip_prefix:
-            nhopv4_id = sai_thrift_create_next_hop(self.client, ip=sai_ipprefix(
+            nhopv4_id = plan.create('next_hop', ip=sai_ipprefix(
                 nexthop_device.ipv4 + '/' + nexthop_device.ip_prefix), router_interface_id=rif, type=SAI_NEXT_HOP_TYPE_IP)
         else:
-            nhopv4_id = sai_thrift_create_next_hop(self.client, ip=sai_ipaddress(
+            nhopv4_id = plan.create('next_hop', ip=sai_ipaddress(
                 nexthop_device.ipv4), router_interface_id=rif, type=SAI_NEXT_HOP_TYPE_IP)
-        self.test_obj.assertEqual(self.test_obj.status(), SAI_STATUS_SUCCESS)
 
         if nexthop_device.ip_prefix_v6:
-            nhopv6_id = sai_thrift_create_next_hop(self.client, ip=sai_ipprefix(
+            nhopv6_id = plan.create('next_hop', ip=sai_ipprefix(
                 nexthop_device.ipv6 + '/' + nexthop_device.ip_prefix_v6), router_interface_id=rif, type=SAI_NEXT_HOP_TYPE_IP)
         else:
-            nhopv6_id = sai_thrift_create_next_hop(self.client, ip=sai_ipaddress(
+            nhopv6_id = plan.create('next_hop', ip=sai_ipaddress(
                 nexthop_device.ipv6), router_interface_id=rif, type=SAI_NEXT_HOP_TYPE_IP)
-        self.test_obj.assertEqual(self.test_obj.status(), SAI_STATUS_SUCCESS)
         nhopv4: Nexthop = Nexthop(
             oid=nhopv4_id, nexthop_device=nexthop_device, rif_id=rif)
         nhopv6: Nexthop = Nexthop(
             oid=nhopv6_id, nexthop_device=nexthop_device, rif_id=rif)
         self.test_obj.dut.nexthopv4_list.append(nhopv4)
         self.test_obj.dut.nexthopv6_list.append(nhopv6)
+        if apply_plan:
+            plan.apply()
+            self.resolve_planned_oids()
 
         return nhopv4, nhopv6
 
-    def create_nexthop_group_by_nexthops(self, nexthopv4_list: List[Nexthop], nexthopv6_list: List[Nexthop], dest_device: Device):
+    def create_nexthop_group_by_nexthops(self, nexthopv4_list: List[Nexthop], nexthopv6_list: List[Nexthop], dest_device: Device,
+                                         plan: TopologyPlan = None):
         """
         Create nexthop group by nexthops. Each element in all lists corresponds one by one.
         Set dut attribute: nexthopv4_list, nexthopv6_list
@@ -599,25 +601,24 @@ class RouteConfiger(object):
             nexthopv4_list: A list of ipv4 nexthops to form a nexthop group
             nexthopv6_list: A list of ipv6 nexthops to form a nexthop group
             dest_device: Simulating the bypass device, use this device to get the ipaddress, ipprefix_v4 and ipprefix_v6
+            plan: add the nexthop groups, their members and routes to this topology plan,
+                  if None create them now. The oids are the plan steps until resolve_planned_oids
         return nexthop group for v4 and nexthop group for v6 
         """
-        nhop_groupv4_id = sai_thrift_create_next_hop_group(self.client, type=SAI_NEXT_HOP_GROUP_TYPE_ECMP)
-        self.test_obj.assertEqual(self.test_obj.status(), SAI_STATUS_SUCCESS)
-        nhop_groupv6_id = sai_thrift_create_next_hop_group(self.client, type=SAI_NEXT_HOP_GROUP_TYPE_ECMP)
-        self.test_obj.assertEqual(self.test_obj.status(), SAI_STATUS_SUCCESS)
+        apply_plan = plan is None
+        if apply_plan:
+            plan = TopologyPlan(self.test_obj)
+        nhop_groupv4_id = plan.create('next_hop_group', type=SAI_NEXT_HOP_GROUP_TYPE_ECMP)
+        nhop_groupv6_id = plan.create('next_hop_group', type=SAI_NEXT_HOP_GROUP_TYPE_ECMP)
 
         nhp_grpv4_members, nhp_grpv6_members = [], []
         for nexthopv4, nexthopv6 in zip(nexthopv4_list, nexthopv6_list):
-            nhp_grpv4_member = sai_thrift_create_next_hop_group_member(
-                self.client,
-                next_hop_group_id=nhop_groupv4_id,
-                next_hop_id=nexthopv4.oid)
-            self.test_obj.assertEqual(self.test_obj.status(), SAI_STATUS_SUCCESS)
-            nhp_grpv6_member = sai_thrift_create_next_hop_group_member(
-                self.client,
-                next_hop_group_id=nhop_groupv6_id,
-                next_hop_id=nexthopv6.oid)
-            self.test_obj.assertEqual(self.test_obj.status(), SAI_STATUS_SUCCESS)
+            nhp_grpv4_member = plan.create('next_hop_group_member',
+                                           next_hop_group_id=nhop_groupv4_id,
+                                           next_hop_id=nexthopv4.oid)
+            nhp_grpv6_member = plan.create('next_hop_group_member',
+                                           next_hop_group_id=nhop_groupv6_id,
+                                           next_hop_id=nexthopv6.oid)
 
             nhp_grpv4_members.append(nhp_grpv4_member)
             nhp_grpv6_members.append(nhp_grpv6_member)
@@ -628,11 +629,24 @@ class RouteConfiger(object):
 
         self.test_obj.dut.nhp_grpv4_list.append(nhp_grpv4)
         self.test_obj.dut.nhp_grpv6_list.append(nhp_grpv6)
-        self.create_route_by_nexthop_group(dest_device, nhp_grpv4, nhp_grpv6)
-        self.test_obj.assertEqual(self.test_obj.status(), SAI_STATUS_SUCCESS)
+        self.create_route_by_nexthop_group(dest_device, nhp_grpv4, nhp_grpv6, plan=plan)
+        if apply_plan:
+            plan.apply()
+            self.resolve_planned_oids()
 
         return nhp_grpv4, nhp_grpv6
 
+    def resolve_planned_oids(self):
+        """
+        Replace the plan steps kept as oids of the dut nexthops and nexthop groups
+        by the oids they created, once their topology plan is applied.
+        """
+        for nexthop in self.test_obj.dut.nexthopv4_list + self.test_obj.dut.nexthopv6_list:
+            nexthop.oid = resolve(nexthop.oid)
+        for nhp_grp in self.test_obj.dut.nhp_grpv4_list + self.test_obj.dut.nhp_grpv6_list:
+            nhp_grp.nhp_grp_id = resolve(nhp_grp.nhp_grp_id)
+            nhp_grp.nhp_grp_members = [resolve(member) for member in nhp_grp.nhp_grp_members]
+
     def choice_virtual_route(self, virtual_router=None):
         """
         Depends on if virtual_router_id is None, return the default virtual or deinded vr.
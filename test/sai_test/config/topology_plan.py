@@ -0,0 +1,334 @@
+# Copyright (c) 2021 Microsoft Open Technologies, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at http://www.apache.org/licenses/LICENSE-2.0
+#
+#    THIS CODE IS PROVIDED ON AN *AS IS* BASIS, WITHOUT WARRANTIES OR
+#    CONDITIONS OF ANY KIND, EITHER EXPRESS OR IMPLIED, INCLUDING WITHOUT
+#    LIMITATION ANY IMPLIED WARRANTIES OR CONDITIONS OF TITLE, FITNESS
+#    FOR A PARTICULAR PURPOSE, MERCHANTABILITY OR NON-INFRINGEMENT.
+#
+#    See the Apache Version 2.0 License for specific language governing
+#    permissions and limitations under the License.
+#
+#    Microsoft would like to thank the following companies for their review and
+#    assistance with these files: Intel Corporation, Mellanox Technologies Ltd,
+#    Dell Products, L.P., Facebook, Inc., Marvell International Ltd.
+#
+#
+
+"""
+Topology plan.
+
+A topology plan collects the SAI objects to create, set or remove as steps,
+with the dependencies between them, and applies them in waves. A step is in
+the wave after the last of the steps it depends on, and the steps of a wave
+are applied with one bulk RPC per object type, e.g. all the neighbors of the
+VLAN servers in one call. Switches without the bulk RPC of an object type
+get one RPC per object.
+
+The teardown plan of a plan removes the objects it created, in the reverse
+order of the dependencies.
+"""
+
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+import sai_thrift.sai_adapter as adapter
+from sai_thrift.sai_adapter import *
+
+if TYPE_CHECKING:
+    from sai_test_base import T0TestBase
+
+CREATE = 'create'
+REMOVE = 'remove'
+SET = 'set'
+
+BULK_UNSUPPORTED_STATUSES = (SAI_STATUS_NOT_SUPPORTED,
+                             SAI_STATUS_NOT_IMPLEMENTED)
+
+
+def resolve(value):
+    """
+    Get the key or OID of the object of a step, other values as they are.
+    """
+    return value.object_id() if isinstance(value, PlanStep) else value
+
+
+class PlanStep(object):
+    """
+    SAI object operation in a topology plan.
+
+        class attributes:
+            operation: CREATE, REMOVE or SET
+            object_type: SAI object type name, e.g. route_entry, vlan_member
+            key: entry key for entry objects, object to remove or set,
+                 None for the OID objects to create
+            attrs: keyword attributes, as accepted by the sai_thrift
+                   functions. A PlanStep value is replaced by the OID
+                   created by that step
+            deps: steps to apply before this one
+            oid: OID created by the step
+            status: status of the operation, None if not applied yet
+    """
+
+    def __init__(self, operation, object_type, key=None, attrs=None, deps=()):
+        """
+        Init the PlanStep object.
+        """
+        self.operation = operation
+        self.object_type = object_type
+        self.key = key
+        self.attrs = attrs or {}
+        self.deps = list(deps)
+        self.oid = None
+        self.status = None
+
+    def is_entry(self):
+        """
+        If the step creates an entry object, identified by its key.
+        """
+        return self.operation == CREATE and self.key is not None
+
+    def dependencies(self):
+        """
+        Get the steps this step depends on.
+
+        Returns:
+            list: explicit dependencies and steps used as key or attribute
+        """
+        deps = list(self.deps)
+        if isinstance(self.key, PlanStep):
+            deps.append(self.key)
+        deps.extend(value for value in self.attrs.values()
+                    if isinstance(value, PlanStep))
+        return deps
+
+    def object_id(self):
+        """
+        Get the key or OID of the object of this step.
+        """
+        key = resolve(self.key)
+        if self.operation == CREATE and key is None:
+            return self.oid
+        return key
+
+    def resolved_attrs(self):
+        """
+        Get the attributes, with the steps replaced by their OIDs.
+        """
+        return {name: resolve(value) for name, value in self.attrs.items()}
+
+    def __str__(self):
+        return '{} {} {}'.format(self.operation, self.object_type, self.object_id())
+
+
+class TopologyPlan(object):
+    """
+    Class use to collect SAI objects configurations and apply them in bulk.
+    """
+
+    unsupported_bulk = set()
+    """
+    Names of the bulk functions not supported by the switch
+    """
+
+    def __init__(self, test_obj: 'T0TestBase') -> None:
+        """
+        Init the topology plan.
+
+        Args:
+            test_obj: the test object
+        """
+        self.test_obj = test_obj
+        self.client = test_obj.client
+        self.steps = []
+
+    def __getstate__(self):
+        # applied plans are kept in the data model snapshot, without the test
+        state = self.__dict__.copy()
+        state['test_obj'] = state['client'] = None
+        return state
+
+    def create(self, object_type, key=None, deps=(), **attrs):
+        """
+        Add a step creating an object.
+
+        Args:
+            object_type: SAI object type name
+            key: entry key, None for OID objects
+            deps: steps to apply before this one
+            attrs: object attributes
+
+        Returns:
+            PlanStep: the step, usable as attribute value of other steps
+        """
+        return self._add(PlanStep(CREATE, object_type, key, attrs, deps))
+
+    def set_attribute(self, object_type, key, deps=(), **attrs):
+        """
+        Add a step setting one attribute of an object.
+
+        Args:
+            object_type: SAI object type name
+            key: entry key or OID (or step creating it) of the object
+            deps: steps to apply before this one
+            attrs: the attribute to set
+        """
+        if len(attrs) != 1:
+            raise ValueError('Only one attribute can be set per step')
+        return self._add(PlanStep(SET, object_type, key, attrs, deps))
+
+    def remove(self, object_type, key, deps=()):
+        """
+        Add a step removing an object.
+
+        Args:
+            object_type: SAI object type name
+            key: entry key or OID (or step creating it) of the object
+            deps: steps to apply before this one
+        """
+        return self._add(PlanStep(REMOVE, object_type, key, None, deps))
+
+    def _add(self, step):
+        self.steps.append(step)
+        return step
+
+    def waves(self):
+        """
+        Order the pending steps by dependencies.
+
+        Returns:
+            list: lists of steps, every step after its dependencies
+        """
+        depth = {}
+
+        def wave_of(step, path=()):
+            if step.status is not None:
+                # applied before, e.g. by another plan
+                return -1
+            if step not in depth:
+                if step in path:
+                    raise ValueError('Dependency cycle at {}'.format(step))
+                depth[step] = 1 + max(
+                    [wave_of(dep, path + (step,)) for dep in step.dependencies()],
+                    default=-1)
+            return depth[step]
+
+        waves = []
+        for step in self.steps:
+            if step.status is not None:
+                continue
+            wave = wave_of(step)
+            while len(waves) <= wave:
+                waves.append([])
+            waves[wave].append(step)
+        return waves
+
+    def teardown_plan(self, test_obj: 'T0TestBase' = None):
+        """
+        Get the plan removing the objects created by this plan.
+
+        Objects are removed after the objects depending on them.
+
+        Args:
+            test_obj: the test object applying the teardown, by default the
+                      one of this plan
+
+        Returns:
+            TopologyPlan: the teardown plan
+        """
+        plan = TopologyPlan(test_obj or self.test_obj)
+        removals = OrderedDict()
+        for step in reversed(self.steps):
+            if step.operation == CREATE and step.status == SAI_STATUS_SUCCESS:
+                removals[step] = plan.remove(step.object_type, step.object_id())
+        for step, removal in removals.items():
+            for dep in step.dependencies():
+                if dep in removals:
+                    removals[dep].deps.append(removal)
+        return plan
+
+    def apply(self, check_status=True):
+        """
+        Apply the pending steps, wave by wave.
+
+        Args:
+            check_status: check the status of every step, teardowns may
+                          ignore the objects already removed by the test
+        """
+        for wave in self.waves():
+            groups = OrderedDict()
+            for step in wave:
+                group = (step.operation, step.object_type, step.is_entry())
+                groups.setdefault(group, []).append(step)
+            for (operation, object_type, _), steps in groups.items():
+                if len(steps) < 2 or not self._apply_bulk(operation, object_type, steps):
+                    for step in steps:
+                        self._apply_step(step)
+                if not check_status:
+                    continue
+                for step in steps:
+                    self.test_obj.assertEqual(
+                        step.status, SAI_STATUS_SUCCESS,
+                        'Failed to {}'.format(step))
+
+    def _apply_step(self, step):
+        if step.operation == CREATE:
+            function = getattr(adapter, 'sai_thrift_create_' + step.object_type)
+            if step.is_entry():
+                step.status = function(self.client, step.key, **step.resolved_attrs())
+            else:
+                step.oid = function(self.client, **step.resolved_attrs())
+                step.status = adapter.status
+        elif step.operation == SET:
+            function = getattr(adapter, 'sai_thrift_set_{}_attribute'.format(step.object_type))
+            step.status = function(self.client, step.object_id(), **step.resolved_attrs())
+        else:
+            function = getattr(adapter, 'sai_thrift_remove_' + step.object_type)
+            step.status = function(self.client, step.object_id())
+
+    def _apply_bulk(self, operation, object_type, steps):
+        """
+        Apply the steps with a bulk RPC.
+
+        Returns:
+            bool: False if the switch does not support the bulk RPC
+        """
+        if operation == SET:
+            name = 'sai_thrift_bulk_set_{}_attribute'.format(object_type)
+        else:
+            name = 'sai_thrift_bulk_{}_{}'.format(operation, object_type)
+        function = getattr(adapter, name, None)
+        if function is None or name in self.unsupported_bulk:
+            return False
+
+        attr_list = [step.resolved_attrs() for step in steps]
+        # an unsupported bulk RPC must not skip the test
+        skip_test = adapter.SKIP_TEST_ON_EXPECTED_ERROR
+        adapter.SKIP_TEST_ON_EXPECTED_ERROR = False
+        try:
+            if operation == CREATE and not steps[0].is_entry():
+                oids, statuses = function(self.client, attr_list)
+            else:
+                oids = None
+                keys = [step.object_id() for step in steps]
+                if operation == REMOVE:
+                    statuses = function(self.client, keys)
+                else:
+                    statuses = function(self.client, keys, attr_list)
+        except sai_thrift_exception as e:
+            oids, statuses = None, [e.status] * len(steps)
+        finally:
+            adapter.SKIP_TEST_ON_EXPECTED_ERROR = skip_test
+
+        if all(status in BULK_UNSUPPORTED_STATUSES for status in statuses):
+            print('{} is not supported, applying one object at a time'.format(name))
+            self.unsupported_bulk.add(name)
+            return False
+        for index, step in enumerate(steps):
+            step.status = statuses[index]
+            if oids is not None:
+                step.oid = oids[index]
+        return True
@@ -22,6 +22,7 @@ from sai_thrift.sai_adapter import *
 from sai_utils import *  # pylint: disable=wildcard-import; lgtm[py/polluting-import]
 from typing import TYPE_CHECKING
 from data_module.vlan import Vlan
+from config.topology_plan import TopologyPlan
 
 if TYPE_CHECKING:
     from sai_test_base import T0TestBase
@@ -85,10 +86,9 @@ def t0_vlan_tear_down_helper(test_obj: 'T0TestBase'):
     configer.remove_vlan_members(members)
    # configer.remove_vlan(default_vlan_id)
 
-    for _, vlan in test_obj.dut.vlans.items():
-        members = configer.get_vlan_member(vlan.oid)
-        configer.remove_vlan_members(members)
-        configer.remove_vlan(vlan.oid)
+    for plan in reversed(test_obj.dut.vlan_plans):
+        plan.teardown_plan(test_obj).apply()
+    test_obj.dut.vlan_plans.clear()
     test_obj.dut.vlans.clear()
 
 
@@ -124,12 +124,15 @@ class VlanConfiger(object):
         vlan = Vlan(None, None, [], None, [], [])
         print("Create vlan {} and it memmber port at {} ...".format(
             vlan_id, vlan_port_idxs))
-        vlan_oid = sai_thrift_create_vlan(self.client, vlan_id=vlan_id)
-        members = self.create_vlan_member(
-            vlan_oid, vlan_port_idxs, vlan_tagging_mode)
+        plan = TopologyPlan(self.test_obj)
+        vlan_step = plan.create('vlan', vlan_id=vlan_id)
+        member_steps = self.plan_vlan_members(
+            plan, vlan_step, vlan_id, vlan_port_idxs, vlan_tagging_mode)
+        plan.apply()
+        self.test_obj.dut.vlan_plans.append(plan)
         vlan.vlan_id = vlan_id
-        vlan.vlan_mport_oids = members
-        vlan.oid = vlan_oid
+        vlan.vlan_mport_oids = [member.oid for member in member_steps]
+        vlan.oid = vlan_step.oid
         vlan.port_idx_list = vlan_port_idxs
         return vlan
 
@@ -145,19 +148,42 @@ class VlanConfiger(object):
         Returns:
             list: vlan members oid
         """
-        vlan_members = []
         attr = sai_thrift_get_vlan_attribute(
             self.client, vlan_oid, vlan_id=True)
         vlan_id = attr['vlan_id']
+        plan = TopologyPlan(self.test_obj)
+        member_steps = self.plan_vlan_members(
+            plan, vlan_oid, vlan_id, vlan_ports, vlan_tagging_mode)
+        plan.apply()
+        return [member.oid for member in member_steps]
+
+    def plan_vlan_members(self, plan: TopologyPlan, vlan_oid, vlan_id, vlan_ports,
+                          vlan_tagging_mode=SAI_VLAN_TAGGING_MODE_UNTAGGED):
+        """
+        Add the vlan members of a vlan, and the PVID of their ports, to a topology plan.
+
+        Args:
+            plan: the topology plan
+            vlan_oid: vlan oid, or the plan step creating the vlan
+            vlan_id: vlan id, set as PVID of the member ports
+            vlan_ports: vlan member ports index
+            vlan_tagging_mode: SAI_VLAN_MEMBER_ATTR_VLAN_TAGGING_MODE
+
+        Returns:
+            list: plan steps creating the vlan members
+        """
+        member_steps = []
         for port_index in vlan_ports:
-            vlan_member = sai_thrift_create_vlan_member(self.client,
-                                                        vlan_id=vlan_oid,
-                                                        bridge_port_id=self.test_obj.dut.port_obj_list[port_index].bridge_port_oid,
-                                                        vlan_tagging_mode=vlan_tagging_mode)
-            vlan_members.append(vlan_member)
-            sai_thrift_set_port_attribute(
-                self.client, self.test_obj.dut.port_obj_list[port_index].oid, port_vlan_id=vlan_id)
-        return vlan_members
+            member = plan.create('vlan_member',
+                                 vlan_id=vlan_oid,
+                                 bridge_port_id=self.test_obj.dut.port_obj_list[port_index].bridge_port_oid,
+                                 vlan_tagging_mode=vlan_tagging_mode)
+            member_steps.append(member)
+            plan.set_attribute('port',
+                               self.test_obj.dut.port_obj_list[port_index].oid,
+                               deps=[member],
+                               port_vlan_id=vlan_id)
+        return member_steps
 
     def get_default_vlan(self):
         """
@@ -207,6 +233,7 @@ class VlanConfiger(object):
             vlan_members: vlan member oids
         """
 
+        plan = TopologyPlan(self.test_obj)
         for vlan_member in vlan_members:
-            sai_thrift_remove_vlan_member(self.client, vlan_member)
-            self.test_obj.assertEqual(self.test_obj.status(), SAI_STATUS_SUCCESS)
+            plan.remove('vlan_member', vlan_member)
+        plan.apply()
@@ -53,6 +53,13 @@ class Device(object):
             fdb_entry
     """
 
+    # a T0 test keeps thousands of devices, without a __dict__ per device
+    __slots__ = ('type', 'id', 'group_id', 'ip_prefix', 'ip_prefix_v6',
+                 'ip_pattern', 'ip_pattern_v6', 'fdb_device_num',
+                 'mac', 'ipv4', 'ipv6', 'l2_egress_port_idx', 'l3_port_idx',
+                 'l3_lag_obj', 'l3_nhp_grpv4', 'l3_nhp_grpv6',
+                 'routev4', 'routev6')
+
     def __init__(self, device_type, id, group_id=None):
         """
         Init the Device object, different device type  have different attributes
@@ -169,3 +176,83 @@ class Device(object):
         """
         return FDB_MAC_PREFIX + ':' + self.fdb_device_num + ':' + \
             '{:02x}'.format(self.group_id) + ':' + '{:02x}'.format(self.id)
+
+
+class DeviceGroup(object):
+    """
+    Compact table of the devices of a group, behaves as a list of Device.
+
+    The Device objects are created on first access and kept, so that the
+    attributes set by the configers persist. The devices which are never
+    accessed only cost their index, including when the group is pickled.
+    Attributes common to all the devices are set with set_attributes,
+    without creating the devices.
+
+        class attributes:
+            type: device type, T1, Server
+            group_id: device group id
+            count: number of devices
+    """
+
+    MAX_DEVICES = 256
+    """
+    The device id is the last byte of the mac and ipv4 addresses
+    """
+
+    def __init__(self, device_type, group_id, count):
+        """
+        Init the DeviceGroup object.
+
+        Args:
+            device_type: device type, T1, Server
+            group_id: device group id
+            count: number of devices, with ids 0 to count - 1
+        """
+        if count > self.MAX_DEVICES:
+            raise ValueError('A device group has at most {} devices'.format(
+                self.MAX_DEVICES))
+        self.type = device_type
+        self.group_id = group_id
+        self.count = count
+        self.devices = {}
+        """
+        Created devices, key: device id, value: Device
+        """
+        self.attrs = {}
+        """
+        Attributes of all the devices, set on the devices when created
+        """
+
+    def set_attributes(self, **attrs):
+        """
+        Set attributes of all the devices of the group.
+
+        Args:
+            attrs: Device attributes and their values
+        """
+        self.attrs.update(attrs)
+        for device in self.devices.values():
+            for name, value in attrs.items():
+                setattr(device, name, value)
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self[index]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.count))]
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError('device index out of range')
+        device = self.devices.get(index)
+        if device is None:
+            device = Device(self.type, index, self.group_id)
+            for name, value in self.attrs.items():
+                setattr(device, name, value)
+            self.devices[index] = device
+        return device
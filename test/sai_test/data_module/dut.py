@@ -26,6 +26,7 @@ if TYPE_CHECKING:
     from data_module.nexthop_group import NexthopGroup
     from data_module.port import Port
     from data_module.tunnel import Tunnel
+    from config.topology_plan import TopologyPlan
 
 
 class Dut(object):
@@ -44,6 +45,7 @@ class Dut(object):
             # vlan
             default_vlan_id 
             vlans
+            vlan_plans
 
             # switch
             switch_id 
@@ -52,6 +54,7 @@ class Dut(object):
             default_vlan_fdb_list 
             vlan_10_fdb_list 
             vlan_20_fdb_list 
+            fdb_plans
 
             # port
             default_1q_bridge_id 
@@ -110,6 +113,10 @@ class Dut(object):
         """
         Vlan object list, key: int, Value: Vlan object
         """
+        self.vlan_plans: List['TopologyPlan'] = []
+        """
+        Topology plans creating the vlans, their teardown plans remove them
+        """
 
         # switch
         self.switch_id = None
@@ -119,6 +126,10 @@ class Dut(object):
         """
         FDB entry list
         """
+        self.fdb_plans: List['TopologyPlan'] = []
+        """
+        Topology plans creating the FDB entries, their teardown plans remove them
+        """
 
         # port
         self.default_1q_bridge_id = None
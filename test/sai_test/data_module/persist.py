@@ -17,74 +17,186 @@
 #    Dell Products, L.P., Facebook, Inc., Marvell International Ltd.
 #
 #
-import pickle
+import hashlib
+import json
 import os
-from typing import Dict
-from typing import List
-from data_module.dut import Dut
-from data_module.device import Device
+import pickle
+from typing import Any, Dict, Optional
 
 
-class PersistHelper:
+class Snapshot:
     '''
-    store and restore data model
+    A version of the stored data model.
+    Components are unpickled on first access.
     '''
 
-    def __init__(self) -> None:
-        self.dir = '/tmp/sai_model'
-        if not os.path.exists(self.dir):
-            os.makedirs(self.dir)
+    def __init__(self, store: 'PersistHelper', manifest: Dict) -> None:
+        self.store = store
+        self.manifest = manifest
+        self.loaded: Dict[str, Any] = {}
 
-    def persist_dut(self, dut: Dut):
+    @property
+    def version(self) -> int:
+        return self.manifest['version']
+
+    def has(self, name: str) -> bool:
+        return name in self.manifest['components']
+
+    def get(self, name: str) -> Any:
         '''
-        persist dut intance
+        get a component, read from file on first access
         Args:
-            dut: Dut instance,including all dut configure
+            name: component name, e.g. 'dut'
+        Return:
+            component object
         '''
-        with open(os.path.join(self.dir, 'dut'), 'wb') as output:
-            pickle.dump(dut, output, pickle.HIGHEST_PROTOCOL)
+        if name not in self.loaded:
+            self.loaded[name] = self.store.read_blob(
+                self.manifest['components'][name])
+        return self.loaded[name]
+
+
+class PersistHelper:
+    '''
+    store and restore data model
+
+    The data model is stored as versioned snapshots. A snapshot is a manifest
+    which maps every component (dut, server list, t1 list) to a blob, a file
+    named after the hash of the pickled component. Persisting again only
+    writes the components which changed, as a new version of the manifest.
+
+    The manifest also records the fingerprint of the configuration the model
+    was built from (setUp flags and test params) and a signature of the live
+    switch, so a snapshot is only reused with the same configuration and
+    switch.
+    '''
 
-    def persist_server_list(self, server_list: Dict[int, List[Device]]):
+    MANIFEST = 'manifest.json'
+
+    def __init__(self, model_dir: str = '/tmp/sai_model') -> None:
+        self.dir = model_dir
+        self.blob_dir = os.path.join(self.dir, 'blobs')
+        if not os.path.exists(self.blob_dir):
+            os.makedirs(self.blob_dir)
+
+    @staticmethod
+    def fingerprint(config: Dict) -> str:
         '''
-        persist server list
+        get the fingerprint of a configuration
         Args:
-            server_list: server(type: device) list
+            config: json serializable configuration, e.g. setUp flags
+        Return:
+            fingerprint: hash of the configuration
         '''
-        with open(os.path.join(self.dir, 'server_list'), 'wb') as output:
-            pickle.dump(server_list, output, pickle.HIGHEST_PROTOCOL)
+        data = json.dumps(config, sort_keys=True, default=str)
+        return hashlib.sha1(data.encode()).hexdigest()
 
-    def persist_t1_list(self, t1_list: Dict[int, List[Device]]):
+    def read_manifest(self) -> Optional[Dict]:
         '''
-        persist t1 list
-        Args:
-            t1_list: server(type: device) list
+        read the manifest of the last snapshot
+        Return:
+            manifest: None if there is no snapshot
         '''
-        with open(os.path.join(self.dir, 't1_list'), 'wb') as output:
-            pickle.dump(t1_list, output, pickle.HIGHEST_PROTOCOL)
+        path = os.path.join(self.dir, self.MANIFEST)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r') as input_obj:
+            try:
+                return json.load(input_obj)
+            except ValueError:
+                return None
+
+    def read_blob(self, blob: str) -> Any:
+        with open(os.path.join(self.blob_dir, blob), 'rb') as input_obj:
+            return pickle.load(input_obj)
 
-    def read_dut(self) -> Dut:
+    def write_blob(self, obj: Any) -> str:
         '''
-        read dut
+        persist an object, if not persisted yet
         Return:
-            dut: Dut instance, init by reading from file
+            blob: name of the blob
         '''
-        with open(os.path.join(self.dir, 'dut'), 'rb') as input_obj:
-            return pickle.load(input_obj)
+        data = pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)
+        blob = hashlib.sha1(data).hexdigest()
+        path = os.path.join(self.blob_dir, blob)
+        if not os.path.exists(path):
+            with open(path + '.tmp', 'wb') as output:
+                output.write(data)
+            os.replace(path + '.tmp', path)
+        return blob
 
-    def read_server_list(self) -> Dict[int, List[Device]]:
+    def open_snapshot(self, fingerprint: str,
+                      signature: Optional[Dict] = None) -> Optional[Snapshot]:
         '''
-        read server list
+        open the last snapshot if it matches the configuration and the switch
+        Args:
+            fingerprint: fingerprint of the configuration
+            signature: signature of the live switch, None if it is unknown,
+                       then no snapshot matches
         Return:
-            server_list: init server list by reading from file
+            snapshot: None if there is no matching snapshot
         '''
-        with open(os.path.join(self.dir, 'server_list'), 'rb') as input_obj:
-            return pickle.load(input_obj)
+        manifest = self.read_manifest()
+        if manifest is None:
+            print("No data model snapshot")
+            return None
+        if manifest['fingerprint'] != fingerprint:
+            print("Data model snapshot v{} is for another configuration".format(
+                manifest['version']))
+            return None
+        if signature is None or manifest['signature'] is None:
+            print("Data model snapshot v{} can't be checked against the "
+                  "switch, switch signature unknown".format(manifest['version']))
+            return None
+        if manifest['signature'] != \
+                json.loads(json.dumps(signature, default=str)):
+            print("Data model snapshot v{} is stale, switch {} != {}".format(
+                manifest['version'], signature, manifest['signature']))
+            return None
+        return Snapshot(self, manifest)
 
-    def read_t1_list(self) -> Dict[int, List[Device]]:
+    def persist(self, fingerprint: str, components: Dict[str, Any],
+                signature: Optional[Dict] = None,
+                base: Optional[Snapshot] = None) -> Snapshot:
         '''
-        read dut
+        persist the data model as a new snapshot
+        Args:
+            fingerprint: fingerprint of the configuration
+            components: components to persist, e.g. {'dut': dut}
+            signature: signature of the live switch
+            base: snapshot the components were read from, its other
+                  components are kept as they are
         Return:
-            t1_list: init t1 list by reading from file
+            snapshot: the new snapshot
         '''
-        with open(os.path.join(self.dir, 't1_list'), 'rb') as input_obj:
-            return pickle.load(input_obj)
+        manifest = self.read_manifest()
+        version = manifest['version'] + 1 if manifest else 1
+        stored = dict(base.manifest['components']) if base else {}
+        changed = []
+        for name, obj in components.items():
+            blob = self.write_blob(obj)
+            if stored.get(name) != blob:
+                stored[name] = blob
+                changed.append(name)
+        new_manifest = {
+            'version': version,
+            'fingerprint': fingerprint,
+            'signature': json.loads(json.dumps(signature, default=str)),
+            'components': stored,
+            'changed': sorted(changed),
+        }
+        path = os.path.join(self.dir, self.MANIFEST)
+        with open(path + '.tmp', 'w') as output:
+            json.dump(new_manifest, output, indent=2)
+        os.replace(path + '.tmp', path)
+        print("Data model snapshot v{}, changed: {}".format(
+            version, ', '.join(sorted(changed)) or 'none'))
+
+        # remove the blobs of the older versions
+        for blob in os.listdir(self.blob_dir):
+            if blob not in stored.values():
+                os.remove(os.path.join(self.blob_dir, blob))
+
+        snapshot = Snapshot(self, new_manifest)
+        snapshot.loaded.update(components)
+        return snapshot
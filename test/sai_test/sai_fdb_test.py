@@ -760,7 +760,7 @@ class FdbAgingTest(T0TestBase):
         verify_no_other_packets(self)
         print("OK. Mac learnt.")
 
-        self.saiWaitFdbAge(self.age_time)
+        self.saiWaitFdbAge(self.age_time, macs=[unknown_mac1])
         print("Verify if aged MAC address was removed")
         send_packet(self, send_port.dev_port_index, pkt)
         verify_each_packet_on_multiple_port_lists(
@@ -876,7 +876,7 @@ class FdbAgingAfterMoveTest(T0TestBase):
         print("Wait for 1 sec.")
         time.sleep(1)
         print("Verify if aged MAC address was removed")
-        self.saiWaitFdbAge(self.age_time)
+        self.saiWaitFdbAge(self.age_time, macs=[unknown_mac1])
         self.dataplane.flush()
         send_packet(
             self, self.dut.port_obj_list[1].dev_port_index, chk_tag_pkt)
@@ -970,7 +970,7 @@ class FdbMacMovingAfterAgingTest(T0TestBase):
         verify_no_other_packets(self)
         print("OK. Mac learnt.")
 
-        self.saiWaitFdbAge(self.age_time)
+        self.saiWaitFdbAge(self.age_time, macs=[unknown_mac1])
 
         print("Verifying if MAC address moved")
         self.dataplane.flush()
@@ -1344,7 +1344,7 @@ class SviMacAgingTest(T0TestBase):
         self.assertEqual(available_fdb_entry_cnt_now -
                              available_fdb_entry_cnt_past, -1)
 
-        self.saiWaitFdbAge(self.age_time)
+        self.saiWaitFdbAge(self.age_time, macs=[unknown_mac1])
         print("Verify if aged MAC address was removed")
         available_fdb_entry_cnt_age = sai_thrift_get_switch_attribute(
                 self.client,
@@ -1421,7 +1421,7 @@ class SviMacAgingV6Test(T0TestBase):
         self.assertEqual(available_fdb_entry_cnt_now -
                              available_fdb_entry_cnt_past, -1)
 
-        self.saiWaitFdbAge(self.age_time)
+        self.saiWaitFdbAge(self.age_time, macs=[unknown_mac1])
         print("Verify if aged MAC address was removed")
         available_fdb_entry_cnt_age = sai_thrift_get_switch_attribute(
                 self.client,
@@ -1946,7 +1946,7 @@ class SviMacLarningAfterageV4Test(T0TestBase):
         send_packet(self, self.dut.port_obj_list[5].dev_port_index, pkt)
         verify_packet_any_port(self, exp_pkt, self.recv_dev_port_idxs)
 
-        self.saiWaitFdbAge(self.age_time)
+        self.saiWaitFdbAge(self.age_time, macs=[dmac4, unkownmac])
         print("Verify if aged MAC address was removed")
         available_fdb_entry_cnt_age = sai_thrift_get_switch_attribute(
                 self.client,
@@ -2039,7 +2039,7 @@ class SviMacLarningAfterAgeV6Test(T0TestBase):
         send_packet(self, self.dut.port_obj_list[5].dev_port_index, pkt_v6)
         verify_packet_any_port(self, exp_pkt_v6, self.recv_dev_port_idxs)
 
-        self.saiWaitFdbAge(self.age_time)
+        self.saiWaitFdbAge(self.age_time, macs=[dmac4, unkownmac])
         print("Verify if aged MAC address was removed")
         available_fdb_entry_cnt_age = sai_thrift_get_switch_attribute(
                 self.client,
@@ -2148,7 +2148,9 @@ class SviMacAgeAfterMoveV4Test(T0TestBase):
         """
 
         self.sviMacMove()
-        self.saiWaitFdbAge(self.age_time)
+        # MAC addresses learned by sviMacMove
+        self.saiWaitFdbAge(self.age_time,
+                           macs=["00:11:22:33:44:55", "00:01:01:99:99:99"])
         # sviMacMove function contains checking mac learn and mac move
         self.sviMacMove()
 
@@ -2244,7 +2246,9 @@ class SviMacAgeAfterMoveV6Test(T0TestBase):
         """
 
         self.sviMacMove()
-        self.saiWaitFdbAge(self.age_time)
+        # MAC addresses learned by sviMacMove
+        self.saiWaitFdbAge(self.age_time,
+                           macs=["00:11:22:33:44:55", "00:01:01:99:99:99"])
         # sviMacMove function contains checking mac learn and mac move
         self.sviMacMove()
 
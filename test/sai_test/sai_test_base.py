@@ -51,10 +51,10 @@ from config.vlan_configer import (VlanConfiger, remove_default_vlan, t0_vlan_con
                                   t0_vlan_tear_down_helper)
 from config.tunnel_configer import TunnelConfiger, t0_tunnel_config_helper
 
-from data_module.device import Device, DeviceType
+from data_module.device import Device, DeviceGroup, DeviceType
 from data_module.dut import Dut
 from data_module.lag import Lag
-from data_module.persist import PersistHelper
+from data_module.persist import PersistHelper, Snapshot
 from data_module.vlan import Vlan
 from data_module.tunnel import Tunnel
 from sai_utils import *
@@ -247,7 +247,11 @@ class ThriftInterface(BaseTest):
             server = 'localhost'
 
         self.transport = TSocket.TSocket(server, THRIFT_PORT)
-        self.transport = TTransport.TBufferedTransport(self.transport)
+        # must be the transport of the RPC server
+        if self.test_params.get('thrift_transport') == 'framed':
+            self.transport = TTransport.TFramedTransport(self.transport)
+        else:
+            self.transport = TTransport.TBufferedTransport(self.transport)
         self.protocol = TBinaryProtocol.TBinaryProtocol(self.transport)
         self.client = sai_rpc.Client(self.protocol)
         self.transport.open()
@@ -297,6 +301,25 @@ class ThriftInterfaceDataPlane(ThriftInterface):
         super(ThriftInterfaceDataPlane, self).tearDown()
 
 
+class SnapshotAttribute(object):
+    """
+    Test attribute restored from the data model snapshot on first access.
+
+    Once read or assigned, the value is an instance attribute which
+    hides the descriptor.
+    """
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        value = obj.snapshot.get(self.name)
+        obj.__dict__[self.name] = value
+        return value
+
+
 class T0TestBase(ThriftInterfaceDataPlane):
     """
     SAI test helper base class
@@ -308,6 +331,15 @@ class T0TestBase(ThriftInterfaceDataPlane):
 
     """
 
+    SNAPSHOT_COMPONENTS = ['dut', 'servers', 't1_list']
+    """
+    Attributes persisted in the data model snapshot
+    """
+
+    dut = SnapshotAttribute()
+    servers = SnapshotAttribute()
+    t1_list = SnapshotAttribute()
+
     def __init__(self, *args, **kwargs):
         """
         Init the T0 Test Object.
@@ -337,19 +369,27 @@ class T0TestBase(ThriftInterfaceDataPlane):
         Device numbers in each group
         """
         # Dict key: group id, Value: devices list
-        self.servers: Dict[int, List[Device]] = {}
+        self.servers: Dict[int, DeviceGroup] = {}
         """
         Simulating the server Objects in Test.
         Key: group id
         Value: List, servers
         """
-        self.t1_list: Dict[int, List[Device]] = {}
+        self.t1_list: Dict[int, DeviceGroup] = {}
         """
         Simulating the T1 objects in test
         Key: group id
         Value: List, servers
         """
         self.persist_helper = PersistHelper()
+        self.snapshot: Snapshot = None
+        """
+        Data model snapshot the test data was restored from
+        """
+        self.config_fingerprint = None
+        """
+        Fingerprint of the setUp flags and test params
+        """
 
     def set_logger_name(self):
         """
@@ -377,6 +417,8 @@ class T0TestBase(ThriftInterfaceDataPlane):
               is_create_tunnel=False,
               wait_sec=5,
               skip_reason = None):
+        setup_flags = {name: value for name, value in locals().items()
+                       if name.startswith('is_')}
 
         super(T0TestBase, self).setUp(skip_reason = skip_reason)
         self.set_logger_name()
@@ -394,7 +436,12 @@ class T0TestBase(ThriftInterfaceDataPlane):
         self.route_configer = RouteConfiger(self)
         self.lag_configer = LagConfiger(self)
         self.tunnel_configer = TunnelConfiger(self)
-        if force_config or not self.common_configured:
+        test_params = {name: value for name, value in self.test_params.items()
+                       if name != 'common_configured'}
+        self.config_fingerprint = PersistHelper.fingerprint(
+            {'setup_flags': setup_flags, 'test_params': test_params})
+        if force_config or not self.common_configured or \
+                not self.restore_config():
             self.create_device()
             t0_switch_config_helper(self)
             remove_default_vlan(self)
@@ -423,24 +470,65 @@ class T0TestBase(ThriftInterfaceDataPlane):
             t0_tunnel_config_helper(test_obj=self,
                                     is_create_tunnel=is_create_tunnel)              
             print("common config done")
+            self.snapshot = None
             self.persist_config()
             print("Waiting for switch to get ready before test, {} seconds ...".format(
                 wait_sec))
             time.sleep(wait_sec)
-        else:
-            print("switch keeps running, read config from storage")
-            self.dut = self.persist_helper.read_dut()
-            self.t1_list = self.persist_helper.read_t1_list()
-            self.servers = self.persist_helper.read_server_list()
+
+    def switch_signature(self):
+        """
+        Get the signature of the live switch, the object ids which change
+        when the switch is created again.
+
+        Returns:
+            Dict: switch signature, None if the switch does not answer
+        """
+        attr = sai_thrift_get_switch_attribute(
+            self.client, cpu_port=True, default_virtual_router_id=True,
+            number_of_active_ports=True)
+        if not attr:
+            return None
+        return {name: attr[name] for name in
+                ['cpu_port', 'default_virtual_router_id', 'number_of_active_ports']}
+
+    def restore_config(self):
+        """
+        Restore the test data from the data model snapshot, if it was made
+        with the same setUp flags and test params on the live switch.
+        The data is read from storage on first access.
+
+        Returns:
+            bool: True if restored
+        """
+        snapshot = self.persist_helper.open_snapshot(
+            self.config_fingerprint, self.switch_signature())
+        if snapshot is None:
+            print("config out of sync, set up common config again")
+            return False
+        print("switch keeps running, read config v{} from storage".format(
+            snapshot.version))
+        self.snapshot = snapshot
+        for name in self.SNAPSHOT_COMPONENTS:
+            self.__dict__.pop(name, None)
+        return True
 
     def persist_config(self):
         """
         persist config
+
+        Only the test data read from the snapshot or assigned by the test is
+        stored again, as a new version of the snapshot.
+        Tests changing the common config can call it to keep the snapshot
+        in sync with the switch.
         """
         print("persist config")
-        self.persist_helper.persist_dut(self.dut)
-        self.persist_helper.persist_server_list(self.servers)
-        self.persist_helper.persist_t1_list(self.t1_list)
+        components = {name: self.__dict__[name]
+                      for name in self.SNAPSHOT_COMPONENTS
+                      if name in self.__dict__}
+        self.snapshot = self.persist_helper.persist(
+            self.config_fingerprint, components,
+            signature=self.switch_signature(), base=self.snapshot)
 
     def restore_fdb_config(self):
         """
@@ -524,17 +612,37 @@ class T0TestBase(ThriftInterfaceDataPlane):
         """
         return adapter.status
 
-    @staticmethod
-    def saiWaitFdbAge(timeout):
+    def saiWaitFdbAge(self, timeout, macs=None):
         """
         Wait for fdb entry to ageout
 
+        Waits for the FDB aged notifications of the given entries if the
+        RPC server supports them, sleeps for timeout and the aging interval
+        otherwise.
+
         Args:
             timeout (int): Timeout value in seconds
+            macs (list): MAC addresses of all the learned entries which must
+                         age, sleeps for the whole interval if None
         """
         print("Waiting for fdb entry to age")
         aging_interval_buffer = 10
-        time.sleep(timeout + aging_interval_buffer)
+        stream = None
+        if macs:
+            stream = open_notification_stream(
+                self.client, [sai_thrift_notification_type_t.FDB_EVENT])
+        if stream is None:
+            time.sleep(timeout + aging_interval_buffer)
+            return
+
+        pending = set(mac.lower() for mac in macs)
+
+        def aged(notification):
+            if notification.state == SAI_FDB_EVENT_AGED:
+                pending.discard(notification.fdb_entry.mac_address)
+            return not pending
+
+        stream.wait(aged, timeout + aging_interval_buffer)
 
     def create_device(self):
         """
@@ -547,11 +655,11 @@ class T0TestBase(ThriftInterfaceDataPlane):
         """
 
         for srv_grp_idx in self.server_groups:
-            self.servers[srv_grp_idx] = [Device(DeviceType.server, index, srv_grp_idx)
-                                         for index in range(0, self.num_device_each_group)]
+            self.servers[srv_grp_idx] = DeviceGroup(
+                DeviceType.server, srv_grp_idx, self.num_device_each_group)
         for t1_grp_idx in self.t1_groups:
-            self.t1_list[t1_grp_idx] = [Device(DeviceType.t1, index, t1_grp_idx)
-                                        for index in range(0, self.num_device_each_group)]
+            self.t1_list[t1_grp_idx] = DeviceGroup(
+                DeviceType.t1, t1_grp_idx, self.num_device_each_group)
 
     def create_vlan_interface(self, vlan: Vlan, reuse=True):
         """
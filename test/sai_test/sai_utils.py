@@ -29,6 +29,8 @@ import socket
 
 from functools import wraps
 
+from thrift.Thrift import TApplicationException
+
 from ptf.packet import *
 from ptf.testutils import *
 from config.switch_configer import t0_switch_config_helper
@@ -130,12 +132,8 @@ def generate_mac_address_list(role, group, indexes):
         default_1q_bridge_id
     """
     print("Generate MAC ...")
-    mac_list = []
-    for index in indexes:
-        mac = FDB_MAC_PREFIX + ':' + role + ':' + \
-            '{:02d}'.format(group) + ':' + '{:02d}'.format(index)
-        mac_list.append(mac)
-    return mac_list
+    prefix = '{}:{}:{:02d}:'.format(FDB_MAC_PREFIX, role, group)
+    return [prefix + '{:02d}'.format(index) for index in indexes]
 
 
 def generate_ip_address_list(role, group, indexes):
@@ -151,10 +149,8 @@ def generate_ip_address_list(role, group, indexes):
         default_1q_bridge_id
     """
     print("Generate IP ...")
-    ip_list = []
-    for index in indexes:
-        ip_list.append(role.format(group, index))
-    return ip_list
+    fmt = role.format
+    return [fmt(group, index) for index in indexes]
 
 
 def sai_thrift_api_uninitialize(client):
@@ -171,6 +167,129 @@ def sai_thrift_api_uninitialize(client):
     return obj_type
 
 
+NOTIFICATION_POLL_TIMEOUT = 0.5
+
+
+def sai_thrift_subscribe_notifications(client, types):
+    """
+    sai_thrift_subscribe_notifications() RPC client function
+    implementation
+
+    Args:
+        client (Client): SAI RPC client
+        types (list): sai_thrift_notification_type_t values
+
+    Returns:
+        int: sequence number of the last notification received by the
+             server, the next ones are returned by
+             sai_thrift_get_notifications()
+    """
+    return client.sai_thrift_subscribe_notifications(types)
+
+
+def sai_thrift_get_notifications(client, sequence, types=None, max_count=0,
+                                 timeout=NOTIFICATION_POLL_TIMEOUT):
+    """
+    sai_thrift_get_notifications() RPC client function
+    implementation
+
+    The server answers as soon as a notification is received, or after
+    the timeout. The RPC server may not serve other calls meanwhile, so
+    the timeout should be short.
+
+    Args:
+        client (Client): SAI RPC client
+        sequence (int): sequence number of the last notification read
+        types (list): sai_thrift_notification_type_t values, all if None
+        max_count (int): maximum number of notifications, 0 for all
+        timeout (float): maximum wait in sec
+
+    Returns:
+        list: sai_thrift_notification_t notifications after sequence
+    """
+    return client.sai_thrift_get_notifications(
+        sequence, types or [], max_count, int(timeout * 1000))
+
+
+class NotificationStream(object):
+    """
+    Notifications received by the switch since the stream was opened.
+
+        class attributes:
+            client: SAI RPC client
+            types: sai_thrift_notification_type_t values of the stream
+            sequence: sequence number of the last notification read
+    """
+
+    def __init__(self, client, types):
+        """
+        Init the stream, subscribes to the notifications.
+
+        Args:
+            client (Client): SAI RPC client
+            types (list): sai_thrift_notification_type_t values
+        """
+        self.client = client
+        self.types = list(types)
+        self.sequence = sai_thrift_subscribe_notifications(client, self.types)
+
+    def poll(self, timeout=NOTIFICATION_POLL_TIMEOUT):
+        """
+        Get the next notifications.
+
+        Args:
+            timeout (float): maximum wait for the first one in sec
+
+        Returns:
+            list: sai_thrift_notification_t notifications
+        """
+        notifications = sai_thrift_get_notifications(
+            self.client, self.sequence, self.types, timeout=timeout)
+        if notifications:
+            self.sequence = notifications[-1].sequence
+        return notifications
+
+    def wait(self, match, timeout):
+        """
+        Read the notifications until one of them matches.
+
+        Args:
+            match (function): called with every notification, returns True
+                              when the wait is over
+            timeout (float): timeout in sec
+
+        Returns:
+            bool: False if the timeout expired
+        """
+        deadline = time.time() + timeout
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return False
+            for notification in self.poll(
+                    min(remaining, NOTIFICATION_POLL_TIMEOUT)):
+                if match(notification):
+                    return True
+
+
+def open_notification_stream(client, types):
+    """
+    Open a notification stream, if the RPC server supports notifications.
+
+    Args:
+        client (Client): SAI RPC client
+        types (list): sai_thrift_notification_type_t values
+
+    Returns:
+        NotificationStream: the stream, None if not supported
+    """
+    try:
+        return NotificationStream(client, types)
+    except (sai_thrift_exception, TApplicationException) as e:
+        print("Notifications are not supported: {}".format(e))
+        return None
+
+
 def warm_test(is_test_rebooting:bool=False, time_out=60, interval=1):
     """
     Method decorator for the method on warm testing.
@@ -0,0 +1,114 @@
+# Copyright (c) 2021 Microsoft Open Technologies, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at http://www.apache.org/licenses/LICENSE-2.0
+#
+#    THIS CODE IS PROVIDED ON AN *AS IS* BASIS, WITHOUT WARRANTIES OR
+#    CONDITIONS OF ANY KIND, EITHER EXPRESS OR IMPLIED, INCLUDING WITHOUT
+#    LIMITATION ANY IMPLIED WARRANTIES OR CONDITIONS OF TITLE, FITNESS
+#    FOR A PARTICULAR PURPOSE, MERCHANTABILITY OR NON-INFRINGEMENT.
+#
+#    See the Apache Version 2.0 License for specific language governing
+#    permissions and limitations under the License.
+#
+#    Microsoft would like to thank the following companies for their review and
+#    assistance with these files: Intel Corporation, Mellanox Technologies Ltd,
+#    Dell Products, L.P., Facebook, Inc., Marvell International Ltd.
+#
+#
+
+"""
+Unit tests of the topology plan ordering, run from test/sai_test with
+python3 -m pytest utests
+"""
+
+import pickle
+import unittest
+
+from config.topology_plan import REMOVE, TopologyPlan
+from sai_thrift.sai_adapter import SAI_STATUS_SUCCESS
+
+
+class FakeTest(object):
+    """
+    Test object of the plans, the waves are computed without a switch.
+    """
+    client = None
+
+
+class TopologyPlanWavesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.plan = TopologyPlan(FakeTest())
+
+    def test_independent_steps_in_one_wave(self):
+        members = [self.plan.create('lag_member', lag_id=1, port_id=port)
+                   for port in range(4)]
+        self.assertEqual(self.plan.waves(), [members])
+
+    def test_step_after_its_attribute_steps(self):
+        plan = self.plan
+        vlan = plan.create('vlan', vlan_id=10)
+        member = plan.create('vlan_member', vlan_id=vlan, bridge_port_id=2)
+        pvid = plan.set_attribute('port', 3, deps=[member], port_vlan_id=10)
+        self.assertEqual(plan.waves(), [[vlan], [member], [pvid]])
+
+    def test_step_after_its_key_step(self):
+        plan = self.plan
+        nhop = plan.create('next_hop', ip='10.0.0.1', router_interface_id=1)
+        update = plan.set_attribute('next_hop', nhop, ip='10.0.0.2')
+        self.assertEqual(plan.waves(), [[nhop], [update]])
+
+    def test_wave_is_after_the_last_dependency(self):
+        plan = self.plan
+        group = plan.create('next_hop_group', type=0)
+        nhop = plan.create('next_hop', ip='10.0.0.1', router_interface_id=1)
+        member = plan.create('next_hop_group_member',
+                             next_hop_group_id=group, next_hop_id=nhop)
+        route = plan.create('route_entry', 'route', next_hop_id=group)
+        self.assertEqual(plan.waves(), [[group, nhop], [member, route]])
+
+    def test_applied_steps_are_skipped(self):
+        plan = self.plan
+        vlan = plan.create('vlan', vlan_id=10)
+        member = plan.create('vlan_member', vlan_id=vlan, bridge_port_id=2)
+        vlan.status = SAI_STATUS_SUCCESS
+        self.assertEqual(plan.waves(), [[member]])
+
+    def test_cycle_is_rejected(self):
+        plan = self.plan
+        first = plan.create('vlan', vlan_id=10)
+        second = plan.create('vlan', vlan_id=20, deps=[first])
+        first.deps.append(second)
+        with self.assertRaises(ValueError):
+            plan.waves()
+
+    def test_teardown_removes_dependent_objects_first(self):
+        plan = self.plan
+        vlan = plan.create('vlan', vlan_id=10)
+        member = plan.create('vlan_member', vlan_id=vlan, bridge_port_id=2)
+        plan.set_attribute('port', 3, deps=[member], port_vlan_id=10)
+        failed = plan.create('vlan', vlan_id=20)
+        vlan.oid, vlan.status = 100, SAI_STATUS_SUCCESS
+        member.oid, member.status = 101, SAI_STATUS_SUCCESS
+        failed.status = -1
+
+        waves = plan.teardown_plan().waves()
+        self.assertEqual([[(step.operation, step.object_type, step.key) for step in wave]
+                          for wave in waves],
+                         [[(REMOVE, 'vlan_member', 101)], [(REMOVE, 'vlan', 100)]])
+
+    def test_pickled_plan_keeps_its_steps(self):
+        plan = self.plan
+        vlan = plan.create('vlan', vlan_id=10)
+        vlan.oid, vlan.status = 100, SAI_STATUS_SUCCESS
+
+        loaded = pickle.loads(pickle.dumps(plan))
+        self.assertIsNone(loaded.test_obj)
+        teardown = loaded.teardown_plan(FakeTest())
+        self.assertEqual([step.key for step in teardown.steps], [100])
+
+
+if __name__ == '__main__':
+    unittest.main()
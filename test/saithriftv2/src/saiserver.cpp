@@ -119,6 +119,10 @@ struct cmdOptions
     std::string profileMapFile;
     std::string portMapFile;
     std::string initScript;
+    std::string rpcMode;
+    int rpcThreads;
+    std::string rpcTransport;
+    std::string rpcThreadSafety;
 };
 
 cmdOptions handleCmdLine(int argc, char **argv)
@@ -133,12 +137,16 @@ cmdOptions handleCmdLine(int argc, char **argv)
             { "profile",          required_argument, 0, 'p' },
             { "portmap",          required_argument, 0, 'f' },
             { "init-script",      required_argument, 0, 'S' },
+            { "rpc-mode",         required_argument, 0, 'm' },
+            { "rpc-threads",      required_argument, 0, 'n' },
+            { "rpc-transport",    required_argument, 0, 't' },
+            { "rpc-thread-safety",required_argument, 0, 's' },
             { 0,                  0,                 0,  0  }
         };
 
         int option_index = 0;
 
-        int c = getopt_long(argc, argv, "p:f:S:", long_options, &option_index);
+        int c = getopt_long(argc, argv, "p:f:S:m:n:t:s:", long_options, &option_index);
 
         if (c == -1)
             break;
@@ -160,6 +168,26 @@ cmdOptions handleCmdLine(int argc, char **argv)
                 options.initScript = std::string(optarg);
                 break;
 
+            case 'm':
+                printf("rpc server mode: %s\n", optarg);
+                options.rpcMode = std::string(optarg);
+                break;
+
+            case 'n':
+                printf("rpc server threads: %s\n", optarg);
+                options.rpcThreads = atoi(optarg);
+                break;
+
+            case 't':
+                printf("rpc transport: %s\n", optarg);
+                options.rpcTransport = std::string(optarg);
+                break;
+
+            case 's':
+                printf("rpc thread safety: %s\n", optarg);
+                options.rpcThreadSafety = std::string(optarg);
+                break;
+
             default:
                 printf("getopt_long failure\n");
                 exit(EXIT_FAILURE);
@@ -281,6 +309,12 @@ main(int argc, char* argv[])
 
     handleInitScript(options.initScript);
 
+    configure_sai_thrift_rpc_server(
+            options.rpcMode.empty() ? NULL : options.rpcMode.c_str(),
+            options.rpcThreads,
+            options.rpcTransport.empty() ? NULL : options.rpcTransport.c_str(),
+            options.rpcThreadSafety.empty() ? NULL : options.rpcThreadSafety.c_str());
+
     start_sai_thrift_rpc_server(SWITCH_SAI_THRIFT_RPC_SERVER_PORT);
 
     const sai_log_level_t log_level = SAI_LOG_LEVEL_NOTICE;
@@ -1,4 +1,5 @@
 extern "C" {
+int configure_sai_thrift_rpc_server(const char *mode, int threads, const char *transport, const char *thread_safety);
 int start_p4_sai_thrift_rpc_server(char *port);
 int start_sai_thrift_rpc_server(int port);
 }